@@ -0,0 +1,84 @@
+"""Compare per-frame latency and memory of the face detector backends.
+
+    python bench_detector.py --frames 200 --source 0
+    python bench_detector.py --source clip.mp4 --backends torch onnx openvino haar
+
+Each backend runs in its own process so load time and resident memory
+aren't muddied by the others.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import cv2
+from face_detector import BACKEND_ORDER, MODEL_PATH, make_detector
+from video_download import peak_rss_bytes
+
+
+def grab_frames(source, count):
+    cap = cv2.VideoCapture(int(source) if source.isdigit() else source)
+    frames = []
+    while len(frames) < count:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frames.append(frame)
+    cap.release()
+    if not frames:
+        raise RuntimeError(f"No frames from {source}")
+    return frames
+
+
+def measure(backend, source, count, imgsz):
+    frames = grab_frames(source, count)
+    rss_before = peak_rss_bytes()
+    start = time.perf_counter()
+    detector = make_detector(backend, MODEL_PATH)
+    load_seconds = time.perf_counter() - start
+    detector.detect(frames[0], imgsz=imgsz)  # warm-up
+    timings = []
+    found = 0
+    for frame in frames:
+        start = time.perf_counter()
+        boxes = detector.detect(frame, imgsz=imgsz)
+        timings.append(time.perf_counter() - start)
+        found += len(boxes)
+    timings.sort()
+    return {
+        "backend": backend,
+        "load_s": round(load_seconds, 2),
+        "mean_ms": round(1000 * sum(timings) / len(timings), 1),
+        "p95_ms": round(1000 * timings[int(0.95 * (len(timings) - 1))], 1),
+        "rss_mb": round(((peak_rss_bytes() or 0) - (rss_before or 0)) / (1024 * 1024), 1),
+        "faces": found,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--source", default="0", help="camera index or video file")
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--imgsz", type=int, default=None)
+    parser.add_argument("--backends", nargs="+", default=list(BACKEND_ORDER))
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.child, args.source, args.frames, args.imgsz)))
+        sys.exit(0)
+
+    print(f"{'backend':<10}{'load s':>8}{'mean ms':>10}{'p95 ms':>9}{'+RSS MB':>9}{'faces':>7}")
+    for backend in args.backends:
+        cmd = [sys.executable, os.path.abspath(__file__), "--child", backend, "--source", args.source,
+               "--frames", str(args.frames)]
+        if args.imgsz:
+            cmd += ["--imgsz", str(args.imgsz)]
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        lines = proc.stdout.strip().splitlines()
+        if proc.returncode != 0 or not lines:
+            print(f"{backend:<10}  failed: {(proc.stderr.strip().splitlines() or ['?'])[-1]}")
+            continue
+        r = json.loads(lines[-1])
+        print(f"{r['backend']:<10}{r['load_s']:>8}{r['mean_ms']:>10}{r['p95_ms']:>9}{r['rss_mb']:>9}{r['faces']:>7}")
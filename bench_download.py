@@ -0,0 +1,55 @@
+"""Compare single-stream and segmented video pack downloads against a throttled local stub.
+
+    python bench_download.py --size-mb 40 --throttle 2000000 --connections 1 4 8
+"""
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+from stub_video_api import make_server, DOWNLOAD_PATH
+from video_sync import sync_videos
+
+
+def make_clips(folder, size_mb, count):
+    per_clip = size_mb * 1024 * 1024 // count
+    for i in range(count):
+        with open(os.path.join(folder, f"clip{i}.mp4"), "wb") as f:
+            f.write(os.urandom(per_clip))
+
+
+def run(url, connections):
+    target = tempfile.mkdtemp(prefix="bench_videos_")
+    try:
+        start = time.monotonic()
+        stats = sync_videos(url, os.path.join(target, "videos"), connections=connections)
+        return time.monotonic() - start, stats["bytes_transferred"]
+    finally:
+        shutil.rmtree(target, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=40)
+    parser.add_argument("--clips", type=int, default=8)
+    parser.add_argument("--throttle", type=int, default=2_000_000, help="bytes/second per connection")
+    parser.add_argument("--connections", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    clips = tempfile.mkdtemp(prefix="bench_clips_")
+    make_clips(clips, args.size_mb, args.clips)
+    server = make_server(clips, args.port, throttle=args.throttle)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{args.port}{DOWNLOAD_PATH}"
+    try:
+        baseline = None
+        for connections in args.connections:
+            elapsed, transferred = run(url, connections)
+            baseline = baseline or elapsed
+            print(f"{connections:>2} connection(s): {elapsed:6.2f}s  "
+                  f"{transferred / elapsed / (1024 * 1024):6.2f} MB/s  x{baseline / elapsed:.2f}")
+    finally:
+        server.shutdown()
+        shutil.rmtree(clips, ignore_errors=True)
@@ -0,0 +1,163 @@
+"""Load-test /videos serving: plain send_from_directory against video_serving.video_response.
+
+    python bench_video_serving.py --clips 6 --size-mb 20 --plays 5 --clients 4
+
+Each client imitates the browser screensaver: it plays the playlist
+--plays times, fetching each clip with an open-ended Range request and
+then --seeks random 1 MiB ranges. Like a browser it keeps a copy of
+every clip, reuses it without asking while the server says it is
+immutable, and otherwise revalidates with If-None-Match. The server runs
+in its own process so its CPU time can be measured on its own;
+--server waitress runs it under waitress instead of werkzeug's dev server.
+"""
+import os
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+import multiprocessing
+import requests
+
+SEEK_BYTES = 1024 * 1024
+
+
+def make_clips(folder, size_mb, count):
+    os.makedirs(folder)
+    for i in range(count):
+        with open(os.path.join(folder, f"clip{i}.mp4"), "wb") as f:
+            f.write(os.urandom(size_mb * 1024 * 1024))
+
+
+def serve(root, mode, port, server):
+    import logging
+    from flask import Flask, request, send_from_directory, jsonify
+    from video_serving import video_response, clip_versions
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    folder = os.path.join(root, "videos")
+    app = Flask(__name__)
+
+    @app.route('/cpu')
+    def cpu():
+        return jsonify(time.process_time())
+
+    @app.route('/versions')
+    def versions():
+        names = sorted(os.listdir(folder))
+        return jsonify(clip_versions(root, folder, names) if mode == "video_response" else {})
+
+    @app.route('/videos/<path:filename>')
+    def serve_video(filename):
+        if mode == "video_response":
+            return video_response(root, folder, filename, request.args.get('v'))
+        return send_from_directory(folder, filename)
+
+    if server == "waitress":
+        import waitress
+        waitress.serve(app, host="127.0.0.1", port=port, threads=8, _quiet=True)
+    else:
+        from werkzeug.serving import make_server
+        make_server("127.0.0.1", port, app, threaded=True).serve_forever()
+
+
+def server_cpu_seconds(base):
+    return requests.get(f"{base}/cpu").json()
+
+
+def client(base, names, versions, plays, seeks, totals, lock):
+    session = requests.Session()
+    cache = {}  # url -> (etag, immutable, size)
+    requests_made = bytes_read = not_modified = cache_hits = 0
+    rng = random.Random()
+    for _ in range(plays):
+        for name in names:
+            url = f"{base}/videos/{name}" + (f"?v={versions[name]}" if name in versions else "")
+            cached = cache.get(url)
+            if cached is not None and cached[1]:
+                cache_hits += 1 + seeks
+                continue
+            headers = {"Range": "bytes=0-"}
+            if cached is not None:
+                headers["If-None-Match"] = cached[0]
+            with session.get(url, headers=headers, stream=True) as response:
+                requests_made += 1
+                if response.status_code == 304:
+                    not_modified += 1
+                else:
+                    for chunk in response.iter_content(256 * 1024):
+                        bytes_read += len(chunk)
+                    content_range = response.headers.get("Content-Range")
+                    size = int(content_range.rsplit("/", 1)[1]) if content_range else bytes_read
+                    immutable = "immutable" in response.headers.get("Cache-Control", "")
+                    cache[url] = (response.headers.get("ETag"), immutable, size)
+            etag, immutable, size = cache[url]
+            if immutable:
+                continue
+            for _ in range(seeks):
+                start = rng.randrange(max(1, size - SEEK_BYTES))
+                response = session.get(url, headers={"Range": f"bytes={start}-{start + SEEK_BYTES - 1}"})
+                requests_made += 1
+                bytes_read += len(response.content)
+    with lock:
+        totals["requests"] += requests_made
+        totals["bytes"] += bytes_read
+        totals["not_modified"] += not_modified
+        totals["cache_hits"] += cache_hits
+
+
+def run(root, mode, args):
+    proc = multiprocessing.Process(target=serve, args=(root, mode, args.port, args.server), daemon=True)
+    proc.start()
+    base = f"http://127.0.0.1:{args.port}"
+    try:
+        for _ in range(100):
+            try:
+                versions = requests.get(f"{base}/versions", timeout=1).json()
+                break
+            except requests.exceptions.ConnectionError:
+                time.sleep(0.1)
+        else:
+            raise RuntimeError("server did not start")
+        names = sorted(os.listdir(os.path.join(root, "videos")))
+        totals = {"requests": 0, "bytes": 0, "not_modified": 0, "cache_hits": 0}
+        lock = threading.Lock()
+        cpu_before = server_cpu_seconds(base)
+        start = time.monotonic()
+        threads = [threading.Thread(target=client, args=(base, names, versions, args.plays, args.seeks, totals, lock))
+                   for _ in range(args.clients)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.monotonic() - start
+        cpu_after = server_cpu_seconds(base)
+    finally:
+        proc.terminate()
+        proc.join()
+    return elapsed, cpu_after - cpu_before, totals
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clips", type=int, default=6)
+    parser.add_argument("--size-mb", type=int, default=20)
+    parser.add_argument("--plays", type=int, default=5, help="times each client loops the playlist")
+    parser.add_argument("--seeks", type=int, default=3, help="random 1 MiB ranges per clip play")
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--server", choices=["werkzeug", "waitress"], default="werkzeug")
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="bench_serving_")
+    make_clips(os.path.join(root, "videos"), args.size_mb, args.clips)
+    try:
+        for mode in ("send_from_directory", "video_response"):
+            elapsed, cpu, totals = run(root, mode, args)
+            mb = totals["bytes"] / (1024 * 1024)
+            print(f"{mode:>19}: {elapsed:6.2f}s  {totals['requests']:5d} requests  {mb:8.1f} MB  "
+                  f"{mb / elapsed:7.1f} MB/s  server CPU {cpu:.2f}s  "
+                  f"304s {totals['not_modified']}  cache hits {totals['cache_hits']}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
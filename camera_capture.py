@@ -0,0 +1,116 @@
+import time
+import threading
+import cv2
+
+RING_SLOTS = 3  # newest frame, the one being inferred on, and one being written
+STATS_LOG_SECONDS = 60  # how often the capture thread prints its metrics; 0 disables
+
+
+class LatestFrameCapture:
+    """Reads the webcam on its own thread and always hands out the newest frame.
+
+    Frames are written into a small ring of preallocated NumPy buffers, so
+    inference never waits on the camera and never sees a stale frame that
+    queued up in the driver while the model was busy. The frame returned by
+    read() stays valid until the next read().
+    """
+
+    def __init__(self, source=0, api=None, slots=RING_SLOTS):
+        self.source = source
+        self.api = api
+        self.slots = max(3, slots)
+        self._cap = None
+        self._buffers = [None] * self.slots
+        self._stamps = [0.0] * self.slots
+        self._latest = -1
+        self._reading = -1
+        self._seq = 0
+        self._consumed_seq = 0
+        self._cond = threading.Condition()
+        self._running = False
+        self._failed = False
+        self._thread = None
+        self.frames_captured = 0
+        self.frames_dropped = 0
+        self.frames_read = 0
+        self.last_frame_age = 0.0
+        self.max_frame_age = 0.0
+
+    def start(self):
+        """Open the camera and start the capture thread; False if it can't be opened."""
+        self._cap = cv2.VideoCapture(self.source) if self.api is None else cv2.VideoCapture(self.source, self.api)
+        if not self._cap.isOpened():
+            return False
+        # Ask the driver not to queue frames behind our back where it supports it
+        self._cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self._running = True
+        self._failed = False
+        self._thread = threading.Thread(target=self._run, name="camera-capture", daemon=True)
+        self._thread.start()
+        return True
+
+    def _next_slot(self):
+        for offset in range(1, self.slots + 1):
+            slot = (self._latest + offset) % self.slots
+            if slot != self._latest and slot != self._reading:
+                return slot
+        return 0
+
+    def _run(self):
+        last_log = time.monotonic()
+        while self._running:
+            with self._cond:
+                slot = self._next_slot()
+            ok, frame = self._cap.read(self._buffers[slot]) if self._buffers[slot] is not None else self._cap.read()
+            if not ok:
+                with self._cond:
+                    self._failed = True
+                    self._cond.notify_all()
+                break
+            now = time.monotonic()
+            with self._cond:
+                self._buffers[slot] = frame
+                self._stamps[slot] = now
+                if self._seq > self._consumed_seq:
+                    # The previous newest frame was never picked up
+                    self.frames_dropped += 1
+                self._latest = slot
+                self._seq += 1
+                self.frames_captured += 1
+                self._cond.notify_all()
+            if STATS_LOG_SECONDS and now - last_log >= STATS_LOG_SECONDS:
+                last_log = now
+                print(f"📷 Capture: {self.stats()}")
+
+    def read(self, timeout=2.0):
+        """Return the newest frame not yet returned, waiting for one if needed; None on failure."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq > self._consumed_seq or self._failed or not self._running,
+                                       timeout=timeout):
+                return None
+            if self._seq <= self._consumed_seq:
+                return None
+            self._reading = self._latest
+            self._consumed_seq = self._seq
+            self.frames_read += 1
+            self.last_frame_age = time.monotonic() - self._stamps[self._reading]
+            self.max_frame_age = max(self.max_frame_age, self.last_frame_age)
+            return self._buffers[self._reading]
+
+    def stats(self):
+        return {
+            "captured": self.frames_captured,
+            "read": self.frames_read,
+            "dropped": self.frames_dropped,
+            "last_age_ms": round(self.last_frame_age * 1000, 1),
+            "max_age_ms": round(self.max_frame_age * 1000, 1),
+        }
+
+    def release(self):
+        self._running = False
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        if self._cap is not None:
+            self._cap.release()
@@ -0,0 +1,173 @@
+"""Local control channel between the Flask servers and the screensaver process.
+
+The process that owns the detection loop and the player runs a
+ControlServer; anything else on the machine sends it commands with
+send_command() and gets an acknowledgement back:
+
+    show             show the screensaver now
+    hide             hide it and start the cooldown
+    pause            freeze the current frame without hiding
+    reload-playlist  pick up the current videos generation straight away
+    status           visibility, presence and player latency figures
+
+Messages are JSON sent as raw bytes over multiprocessing.connection on a
+loopback socket, so nothing received is ever unpickled. Connections
+authenticate with KIOSK_CONTROL_KEY if it is set, otherwise with a random
+key generated on first run and kept in CONTROL_KEY_FILE, readable only by
+the user running the kiosk.
+
+The Flask servers also relay commands from POST /screensaver/<command>;
+relay_allowed() keeps that route to local scripts, not web pages.
+"""
+import os
+import json
+import queue
+import secrets
+import ipaddress
+import threading
+from multiprocessing.connection import Listener, Client, AuthenticationError
+
+CONTROL_ADDRESS = ("127.0.0.1", 5002)
+CONTROL_KEY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".control-key")
+COMMANDS = ("show", "hide", "pause", "reload-playlist", "status")
+REPLY_TIMEOUT = 5.0  # seconds a command may take before the sender gives up
+MAX_MESSAGE = 64 * 1024  # bytes; commands and replies are tiny
+
+
+def relay_allowed(remote_addr, origin=None):
+    """True for a caller on this machine that isn't a browser page.
+
+    Browsers send Origin with every POST, and a page the kiosk visits is
+    itself on loopback, so a request carrying one is refused whatever CORS says.
+    """
+    try:
+        addr = ipaddress.ip_address(remote_addr or "")
+    except ValueError:
+        return False
+    if getattr(addr, "ipv4_mapped", None):
+        addr = addr.ipv4_mapped
+    return addr.is_loopback and not origin
+
+
+def _install_key(path=CONTROL_KEY_FILE):
+    """Read the per-install key, creating it (mode 0600) if this is the first run."""
+    try:
+        with open(path, "rb") as f:
+            key = f.read().strip()
+        if key:
+            return key
+    except FileNotFoundError:
+        pass
+    tmp = f"{path}.{os.getpid()}.tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(secrets.token_hex(32).encode("ascii"))
+    try:
+        # link() fails if another process created the key first; then both use that one
+        os.link(tmp, path)
+    except FileExistsError:
+        pass
+    finally:
+        os.remove(tmp)
+    with open(path, "rb") as f:
+        return f.read().strip()
+
+
+CONTROL_AUTHKEY = os.environ["KIOSK_CONTROL_KEY"].encode("utf-8") if os.environ.get("KIOSK_CONTROL_KEY") \
+    else _install_key()
+
+
+def _send(conn, message):
+    conn.send_bytes(json.dumps(message).encode("utf-8"))
+
+
+def _recv(conn):
+    return json.loads(conn.recv_bytes(MAX_MESSAGE).decode("utf-8"))
+
+
+class ControlServer:
+    """Receives commands and hands them to the loop that owns the player.
+
+    Connections are served on background threads, but commands only run when
+    the owning loop calls dispatch(), so its state is never touched from two
+    threads. The loop should sleep with wait() instead of time.sleep() so a
+    command wakes it at once.
+    """
+
+    def __init__(self, address=CONTROL_ADDRESS, authkey=CONTROL_AUTHKEY):
+        self._listener = Listener(address, authkey=authkey)
+        self._requests = queue.Queue()
+        self._wake = threading.Event()
+        self._closed = False
+        threading.Thread(target=self._accept, name="control-accept", daemon=True).start()
+        print(f"📡 Control channel listening on {address[0]}:{address[1]}")
+
+    def _accept(self):
+        while not self._closed:
+            try:
+                conn = self._listener.accept()
+            except AuthenticationError:
+                print("⚠️ Control connection failed authentication")
+                continue
+            except OSError:
+                if self._closed:
+                    return
+                continue
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        with conn:
+            try:
+                message = _recv(conn)
+            except (EOFError, OSError, ValueError):
+                return
+            command = message.get("cmd") if isinstance(message, dict) else None
+            if command not in COMMANDS:
+                reply = {"ok": False, "error": f"Unknown command {command!r}"}
+            else:
+                done = threading.Event()
+                slot = {}
+                self._requests.put((command, slot, done))
+                self._wake.set()
+                reply = slot["reply"] if done.wait(REPLY_TIMEOUT) else {"ok": False, "error": "Timed out"}
+            try:
+                _send(conn, reply)
+            except (EOFError, OSError):
+                pass
+
+    def dispatch(self, handler):
+        """Run handler(command) for every queued command; its dict return value is the reply."""
+        self._wake.clear()
+        while True:
+            try:
+                command, slot, done = self._requests.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                reply = dict({"ok": True}, **(handler(command) or {}))
+            except Exception as e:
+                print(f"⚠️ Control command {command!r} failed: {e}")
+                reply = {"ok": False, "error": str(e)}
+            slot["reply"] = reply
+            done.set()
+
+    def wait(self, timeout):
+        """Sleep up to timeout seconds, returning early when a command arrives."""
+        self._wake.wait(timeout)
+
+    def close(self):
+        self._closed = True
+        self._listener.close()
+
+
+def send_command(command, address=CONTROL_ADDRESS, authkey=CONTROL_AUTHKEY, timeout=REPLY_TIMEOUT):
+    """Send a command and return the reply dict.
+
+    Raises ConnectionError if no screensaver process is listening and
+    TimeoutError if it doesn't answer within timeout.
+    """
+    with Client(address, authkey=authkey) as conn:
+        _send(conn, {"cmd": command})
+        if not conn.poll(timeout):
+            raise TimeoutError(f"No reply to {command!r} within {timeout}s")
+        return _recv(conn)
@@ -0,0 +1,96 @@
+import time
+import uuid
+import queue
+import threading
+from datetime import datetime
+
+MAX_FINISHED_JOBS = 20  # finished jobs kept around for /download-status
+
+
+class DownloadJobs:
+    """Single-worker queue for video downloads.
+
+    run is called as run(progress) on the worker thread; progress accepts
+    keyword updates (phase, bytes_total, bytes_done, entries_total,
+    entries_done) and whatever run returns becomes the job's result. The
+    ETA comes from the rate measured since the current phase began, since
+    downloading and extracting move at very different speeds.
+    """
+
+    def __init__(self, run):
+        self._run = run
+        self._jobs = {}
+        self._order = []
+        self._active = None
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._work, name="download-worker", daemon=True)
+        self._worker.start()
+
+    def submit(self):
+        """Queue a download, or return the one already queued or running."""
+        with self._lock:
+            if self._active is not None:
+                job = self._jobs[self._active]
+                print(f"🔁 Download already {job['state']} as job {job['id']}, collapsing trigger")
+                return dict(job, duplicate=True)
+            job = {
+                "id": uuid.uuid4().hex[:12],
+                "state": "queued",
+                "created": datetime.now().isoformat(timespec="seconds"),
+                "started": None,
+                "finished": None,
+                "phase": None,
+                "bytes_total": None,
+                "bytes_done": 0,
+                "entries_total": None,
+                "entries_done": 0,
+                "eta_seconds": None,
+                "result": None,
+                "error": None,
+            }
+            self._jobs[job["id"]] = job
+            self._order.append(job["id"])
+            self._active = job["id"]
+            self._queue.put(job["id"])
+            return dict(job, duplicate=False)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def _update(self, job_id, meter, **fields):
+        now = time.monotonic()
+        with self._lock:
+            job = self._jobs[job_id]
+            previous = (job["phase"], job["bytes_total"], job["bytes_done"])
+            job.update(fields)
+            if (job["phase"], job["bytes_total"]) != previous[:2] or job["bytes_done"] < previous[2]:
+                # New phase (or restarted count): measure the rate afresh from here
+                meter.update(at=now, bytes=job["bytes_done"] or 0)
+                job["eta_seconds"] = None
+                return
+            moved = job["bytes_done"] - meter["bytes"]
+            elapsed = now - meter["at"]
+            if job["bytes_total"] and moved > 0 and elapsed > 0:
+                rate = moved / elapsed
+                job["eta_seconds"] = round((job["bytes_total"] - job["bytes_done"]) / rate, 1)
+
+    def _work(self):
+        while True:
+            job_id = self._queue.get()
+            meter = {"at": time.monotonic(), "bytes": 0}
+            with self._lock:
+                self._jobs[job_id].update(state="running", started=datetime.now().isoformat(timespec="seconds"))
+            try:
+                result = self._run(lambda **fields: self._update(job_id, meter, **fields))
+                final = {"state": "done", "result": result, "eta_seconds": 0}
+            except Exception as e:
+                print(f"❌ Download job {job_id} failed: {e}")
+                final = {"state": "failed", "error": str(e)}
+            with self._lock:
+                self._jobs[job_id].update(final, finished=datetime.now().isoformat(timespec="seconds"))
+                self._active = None
+                while len(self._order) > MAX_FINISHED_JOBS:
+                    self._jobs.pop(self._order.pop(0), None)
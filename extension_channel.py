@@ -0,0 +1,235 @@
+"""Push channel from the kiosk's Chrome extension to the local server.
+
+The extension keeps one WebSocket open to ws://127.0.0.1:5003/presence
+and sends JSON text frames:
+
+    {"type": "status", "status": "entered" | "left", "url": "..."}
+    {"type": "heartbeat"}
+
+Status frames are only sent on transitions, plus once after every
+(re)connect so the server learns the current state. The heartbeat keeps
+the extension's service worker alive and tells the server the browser is
+still there; a connection that stays silent for HEARTBEAT_TIMEOUT seconds
+is dropped. The server answers every frame with {"ack": type, ...}.
+
+Browsers always send an Origin header with a WebSocket handshake, and
+WebSockets get no CORS preflight, so the handshake itself is where web
+pages are kept out: only chrome-extension:// origins are accepted, and
+only the IDs in KIOSK_EXTENSION_ID (comma-separated) when that is set.
+
+Only the little of RFC 6455 a local extension needs is implemented:
+text, ping/pong and close frames, with fragmented messages reassembled.
+"""
+import os
+import json
+import time
+import base64
+import socket
+import struct
+import hashlib
+import threading
+
+PRESENCE_ADDRESS = ("127.0.0.1", 5003)
+PRESENCE_PATH = "/presence"
+HEARTBEAT_TIMEOUT = 60  # seconds without a frame before the extension counts as gone
+MAX_MESSAGE = 64 * 1024  # bytes; status frames are tiny
+STATUSES = ("entered", "left")
+EXTENSION_IDS = [i.strip() for i in os.environ.get("KIOSK_EXTENSION_ID", "").split(",") if i.strip()]
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+OP_CONT, OP_TEXT, OP_CLOSE, OP_PING, OP_PONG = 0x0, 0x1, 0x8, 0x9, 0xA
+
+
+class _Closed(Exception):
+    pass
+
+
+def _recv_exact(conn, n):
+    data = b""
+    while len(data) < n:
+        chunk = conn.recv(n - len(data))
+        if not chunk:
+            raise _Closed()
+        data += chunk
+    return data
+
+
+def origin_allowed(origin, extension_ids=None):
+    """True for the kiosk extension's origin; web pages and non-browser clients are refused."""
+    extension_ids = EXTENSION_IDS if extension_ids is None else extension_ids
+    prefix = "chrome-extension://"
+    if not origin.startswith(prefix):
+        return False
+    return not extension_ids or origin[len(prefix):].rstrip("/") in extension_ids
+
+
+def _handshake(conn):
+    request = b""
+    while b"\r\n\r\n" not in request:
+        chunk = conn.recv(1024)
+        if not chunk or len(request) > 8192:
+            raise _Closed()
+        request += chunk
+    lines = request.split(b"\r\n\r\n", 1)[0].decode("latin-1").split("\r\n")
+    path = lines[0].split(" ")[1] if len(lines[0].split(" ")) > 2 else ""
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    key = headers.get("sec-websocket-key")
+    if path != PRESENCE_PATH or headers.get("upgrade", "").lower() != "websocket" or not key:
+        conn.sendall(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+        raise _Closed()
+    origin = headers.get("origin", "")
+    if not origin_allowed(origin):
+        print(f"⚠️ Refused extension channel handshake from origin {origin!r}")
+        conn.sendall(b"HTTP/1.1 403 Forbidden\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+        raise _Closed()
+    accept = base64.b64encode(hashlib.sha1((key + _WS_GUID).encode("ascii")).digest()).decode("ascii")
+    conn.sendall(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                  f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode("ascii"))
+
+
+def _read_frame(conn):
+    first, second = _recv_exact(conn, 2)
+    fin, opcode = first & 0x80, first & 0x0F
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", _recv_exact(conn, 2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", _recv_exact(conn, 8))[0]
+    if length > MAX_MESSAGE:
+        raise _Closed()
+    mask = _recv_exact(conn, 4) if second & 0x80 else None
+    payload = _recv_exact(conn, length)
+    if mask:
+        payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+    return bool(fin), opcode, payload
+
+
+def _send_frame(conn, opcode, payload=b""):
+    header = bytes([0x80 | opcode])
+    if len(payload) < 126:
+        header += bytes([len(payload)])
+    elif len(payload) < 65536:
+        header += bytes([126]) + struct.pack("!H", len(payload))
+    else:
+        header += bytes([127]) + struct.pack("!Q", len(payload))
+    conn.sendall(header + payload)
+
+
+class ExtensionChannel:
+    """Accepts the extension's WebSocket and calls handler(status, url) for every status frame.
+
+    handler runs on the connection's thread and should return quickly;
+    collapsing repeats is left to it, since the extension may also have
+    reported over HTTP while the socket was down. A dict it returns is
+    merged into the ack.
+    """
+
+    def __init__(self, handler, address=PRESENCE_ADDRESS):
+        self.handler = handler
+        self._lock = threading.Lock()
+        self._status = None
+        self._closed = False
+        self.counters = {"connections": 0, "status_frames": 0, "transitions": 0, "heartbeats": 0,
+                         "timeouts": 0}
+        self.connected = 0
+        self.last_seen = None
+        self._listener = socket.create_server(address)
+        threading.Thread(target=self._accept, name="extension-accept", daemon=True).start()
+        print(f"📡 Extension channel listening on ws://{address[0]}:{address[1]}{PRESENCE_PATH}")
+
+    def _accept(self):
+        while not self._closed:
+            try:
+                conn, _ = self._listener.accept()
+            except OSError:
+                if self._closed:
+                    return
+                continue
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        conn.settimeout(HEARTBEAT_TIMEOUT)
+        with conn:
+            try:
+                _handshake(conn)
+            except (_Closed, OSError, IndexError):
+                return
+            with self._lock:
+                self.counters["connections"] += 1
+                self.connected += 1
+            print("🔌 Extension connected")
+            try:
+                self._read_messages(conn)
+            except socket.timeout:
+                with self._lock:
+                    self.counters["timeouts"] += 1
+                print(f"⚠️ Extension silent for {HEARTBEAT_TIMEOUT}s, dropping its connection")
+                try:
+                    _send_frame(conn, OP_CLOSE, struct.pack("!H", 1001))
+                except OSError:
+                    pass
+            except (_Closed, OSError):
+                pass
+            finally:
+                with self._lock:
+                    self.connected -= 1
+                print("🔌 Extension disconnected")
+
+    def _read_messages(self, conn):
+        parts = []
+        while True:
+            fin, opcode, payload = _read_frame(conn)
+            self.last_seen = time.time()
+            if opcode == OP_CLOSE:
+                _send_frame(conn, OP_CLOSE, payload[:2])
+                return
+            if opcode == OP_PING:
+                _send_frame(conn, OP_PONG, payload)
+                continue
+            if opcode == OP_PONG:
+                continue
+            if opcode in (OP_TEXT, OP_CONT):
+                parts.append(payload)
+                if sum(len(p) for p in parts) > MAX_MESSAGE:
+                    raise _Closed()
+                if fin:
+                    reply = self._handle(b"".join(parts))
+                    parts = []
+                    _send_frame(conn, OP_TEXT, json.dumps(reply).encode("utf-8"))
+
+    def _handle(self, raw):
+        try:
+            message = json.loads(raw.decode("utf-8"))
+        except ValueError:
+            return {"ack": None, "error": "Invalid JSON"}
+        kind = message.get("type") if isinstance(message, dict) else None
+        if kind == "heartbeat":
+            with self._lock:
+                self.counters["heartbeats"] += 1
+            return {"ack": "heartbeat"}
+        if kind != "status" or message.get("status") not in STATUSES:
+            return {"ack": None, "error": f"Unknown message {message!r}"}
+        status, url = message["status"], message.get("url")
+        with self._lock:
+            self.counters["status_frames"] += 1
+            if status != self._status:
+                self.counters["transitions"] += 1
+            self._status = status
+        try:
+            result = self.handler(status, url)
+        except Exception as e:
+            print(f"⚠️ Handling extension status {status!r} failed: {e}")
+            return {"ack": "status", "status": status, "error": str(e)}
+        return dict(result if isinstance(result, dict) else {}, ack="status", status=status)
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, connected=self.connected, status=self._status,
+                        last_seen=self.last_seen)
+
+    def close(self):
+        self._closed = True
+        self._listener.close()
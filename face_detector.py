@@ -0,0 +1,257 @@
+"""Face detector backends for the kiosk's face_detection_loop.
+
+Every backend takes a BGR frame and returns an (N, 5) float32 array of
+[x1, y1, x2, y2, conf] rows in frame pixels, so the distance maths in the
+loops doesn't care which one is running.
+
+The ONNX Runtime and OpenVINO backends load models exported from
+models/model.pt. Export them once on the kiosk with
+
+    python face_detector.py export
+
+and load_detector() picks the fastest one that is present, falling back to
+PyTorch and finally the Haar cascade. Wrap the result in FocusedDetector to
+run it on a downscaled crop around recent faces.
+"""
+import os
+import sys
+import time
+from collections import namedtuple
+import numpy as np
+import cv2
+
+MODEL_PATH = "models/model.pt"
+DETECTOR_BACKEND = os.environ.get("FACE_DETECTOR_BACKEND", "auto")
+BACKEND_ORDER = ("openvino", "onnx", "torch", "haar")
+CONFIDENCE = 0.4
+EXPORT_IMGSZ = 640
+HAAR_CASCADE = "haarcascade_frontalface_default.xml"
+MIN_DETECT_PX = 24  # smallest face side (in model pixels) the detector still finds reliably
+DETECT_RANGE_FACTOR = 1.5  # faces out to this multiple of the threshold distance must still be found
+MIN_IMGSZ = 96
+ROI_MARGIN = 1.0  # ROI padding around recent faces, in face widths
+ROI_TTL = 2.0  # seconds an ROI stays valid without a detection inside it
+FULL_FRAME_EVERY = 5  # every Nth inference scans the whole frame so new arrivals aren't missed
+
+_EMPTY = np.zeros((0, 5), dtype=np.float32)
+
+FaceMeasurements = namedtuple("FaceMeasurements", "boxes distances in_range nearest count_in_range")
+FaceMeasurements.__doc__ = """Per-frame result of measure_faces().
+
+boxes is an (N, 4) int32 array of x1, y1, x2, y2; distances the matching
+(N,) estimates in cm; in_range a boolean mask of distances under the
+threshold; nearest the smallest distance or None; count_in_range its sum.
+"""
+
+
+def exported_path(model_path, backend):
+    """Where the exported model for backend lives next to model_path."""
+    stem = os.path.splitext(model_path)[0]
+    if backend == "onnx":
+        return stem + ".onnx"
+    if backend == "openvino":
+        return stem + "_openvino_model"
+    return model_path
+
+
+def _is_fresh(model_path, exported):
+    if not os.path.exists(exported):
+        return False
+    # Kiosks may ship only the exports; without model.pt there is nothing for them to be stale against
+    return not os.path.exists(model_path) or os.path.getmtime(exported) >= os.path.getmtime(model_path)
+
+
+class YoloDetector:
+    """Ultralytics YOLO on any backend it can load (.pt, .onnx, OpenVINO dir)."""
+
+    def __init__(self, weights, backend, conf=CONFIDENCE):
+        from ultralytics import YOLO
+        self.name = backend
+        self.conf = conf
+        self.model = YOLO(weights, task="detect")
+
+    def detect(self, frame, imgsz=None):
+        kwargs = {"conf": self.conf, "verbose": False}
+        if imgsz is not None:
+            kwargs["imgsz"] = imgsz
+        boxes = self.model(frame, **kwargs)[0].boxes
+        if boxes is None or len(boxes) == 0:
+            return _EMPTY
+        out = np.empty((len(boxes), 5), dtype=np.float32)
+        out[:, :4] = boxes.xyxy.cpu().numpy()
+        out[:, 4] = boxes.conf.cpu().numpy()
+        return out
+
+
+class HaarDetector:
+    """OpenCV's frontal-face Haar cascade, the same one kiosk.py uses.
+
+    It has no confidence score, so every hit is reported with conf 1.0. Its
+    boxes are tighter than the YOLO model's, so A/B distances read a little
+    far with it; it is the last resort when no YOLO backend loads.
+    """
+
+    name = "haar"
+
+    def __init__(self, conf=CONFIDENCE):
+        self.conf = conf
+        self.cascade = cv2.CascadeClassifier(cv2.data.haarcascades + HAAR_CASCADE)
+        if self.cascade.empty():
+            raise RuntimeError(f"Could not load {HAAR_CASCADE}")
+
+    def detect(self, frame, imgsz=None):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        scale = 1.0
+        if imgsz is not None and max(gray.shape[:2]) > imgsz:
+            scale = imgsz / max(gray.shape[:2])
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        faces = self.cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5)
+        if len(faces) == 0:
+            return _EMPTY
+        faces = np.asarray(faces, dtype=np.float32) / scale
+        out = np.empty((len(faces), 5), dtype=np.float32)
+        out[:, 0:2] = faces[:, 0:2]
+        out[:, 2:4] = faces[:, 0:2] + faces[:, 2:4]
+        out[:, 4] = 1.0
+        return out
+
+
+def measure_faces(boxes, a, b, threshold_cm):
+    """Estimate every face's distance as a * area ** b in one pass over the box array."""
+    xyxy = boxes[:, :4].astype(np.int32)
+    if not len(xyxy):
+        return FaceMeasurements(xyxy, np.zeros(0), np.zeros(0, dtype=bool), None, 0)
+    area = (xyxy[:, 2] - xyxy[:, 0]) * (xyxy[:, 3] - xyxy[:, 1])
+    distances = a * np.power(np.maximum(area, 1).astype(np.float64), b)
+    in_range = distances < threshold_cm
+    return FaceMeasurements(xyxy, distances, in_range, float(distances.min()), int(in_range.sum()))
+
+
+def draw_faces(image, faces):
+    """Draw each face box with its distance, green when in range and red otherwise."""
+    for (x1, y1, x2, y2), distance, close in zip(faces.boxes.tolist(), faces.distances.tolist(),
+                                                  faces.in_range.tolist()):
+        color = (0, 255, 0) if close else (0, 0, 255)
+        cv2.rectangle(image, (x1, y1), (x2, y2), color, 2)
+        cv2.putText(image, f"{distance:.1f}cm", (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+    return image
+
+
+def face_side_at(distance_cm, a, b):
+    """Side in pixels of a square face box at distance_cm, inverting distance = a * area ** b."""
+    return ((distance_cm / a) ** (1 / b)) ** 0.5
+
+
+class FocusedDetector:
+    """Runs a detector on a downscaled, cropped view of the frame.
+
+    Faces we care about are at most DETECT_RANGE_FACTOR times the threshold
+    distance away, so they are at least face_side_at() that distance in
+    pixels; the input is shrunk until those faces are MIN_DETECT_PX wide.
+    After a hit, the next inferences only look at a padded region around
+    the recent faces, with a full-frame pass every FULL_FRAME_EVERY runs and
+    whenever the region comes up empty. Boxes are always returned in full
+    frame pixels so the A * area ** B distance is unchanged.
+    """
+
+    def __init__(self, detector, threshold_cm, a, b):
+        self.detector = detector
+        self.name = detector.name
+        self.min_face_px = face_side_at(threshold_cm * DETECT_RANGE_FACTOR, a, b)
+        self.scale = min(1.0, MIN_DETECT_PX / self.min_face_px)
+        self._roi = None
+        self._roi_seen = 0.0
+        self._runs = 0
+
+    def _imgsz(self, width, height):
+        side = max(width, height) * self.scale
+        return max(MIN_IMGSZ, int(-(-side // 32)) * 32)
+
+    def _detect_in(self, frame, x0, y0, x1, y1):
+        boxes = self.detector.detect(frame[y0:y1, x0:x1], imgsz=self._imgsz(x1 - x0, y1 - y0))
+        if len(boxes) and (x0 or y0):
+            boxes = boxes.copy()
+            boxes[:, [0, 2]] += x0
+            boxes[:, [1, 3]] += y0
+        return boxes
+
+    def _update_roi(self, boxes, width, height, now):
+        if not len(boxes):
+            return
+        w = boxes[:, 2] - boxes[:, 0]
+        h = boxes[:, 3] - boxes[:, 1]
+        x0 = int(max(0, (boxes[:, 0] - w * ROI_MARGIN).min()))
+        y0 = int(max(0, (boxes[:, 1] - h * ROI_MARGIN).min()))
+        x1 = int(min(width, (boxes[:, 2] + w * ROI_MARGIN).max()))
+        y1 = int(min(height, (boxes[:, 3] + h * ROI_MARGIN).max()))
+        self._roi = (x0, y0, x1, y1)
+        self._roi_seen = now
+
+    def detect(self, frame, imgsz=None):
+        height, width = frame.shape[:2]
+        now = time.monotonic()
+        self._runs += 1
+        boxes = None
+        use_roi = (self._roi is not None and now - self._roi_seen <= ROI_TTL
+                   and self._runs % FULL_FRAME_EVERY != 0)
+        if use_roi:
+            boxes = self._detect_in(frame, *self._roi)
+        if boxes is None or not len(boxes):
+            boxes = self._detect_in(frame, 0, 0, width, height)
+        self._update_roi(boxes, width, height, now)
+        return boxes
+
+
+def make_detector(backend, model_path=MODEL_PATH, conf=CONFIDENCE):
+    """Build one specific backend; raises if it can't be loaded."""
+    if backend == "haar":
+        return HaarDetector(conf)
+    if backend not in BACKEND_ORDER:
+        raise ValueError(f"Unknown detector backend {backend!r}")
+    weights = exported_path(model_path, backend)
+    if not os.path.exists(weights):
+        raise FileNotFoundError(f"{weights} not found")
+    if backend != "torch" and not _is_fresh(model_path, weights):
+        raise FileNotFoundError(f"{weights} is older than {model_path}; re-run the export")
+    return YoloDetector(weights, backend, conf)
+
+
+def load_detector(model_path=MODEL_PATH, backend=DETECTOR_BACKEND, conf=CONFIDENCE):
+    """Load the requested backend, or the first one that works for "auto"."""
+    order = BACKEND_ORDER if backend == "auto" else (backend,) + tuple(b for b in BACKEND_ORDER if b != backend)
+    for name in order:
+        try:
+            detector = make_detector(name, model_path, conf)
+        except Exception as e:
+            print(f"⚠️ Detector backend {name} unavailable: {e}")
+            continue
+        print(f"🧠 Face detector backend: {detector.name}")
+        return detector
+    raise RuntimeError("No face detector backend could be loaded")
+
+
+def export_models(model_path=MODEL_PATH, backends=("onnx", "openvino"), imgsz=EXPORT_IMGSZ, force=False):
+    """Export model_path for each backend unless an up-to-date export exists."""
+    from ultralytics import YOLO
+    model = YOLO(model_path)
+    for backend in backends:
+        target = exported_path(model_path, backend)
+        if not force and _is_fresh(model_path, target):
+            print(f"✅ {target} is up to date")
+            continue
+        try:
+            model.export(format=backend, imgsz=imgsz, dynamic=True)
+            # Touch the export so the freshness check holds even if the exporter kept an old mtime
+            os.utime(target)
+            print(f"✅ Exported {target}")
+        except Exception as e:
+            print(f"❌ Export to {backend} failed: {e}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "export":
+        print("Usage: python face_detector.py export [--force] [onnx] [openvino]")
+        sys.exit(1)
+    args = sys.argv[2:]
+    chosen = tuple(a for a in args if a in ("onnx", "openvino")) or ("onnx", "openvino")
+    export_models(backends=chosen, force="--force" in args)
@@ -0,0 +1,138 @@
+import time
+import numpy as np
+import cv2
+
+TRACK_SCALE = 0.5  # frames are shrunk by this before optical flow
+MAX_POINTS = 40  # corners followed per face
+MIN_POINTS = 6  # fewer surviving corners than this and the track is dropped
+MIN_CONFIDENCE = 0.5  # surviving fraction of corners below which YOLO re-runs
+FB_ERROR_PX = 1.0  # forward-backward flow error (in tracking pixels) a corner may have
+REDETECT_SECONDS = 1.0  # YOLO re-runs at least this often while faces are being tracked
+IOU_MATCH = 0.3  # IoU needed for a new detection to continue an existing track
+LK_PARAMS = dict(winSize=(15, 15), maxLevel=2,
+                 criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
+
+_EMPTY = np.zeros((0, 5), dtype=np.float32)
+
+
+def iou(box, boxes):
+    """IoU of one x1, y1, x2, y2 box against an (N, 4+) array of boxes."""
+    if not len(boxes):
+        return np.zeros(0)
+    x1 = np.maximum(box[0], boxes[:, 0])
+    y1 = np.maximum(box[1], boxes[:, 1])
+    x2 = np.minimum(box[2], boxes[:, 2])
+    y2 = np.minimum(box[3], boxes[:, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return inter / np.maximum(area + areas - inter, 1e-6)
+
+
+class FaceTracker:
+    """Follows detected faces between YOLO runs with pyramidal Lucas-Kanade flow.
+
+    start() seeds corners inside each detected box; update() moves every box
+    by the median corner motion and rescales it by the median spread change,
+    so the A * area ** B distance keeps moving smoothly between detections.
+    Each track's confidence is the fraction of its corners that survived a
+    forward-backward check; wants_detection() asks for YOLO when that drops,
+    when a track is lost, when REDETECT_SECONDS have passed, or when a run
+    is due with no tracks.
+    """
+
+    def __init__(self):
+        self.tracks = []
+        self._lost = False
+        self._previous = None
+        self._next_id = 1
+        self.last_detection = 0.0
+        self.detections = 0
+        self.tracked_frames = 0
+
+    def _grey(self, frame):
+        small = cv2.resize(frame, None, fx=TRACK_SCALE, fy=TRACK_SCALE, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+
+    def _seed(self, grey, box):
+        x1, y1, x2, y2 = (box[:4] * TRACK_SCALE).astype(int)
+        # Stay inside the face so corners on the background don't drag the box
+        dx, dy = (x2 - x1) // 5, (y2 - y1) // 5
+        mask = np.zeros_like(grey)
+        mask[max(0, y1 + dy):max(0, y2 - dy), max(0, x1 + dx):max(0, x2 - dx)] = 255
+        points = cv2.goodFeaturesToTrack(grey, MAX_POINTS, 0.01, 3, mask=mask)
+        if points is None or len(points) < MIN_POINTS:
+            return None
+        return points.astype(np.float32)
+
+    def start(self, frame, boxes):
+        """Replace the tracks with fresh detections, keeping ids of faces that overlap old tracks."""
+        grey = self._grey(frame)
+        old = np.array([t["box"] for t in self.tracks], dtype=np.float32).reshape(-1, 4)
+        tracks = []
+        for box in boxes:
+            points = self._seed(grey, box)
+            if points is None:
+                continue
+            overlap = iou(box, old)
+            if len(overlap) and overlap.max() >= IOU_MATCH:
+                track_id = self.tracks[int(overlap.argmax())]["id"]
+            else:
+                track_id, self._next_id = self._next_id, self._next_id + 1
+            tracks.append({"id": track_id, "box": box[:4].astype(np.float32), "score": float(box[4]),
+                           "points": points, "seeded": len(points), "confidence": 1.0})
+        self.tracks = tracks
+        self._lost = False
+        self._previous = grey
+        self.last_detection = time.monotonic()
+        self.detections += 1
+
+    def update(self, frame):
+        """Move every track to frame and return the surviving boxes as an (N, 5) array."""
+        if not self.tracks:
+            return _EMPTY
+        grey = self._grey(frame)
+        alive = []
+        for track in self.tracks:
+            p0 = track["points"]
+            p1, status, _ = cv2.calcOpticalFlowPyrLK(self._previous, grey, p0, None, **LK_PARAMS)
+            back, back_status, _ = cv2.calcOpticalFlowPyrLK(grey, self._previous, p1, None, **LK_PARAMS)
+            error = np.linalg.norm((p0 - back).reshape(-1, 2), axis=1)
+            good = (status.ravel() == 1) & (back_status.ravel() == 1) & (error < FB_ERROR_PX)
+            if good.sum() < MIN_POINTS:
+                continue
+            before = p0.reshape(-1, 2)[good]
+            after = p1.reshape(-1, 2)[good]
+            shift = np.median(after - before, axis=0) / TRACK_SCALE
+            spread0 = np.linalg.norm(before - before.mean(axis=0), axis=1)
+            spread1 = np.linalg.norm(after - after.mean(axis=0), axis=1)
+            usable = spread0 > 1e-3
+            scale = float(np.median(spread1[usable] / spread0[usable])) if usable.any() else 1.0
+            x1, y1, x2, y2 = track["box"]
+            cx, cy = (x1 + x2) / 2 + shift[0], (y1 + y2) / 2 + shift[1]
+            half_w, half_h = (x2 - x1) * scale / 2, (y2 - y1) * scale / 2
+            track["box"] = np.array([cx - half_w, cy - half_h, cx + half_w, cy + half_h], dtype=np.float32)
+            track["points"] = after.reshape(-1, 1, 2)
+            track["confidence"] = len(after) / track["seeded"]
+            alive.append(track)
+        # A face slipping away may just be fast motion, so look again straight away
+        self._lost = len(alive) < len(self.tracks)
+        self.tracks = alive
+        self._previous = grey
+        self.tracked_frames += 1
+        if not alive:
+            return _EMPTY
+        return np.array([list(t["box"]) + [t["score"]] for t in alive], dtype=np.float32)
+
+    def wants_detection(self, due):
+        """True if YOLO should run now; due is the scheduler's own verdict for this frame."""
+        if self._lost:
+            return True
+        if not self.tracks:
+            return due
+        if time.monotonic() - self.last_detection >= REDETECT_SECONDS:
+            return True
+        return min(t["confidence"] for t in self.tracks) < MIN_CONFIDENCE
+
+    def stats(self):
+        return {"tracks": len(self.tracks), "detections": self.detections, "tracked_frames": self.tracked_frames}
@@ -2,16 +2,22 @@ import cv2
 import time
 import threading
 import os
-import glob
 import subprocess
-from ultralytics import YOLO
+import tempfile
+from face_detector import load_detector, FocusedDetector, measure_faces
 import tkinter as tk
+from camera_capture import LatestFrameCapture
+from inference_scheduler import InferenceScheduler
+from face_tracker import FaceTracker
+from presence import PresenceMonitor
+from video_renditions import rendition_for
+from video_store import current_generation, video_folder_for, acquire_lease, release_lease
 
 # --- Distance calculation constants
 A = 9703.20
 B = -0.4911842338691967
 MODEL_PATH = "models/model.pt"
-VIDEO_FOLDER = os.path.join(os.path.dirname(__file__), 'videos')
+VIDEO_ROOT = os.path.dirname(os.path.abspath(__file__))  # holds videos.<n>/ generations and videos.current
 
 # Global face distance threshold (cm)
 FACE_DISTANCE_THRESHOLD = 110
@@ -25,13 +31,27 @@ class VideoScreensaver:
         screen_width = self.root.winfo_screenwidth()
         screen_height = self.root.winfo_screenheight()
         self.root.geometry(f"{screen_width}x{screen_height}+0+0")
-        self.video_files = glob.glob(os.path.join(VIDEO_FOLDER, '*.mp4'))
-        if not self.video_files:
+        # Lease the live generation first so garbage collection leaves it alone while it plays
+        generation = current_generation(VIDEO_ROOT)
+        acquire_lease(VIDEO_ROOT, generation)
+        video_folder = video_folder_for(VIDEO_ROOT, generation)
+        names = sorted(f for f in os.listdir(video_folder) if f.lower().endswith('.mp4')) \
+            if os.path.isdir(video_folder) else []
+        if not names:
+            release_lease(VIDEO_ROOT)
             raise RuntimeError("No video files found in videos folder!")
+        renditions = [rendition_for(VIDEO_ROOT, video_folder, name) for name in names]
+        self.video_files = [rendition or os.path.join(video_folder, name)
+                            for rendition, name in zip(renditions, names)]
+        # The concat demuxer needs every entry in the same codec, pixel format and
+        # timebase, which only the renditions guarantee (ffplay rescales each one
+        # to the screen itself); raw phone uploads are played one by one
+        self.gapless = all(renditions)
         self.current_video_index = 0
         self.visible = False
         self.running = False
         self.process = None
+        self.restart_gaps = []
 
     def show(self):
         if not self.visible:
@@ -40,30 +60,69 @@ class VideoScreensaver:
             threading.Thread(target=self._play_loop, daemon=True).start()
             self.visible = True
 
+    def _write_playlist(self):
+        """Write the clips, starting at the current one, as an ffmpeg concat list."""
+        fd, path = tempfile.mkstemp(prefix="screensaver_", suffix=".txt")
+        ordered = self.video_files[self.current_video_index:] + self.video_files[:self.current_video_index]
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            for video_path in ordered:
+                f.write("file '" + video_path.replace("'", "'\\''") + "'\n")
+        return path
+
+    def _spawn(self, cmd):
+        creation_flags = 0
+        if os.name == 'nt':
+            creation_flags = subprocess.CREATE_NO_WINDOW
+        self.process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            creationflags=creation_flags
+        )
+
     def _play_loop(self):
-        while self.running:
-            video_path = self.video_files[self.current_video_index]
-            cmd = ['ffplay', '-fs', '-autoexit', '-nodisp', video_path]
-            creation_flags = 0
-            if os.name == 'nt':
-                creation_flags = subprocess.CREATE_NO_WINDOW
+        try:
+            if self.gapless:
+                self._play_concat()
+            else:
+                self._play_each()
+        finally:
+            if self.process and self.process.poll() is None:
+                self.process.terminate()
+                self.process = None
 
-            self.process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-                creationflags=creation_flags
-            )
+    def _play_concat(self):
+        # One ffplay plays the whole playlist through the concat demuxer, so the
+        # next clip is already opened and decoding when the current one ends
+        # instead of a new process starting up between clips
+        playlist = self._write_playlist()
+        cmd = ['ffplay', '-fs', '-nodisp', '-loop', '0', '-f', 'concat', '-safe', '0', '-i', playlist]
+        exited_at = None
+        try:
+            while self.running:
+                self._spawn(cmd)
+                if exited_at is not None:
+                    gap_ms = (time.perf_counter() - exited_at) * 1000
+                    self.restart_gaps.append(gap_ms)
+                    print(f"🎞️ ffplay restarted after exiting, gap {gap_ms:.0f} ms")
+                self.process.wait()
+                exited_at = time.perf_counter()
+        finally:
+            os.remove(playlist)
 
+    def _play_each(self):
+        # Some clips have no rendition yet: one ffplay per clip, paying a process start at each boundary
+        exited_at = None
+        while self.running:
+            self._spawn(['ffplay', '-fs', '-autoexit', '-nodisp', self.video_files[self.current_video_index]])
+            if exited_at is not None:
+                self.restart_gaps.append((time.perf_counter() - exited_at) * 1000)
             self.process.wait()
+            exited_at = time.perf_counter()
             if not self.running:
                 break
             self.current_video_index = (self.current_video_index + 1) % len(self.video_files)
 
-        if self.process and self.process.poll() is None:
-            self.process.terminate()
-            self.process = None
-
     def hide(self):
         if self.visible:
             self.running = False
@@ -72,71 +131,64 @@ class VideoScreensaver:
                 self.process = None
             self.root.withdraw()
             self.visible = False
+            release_lease(VIDEO_ROOT)
 
 def face_detection_loop(root):
-    model = YOLO(MODEL_PATH)
+    detector = FocusedDetector(load_detector(MODEL_PATH), FACE_DISTANCE_THRESHOLD, A, B)
     while True:
-        cap = cv2.VideoCapture(0)
-        if not cap.isOpened():
+        cap = LatestFrameCapture(0)
+        if not cap.start():
+            cap.release()
             print("Unable to access webcam. Retrying in 5 seconds...")
             time.sleep(5)
             continue
-        no_face_start = None
         screensaver = None
-        frame_count = 0
-        last_face_in_range = False
+        scheduler = InferenceScheduler(FACE_DISTANCE_THRESHOLD)
+        tracker = FaceTracker()
+        presence = PresenceMonitor(FACE_DISTANCE_THRESHOLD, NO_FACE_TIMER_SECONDS)
+        nearest = None
         try:
             while True:
-                ret, frame = cap.read()
-                if not ret:
+                frame = cap.read()
+                if frame is None:
                     print("Failed to grab frame.")
                     break
-                frame_count += 1
-                if frame_count % 5 == 0:
-                    results = model(frame, conf=0.4, verbose=False)
-                    detections = results[0].boxes
-                    face_in_range = False
-                    if detections is not None:
-                        for box in detections:
-                            conf = float(box.conf[0])
-                            if conf < 0.4:
-                                continue
-                            x1, y1, x2, y2 = map(int, box.xyxy[0])
-                            area_px = (x2 - x1) * (y2 - y1)
-                            distance = A * (area_px ** B)
-                            if distance < FACE_DISTANCE_THRESHOLD:
-                                face_in_range = True
-                                break
-                    last_face_in_range = face_in_range
-                else:
-                    face_in_range = last_face_in_range
+                if tracker.wants_detection(scheduler.should_infer(frame)):
+                    boxes = detector.detect(frame)
+                    tracker.start(frame, boxes)
+                    nearest = measure_faces(boxes, A, B, FACE_DISTANCE_THRESHOLD).nearest
+                    scheduler.record(nearest)
+                elif tracker.tracks:
+                    nearest = measure_faces(tracker.update(frame), A, B, FACE_DISTANCE_THRESHOLD).nearest
+                presence.update(nearest)
 
-                now = time.time()
-                if not face_in_range:
-                    if no_face_start is None:
-                        no_face_start = now
-                    elif now - no_face_start >= NO_FACE_TIMER_SECONDS:
-                        if screensaver is None:
-                            def create_screensaver():
-                                nonlocal screensaver
+                if not presence.present:
+                    if screensaver is None:
+                        def create_screensaver():
+                            nonlocal screensaver
+                            if screensaver is None:
                                 screensaver = VideoScreensaver(root)
                                 screensaver.show()
-                            if root.winfo_exists():
-                                root.after(0, create_screensaver)
+                                presence.count("screensaver_starts")
+                        if root.winfo_exists():
+                            root.after(0, create_screensaver)
                 else:
-                    no_face_start = None
                     if screensaver is not None:
                         def destroy_screensaver():
                             nonlocal screensaver
                             if screensaver is not None:
                                 screensaver.hide()
                                 screensaver = None
+                                presence.count("screensaver_stops")
                         if root.winfo_exists():
                             root.after(0, destroy_screensaver)
+                time.sleep(scheduler.sleep_time())
         except KeyboardInterrupt:
             print("\nExiting...")
             break
         finally:
+            print(f"📷 Capture stats: {cap.stats()}")
+            presence.flush()
             cap.release()
             cv2.destroyAllWindows()
             if screensaver is not None:
@@ -0,0 +1,73 @@
+import time
+import cv2
+
+IDLE_INTERVAL = 2.0  # seconds between heartbeat inferences when nothing moves
+MOTION_INTERVAL = 0.3  # seconds between inferences while something moves at a distance
+NEAR_INTERVAL = 0.05  # seconds between inferences while a face hovers around the threshold
+NEAR_MARGIN_CM = 40  # how far either side of the threshold counts as "near"
+IDLE_POLL = 0.2  # seconds to sleep between motion checks when idle
+ACTIVE_POLL = 0.02
+MOTION_SIZE = (80, 60)  # frames are shrunk to this before differencing
+MOTION_PIXEL_DELTA = 25  # grey-level change for a pixel to count as moving
+MOTION_FRACTION = 0.01  # fraction of moving pixels that counts as motion
+
+
+class InferenceScheduler:
+    """Decides when a face_detection_loop should run YOLO on the current frame.
+
+    A tiny greyscale frame difference acts as a motion gate: with nothing
+    moving YOLO only runs as a slow heartbeat, motion triggers an inference
+    straight away, and while the nearest face is within NEAR_MARGIN_CM of
+    the threshold it runs at the high rate so arrivals are picked up fast.
+    """
+
+    def __init__(self, threshold_cm):
+        self.threshold_cm = threshold_cm
+        self.state = "idle"
+        self._previous = None
+        self._last_inference = 0.0
+        self.inferences = 0
+        self.frames_seen = 0
+
+    def _moved(self, frame):
+        small = cv2.resize(frame, MOTION_SIZE, interpolation=cv2.INTER_AREA)
+        grey = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        grey = cv2.GaussianBlur(grey, (5, 5), 0)
+        previous, self._previous = self._previous, grey
+        if previous is None:
+            return True
+        changed = cv2.absdiff(grey, previous) > MOTION_PIXEL_DELTA
+        return changed.mean() >= MOTION_FRACTION
+
+    def interval(self):
+        return {"near": NEAR_INTERVAL, "motion": MOTION_INTERVAL}.get(self.state, IDLE_INTERVAL)
+
+    def should_infer(self, frame, now=None):
+        """True if YOLO should run on this frame."""
+        now = time.monotonic() if now is None else now
+        self.frames_seen += 1
+        moved = self._moved(frame)
+        if moved and self.state == "idle":
+            self.state = "motion"
+            return True
+        if not moved and self.state == "motion":
+            self.state = "idle"
+        return now - self._last_inference >= self.interval()
+
+    def record(self, nearest_cm, now=None):
+        """Feed back the nearest face distance from the inference just run (None if no face)."""
+        self._last_inference = time.monotonic() if now is None else now
+        self.inferences += 1
+        if nearest_cm is not None and abs(nearest_cm - self.threshold_cm) <= NEAR_MARGIN_CM:
+            self.state = "near"
+        elif nearest_cm is not None:
+            self.state = "motion"
+        elif self.state == "near":
+            self.state = "motion"
+
+    def sleep_time(self):
+        """How long the loop can sleep before looking at the next frame."""
+        return IDLE_POLL if self.state == "idle" else ACTIVE_POLL
+
+    def stats(self):
+        return {"state": self.state, "frames": self.frames_seen, "inferences": self.inferences}
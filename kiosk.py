@@ -60,10 +60,24 @@ class KioskApp(QtWidgets.QMainWindow):
         self.stack = QtWidgets.QStackedWidget(self)
         self.setCentralWidget(self.stack)
 
-        self.video_widget = QtMultimediaWidgets.QVideoWidget()
-        self.player = QtMultimedia.QMediaPlayer(None, QtMultimedia.QMediaPlayer.VideoSurface)
-        self.player.setVideoOutput(self.video_widget)
-        self.stack.addWidget(self.video_widget)
+        # Two players take turns: while one plays, the other has the next clip
+        # loaded and paused on its first frame, ready to swap in when it ends
+        self.video_stack = QtWidgets.QStackedWidget()
+        self.players = []
+        for _ in range(2):
+            video_widget = QtMultimediaWidgets.QVideoWidget()
+            player = QtMultimedia.QMediaPlayer(None, QtMultimedia.QMediaPlayer.VideoSurface)
+            player.setVideoOutput(video_widget)
+            player.mediaStatusChanged.connect(self.on_media_status)
+            player.stateChanged.connect(self.on_player_state)
+            self.video_stack.addWidget(video_widget)
+            self.players.append(player)
+        self.stack.addWidget(self.video_stack)
+        self.active = 0
+        self.next_clip = 0
+        self.loaded = False
+        self._ended_at = None
+        self.transition_gaps = []
 
         self.web_view = QtWebEngineWidgets.QWebEngineView()
         self.web_view.load(QtCore.QUrl(SPA_URL))
@@ -75,21 +89,63 @@ class KioskApp(QtWidgets.QMainWindow):
 
         self.play_video()
 
-    def play_video(self):
-        files = [f for f in os.listdir(VIDEOS_DIR) if f.lower().endswith(('.mp4','.avi','.mov'))]
+    def list_videos(self):
+        files = sorted(f for f in os.listdir(VIDEOS_DIR) if f.lower().endswith(('.mp4','.avi','.mov')))
+        return [os.path.join(VIDEOS_DIR, f) for f in files]
+
+    def load_next(self, player):
+        """Load the next clip of the playlist into player and pause it on its first frame."""
+        files = self.list_videos()
         if not files:
             print("No video files found in", VIDEOS_DIR)
-            return
-        video_path = os.path.join(VIDEOS_DIR, files[0])
-        url = QtCore.QUrl.fromLocalFile(video_path)
-        self.player.setMedia(QtMultimedia.QMediaContent(url))
-        self.player.play()
+            return False
+        self.next_clip %= len(files)
+        url = QtCore.QUrl.fromLocalFile(files[self.next_clip])
+        player.setMedia(QtMultimedia.QMediaContent(url))
+        player.pause()
+        self.next_clip += 1
+        return True
+
+    def play_video(self):
+        if self.stack.currentIndex() == 0 and self.loaded:
+            return  # already playing; face_lost repeats while nobody is around
+        if not self.loaded:
+            if not self.load_next(self.players[self.active]):
+                return
+            self.load_next(self.players[1 - self.active])
+            self.loaded = True
+        self.players[self.active].play()
         self.stack.setCurrentIndex(0)
 
     def show_website(self):
+        if self.stack.currentIndex() == 1:
+            return
+        self.players[self.active].pause()
         self.web_view.load(QtCore.QUrl(SPA_URL))
         self.stack.setCurrentIndex(1)
 
+    @QtCore.pyqtSlot(QtMultimedia.QMediaPlayer.MediaStatus)
+    def on_media_status(self, status):
+        if status != QtMultimedia.QMediaPlayer.EndOfMedia or self.sender() is not self.players[self.active]:
+            return
+        # Swap to the player that already has the next clip decoded
+        self._ended_at = time.perf_counter()
+        self.active = 1 - self.active
+        self.video_stack.setCurrentIndex(self.active)
+        self.players[self.active].play()
+
+    @QtCore.pyqtSlot(QtMultimedia.QMediaPlayer.State)
+    def on_player_state(self, state):
+        if (state != QtMultimedia.QMediaPlayer.PlayingState or self._ended_at is None
+                or self.sender() is not self.players[self.active]):
+            return
+        gap_ms = (time.perf_counter() - self._ended_at) * 1000
+        self._ended_at = None
+        self.transition_gaps.append(gap_ms)
+        print(f"🎞️ Clip transition gap {gap_ms:.1f} ms "
+              f"(mean {sum(self.transition_gaps) / len(self.transition_gaps):.1f} ms)")
+        self.load_next(self.players[1 - self.active])
+
     @QtCore.pyqtSlot()
     def on_face_detected(self):
         self.show_website()
@@ -1,26 +1,38 @@
-from flask import Flask, request, jsonify, send_from_directory, render_template_string
+from flask import Flask, request, jsonify
 import cv2
 import time
 import threading
 import os
 import requests
 import zipfile
-from io import BytesIO
 from datetime import datetime
 import atexit
 import sys
 import subprocess
-from ultralytics import YOLO
-import glob
-import shutil
+from face_detector import load_detector, FocusedDetector, measure_faces
+from video_store import sync_generation, video_folder_for
+from video_renditions import ingest_renditions
+from video_serving import video_response
+from playlist_index import PlaylistIndex
+from screensaver_page import screensaver_page
+from download_jobs import DownloadJobs
+from camera_capture import LatestFrameCapture
+from inference_scheduler import InferenceScheduler
+from face_tracker import FaceTracker
+from presence import PresenceMonitor
+from wsgi_server import serve
+from extension_channel import ExtensionChannel
+from page_state import PageStateMachine
 
 app = Flask(__name__)
 
 # --- Configuration
 TARGET_URL = "https://meghavi-kiosk-outlet.onrender.com/shop/67e22caf39c9f87925bea576/RelaxationTherapy"
 DOWNLOAD_URL = "http://meghavi-kiosk-api.onrender.com/api/videos/download-all"
-VIDEO_FOLDER = os.path.join(os.path.dirname(__file__), 'videos')
-EXTRACT_DIR = "downloaded_videos"
+MANIFEST_URL = "http://meghavi-kiosk-api.onrender.com/api/videos/manifest"  # optional, falls back to the zip directory
+DOWNLOAD_CONNECTIONS = 4  # parallel Range connections for large transfers; 1 disables segmenting
+VIDEO_ROOT = os.path.dirname(os.path.abspath(__file__))  # holds videos.<n>/ generations and videos.current
+playlist_index = PlaylistIndex(VIDEO_ROOT)
 MODEL_PATH = "models/model.pt"
 FACE_DISTANCE_THRESHOLD = 110  # cm
 NO_FACE_TIMER_SECONDS = 5  # seconds
@@ -31,6 +43,7 @@ B = -0.4911842338691967  # Distance calculation constant
 _screensaver_proc = None
 _face_detection_thread = None
 _stop_face_detection = threading.Event()
+_presence = None
 
 def start_screensaver():
     global _screensaver_proc
@@ -64,61 +77,53 @@ def stop_screensaver():
         _screensaver_proc = None
 
 def face_detection_loop():
-    global _screensaver_proc
-    if not os.path.exists(MODEL_PATH):
-        print(f"Error: Model file {MODEL_PATH} not found.")
+    global _screensaver_proc, _presence
+    # load_detector falls back to the exported ONNX/OpenVINO models or Haar when model.pt is missing
+    try:
+        detector = FocusedDetector(load_detector(MODEL_PATH), FACE_DISTANCE_THRESHOLD, A, B)
+    except RuntimeError as e:
+        print(f"Error: {e}")
         return
-    model = YOLO(MODEL_PATH)
     try:
-        cap = cv2.VideoCapture(0)
-        if not cap.isOpened():
+        cap = LatestFrameCapture(0)
+        if not cap.start():
             print("Unable to access webcam.")
             return
-        frame_count = 0
-        no_face_start = None
-        last_face_in_range = False
+        scheduler = InferenceScheduler(FACE_DISTANCE_THRESHOLD)
+        tracker = FaceTracker()
+        _presence = PresenceMonitor(FACE_DISTANCE_THRESHOLD, NO_FACE_TIMER_SECONDS)
+        nearest = None
         while not _stop_face_detection.is_set():
-            ret, frame = cap.read()
-            if not ret:
+            frame = cap.read()
+            if frame is None:
                 print("Failed to grab frame.")
                 break
-            frame_count += 1
-            if frame_count % 5 == 0:  # Process every 5th frame
-                results = model(frame, conf=0.4, verbose=False)
-                detections = results[0].boxes
-                face_in_range = False
-                if detections is not None:
-                    for box in detections:
-                        conf = float(box.conf[0])
-                        if conf < 0.4:
-                            continue
-                        x1, y1, x2, y2 = map(int, box.xyxy[0])
-                        area_px = (x2 - x1) * (y2 - y1)
-                        distance = A * (area_px ** B)
-                        if distance < FACE_DISTANCE_THRESHOLD:
-                            face_in_range = True
-                            break
-                last_face_in_range = face_in_range
-            else:
-                face_in_range = last_face_in_range
-            now = time.time()
-            if not face_in_range:
-                if no_face_start is None:
-                    no_face_start = now
-                elif now - no_face_start >= NO_FACE_TIMER_SECONDS:
-                    if _screensaver_proc is None or _screensaver_proc.poll() is not None:
-                        start_screensaver()
+            if tracker.wants_detection(scheduler.should_infer(frame)):
+                boxes = detector.detect(frame)
+                tracker.start(frame, boxes)
+                nearest = measure_faces(boxes, A, B, FACE_DISTANCE_THRESHOLD).nearest
+                scheduler.record(nearest)
+            elif tracker.tracks:
+                nearest = measure_faces(tracker.update(frame), A, B, FACE_DISTANCE_THRESHOLD).nearest
+            _presence.update(nearest)
+            if not _presence.present:
+                if _screensaver_proc is None or _screensaver_proc.poll() is not None:
+                    if start_screensaver():
+                        _presence.count("screensaver_starts")
             else:
-                no_face_start = None
                 if _screensaver_proc is not None and _screensaver_proc.poll() is None:
                     stop_screensaver()
-            time.sleep(0.05)  # Reduce CPU usage
+                    _presence.count("screensaver_stops")
+            time.sleep(scheduler.sleep_time())  # Reduce CPU usage while idle
     except KeyboardInterrupt:
         print("\nExiting face detection...")
     finally:
+        print(f"📷 Capture stats: {cap.stats()}")
         cap.release()
         cv2.destroyAllWindows()
         stop_screensaver()
+        if _presence is not None:
+            _presence.flush()
 
 def start_face_detection():
     global _face_detection_thread, _stop_face_detection
@@ -148,56 +153,53 @@ def cleanup():
 
 atexit.register(cleanup)
 
+# Static page; it fetches the clip list from /playlist
+SCREENSAVER_PAGE = screensaver_page(fit="fill")
+
 @app.route('/')
 def index():
-    video_files = [os.path.basename(f) for f in glob.glob(os.path.join(VIDEO_FOLDER, '*.mp4'))]
-    html = '''
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Screensaver</title>
-        <style>
-            body, html {
-                margin: 0;
-                padding: 0;
-                width: 100%;
-                height: 100%;
-                overflow: hidden;
-                background: black;
-            }
-            video {
-                width: 100%;
-                height: 100%;
-                object-fit: fill;
-            }
-        </style>
-    </head>
-    <body>
-        <video id="videoPlayer" autoplay>
-            <source src="/videos/{{ videos[0] }}" type="video/mp4">
-            Your browser does not support the video tag.
-        </video>
-        <script>
-            const videos = {{ videos | tojson }};
-            let currentVideoIndex = 0;
-            const videoPlayer = document.getElementById('videoPlayer');
-            videoPlayer.onended = function() {
-                currentVideoIndex = (currentVideoIndex + 1) % videos.length;
-                videoPlayer.src = '/videos/' + videos[currentVideoIndex];
-                videoPlayer.play();
-            };
-        </script>
-    </body>
-    </html>
-    '''
-    return render_template_string(html, videos=video_files)
+    return SCREENSAVER_PAGE.response()
+
+@app.route('/playlist')
+def playlist():
+    return playlist_index.response()
 
 @app.route('/videos/<filename>')
 def serve_video(filename):
-    return send_from_directory(VIDEO_FOLDER, filename)
+    # ?g= pins the generation the page started the clip from, so a switch mid-clip is harmless
+    folder = video_folder_for(VIDEO_ROOT, request.args.get('g'))
+    # ?v= is the clip's content hash from the page; such URLs are cached as immutable
+    return video_response(VIDEO_ROOT, folder, filename, request.args.get('v'))
+
+@app.route('/presence-metrics')
+def presence_metrics():
+    running = _face_detection_thread is not None and _face_detection_thread.is_alive()
+    if _presence is None:
+        return jsonify({"running": running})
+    return jsonify(dict(_presence.stats(), running=running))
+
+def enter_target_page(url):
+    print(f"✅ User ENTERED target page: {url} - Starting face detection")
+    start_face_detection()
+
+def leave_target_page(url):
+    print(f"🚪 User LEFT target page or on wrong URL: {url} - Stopping face detection")
+    stop_face_detection()
+
+# Repeats are dropped and quick enter/left flaps collapse; stopping face detection
+# (which joins its thread) runs on the state machine's worker, not on the request thread
+page_state = PageStateMachine({"entered": enter_target_page, "left": leave_target_page})
 
+def handle_url_event(status, url):
+    """Queue a page transition; None if status is unknown."""
+    if status == "entered" and url != TARGET_URL:
+        status = "left"
+    result = page_state.submit(status, url)
+    if result is None:
+        print(f"⚠️ Unknown status: {status!r} ({url})")
+    return result
+
+# Older extensions POST here; current ones push transitions over the extension channel
 @app.route('/url_matched', methods=['POST'])
 def url_matched():
     data = request.get_json()
@@ -205,45 +207,56 @@ def url_matched():
         print(f"⚠️ Invalid request data: {data}")
         return jsonify({"error": "Missing status or url"}), 400
 
-    status = data.get("status")
-    url = data.get("url")
-
-    if status == "entered" and url == TARGET_URL:
-        print(f"✅ User ENTERED target page: {url} - Starting face detection")
-        start_face_detection()
-    elif status == "left" or (status == "entered" and url != TARGET_URL):
-        print(f"🚪 User LEFT target page or on wrong URL: {url} - Stopping face detection")
-        stop_face_detection()
-    else:
-        print(f"⚠️ Unknown status: {data}")
+    result = handle_url_event(data.get("status"), data.get("url"))
+    if result is None:
         return jsonify({"error": "Invalid status"}), 400
-    
-    return jsonify({"status": "received"}), 200
+    return jsonify(dict(result, status="received")), 200
 
-@app.route('/trigger-download', methods=['POST'])
-def trigger_download():
+@app.route('/page-state')
+def page_state_metrics():
+    return jsonify(page_state.stats()), 200
+
+def run_download(progress):
+    print(f"[{datetime.now()}] Download started...")
     try:
-        print(f"[{datetime.now()}] Download started...")
-        response = requests.get(DOWNLOAD_URL, timeout=30)
-        response.raise_for_status()
-        with zipfile.ZipFile(BytesIO(response.content)) as zip_ref:
-            os.makedirs(EXTRACT_DIR, exist_ok=True)
-            zip_ref.extractall(EXTRACT_DIR)
-        videos_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'videos')
-        if os.path.exists(videos_path):
-            shutil.rmtree(videos_path)
-        os.rename(EXTRACT_DIR, videos_path)
-        print(f"[{datetime.now()}] Download complete. Extracted to 'videos'")
-        return jsonify({"status": "Downloaded and extracted, videos folder replaced"}), 200
+        # Only new or changed clips are fetched; clips removed upstream are deleted.
+        # Clips are synced into a new videos.<n> generation that goes live atomically
+        stats = sync_generation(DOWNLOAD_URL, VIDEO_ROOT, MANIFEST_URL, timeout=30, progress=progress,
+                                connections=DOWNLOAD_CONNECTIONS)
     except requests.exceptions.RequestException as e:
         print(f"❌ Network error: {e}")
-        return jsonify({"error": f"Network error: {str(e)}"}), 500
+        raise RuntimeError(f"Network error: {str(e)}")
     except zipfile.BadZipFile as e:
         print(f"❌ Corrupt zip file: {e}")
-        return jsonify({"error": "Corrupt zip file"}), 500
-    except Exception as e:
-        print(f"❌ Error: {e}")
-        return jsonify({"error": str(e)}), 500
+        raise RuntimeError("Corrupt zip file")
+    # Transcode new clips to the screen's resolution once; players pick the renditions up as they land
+    stats["renditions"] = ingest_renditions(VIDEO_ROOT)
+    playlist_index.invalidate()
+    print(f"[{datetime.now()}] Download complete. Now playing {stats['generation']}")
+    return stats
+
+download_jobs = DownloadJobs(run_download)
+
+@app.route('/trigger-download', methods=['POST'])
+def trigger_download():
+    # Returns at once; duplicate triggers while a download is queued or running share its job
+    job = download_jobs.submit()
+    return jsonify({"job_id": job["id"], "state": job["state"], "duplicate": job["duplicate"],
+                    "status_url": f"/download-status/{job['id']}"}), 202
+
+@app.route('/download-status/<job_id>')
+def download_status(job_id):
+    job = download_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job id"}), 404
+    return jsonify(job), 200
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000)
\ No newline at end of file
+    extension = ExtensionChannel(handle_url_event)
+    serve(app, port=5000, host='0.0.0.0')
+    extension.close()
+    print(f"📡 Extension channel: {extension.stats()}")
+    page_state.close()
+    print(f"📄 Page state: {page_state.stats()}")
+    # The face detection thread isn't a daemon; stop it before the interpreter waits on it
+    stop_face_detection()
\ No newline at end of file
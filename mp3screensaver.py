@@ -3,7 +3,8 @@ import sys
 import time
 import cv2
 from multiprocessing import Process
-from ultralytics import YOLO
+from face_detector import load_detector, FocusedDetector, measure_faces
+from presence import PresenceMonitor
 
 # VLC setup
 vlc_path = r"C:\Program Files\VideoLAN\VLC"
@@ -60,14 +61,14 @@ def run_vlc_loop_all_videos():
 
 def face_detection_loop():
     """Runs face detection and controls VLC screensaver logic."""
-    model = YOLO(MODEL_PATH)
+    detector = FocusedDetector(load_detector(MODEL_PATH), FACE_DISTANCE_THRESHOLD, A, B)
     cap = cv2.VideoCapture(0)
     if not cap.isOpened():
         print("🚫 Could not access webcam.")
         return
 
     screensaver_proc = None
-    no_face_time = None
+    presence = PresenceMonitor(FACE_DISTANCE_THRESHOLD, NO_FACE_TIMER_SECONDS)
 
     try:
         while True:
@@ -75,32 +76,19 @@ def face_detection_loop():
             if not ret:
                 break
 
-            results = model(frame, conf=0.4, verbose=False)
-            boxes = results[0].boxes
-            face_in_range = False
-
-            if boxes is not None:
-                for box in boxes:
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])
-                    area = (x2 - x1) * (y2 - y1)
-                    distance = A * (area ** B)
-                    if distance < FACE_DISTANCE_THRESHOLD:
-                        face_in_range = True
-                        break
-
-            if face_in_range:
-                no_face_time = None
+            faces = measure_faces(detector.detect(frame), A, B, FACE_DISTANCE_THRESHOLD)
+            presence.update(faces.nearest)
+
+            if presence.present:
                 if screensaver_proc and screensaver_proc.is_alive():
                     screensaver_proc.terminate()
                     screensaver_proc.join()
                     screensaver_proc = None
-            else:
-                if no_face_time is None:
-                    no_face_time = time.time()
-                elif time.time() - no_face_time >= NO_FACE_TIMER_SECONDS:
-                    if not (screensaver_proc and screensaver_proc.is_alive()):
-                        screensaver_proc = Process(target=run_vlc_loop_all_videos)
-                        screensaver_proc.start()
+                    presence.count("screensaver_stops")
+            elif not (screensaver_proc and screensaver_proc.is_alive()):
+                screensaver_proc = Process(target=run_vlc_loop_all_videos)
+                screensaver_proc.start()
+                presence.count("screensaver_starts")
 
             time.sleep(0.1)
 
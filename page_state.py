@@ -0,0 +1,117 @@
+"""Debounced page state for the Chrome extension's entered/left events.
+
+/url_matched and the extension channel both hand their events to one
+PageStateMachine. submit() only records the state the kiosk should end up
+in and returns at once: a repeat of the state already wanted is dropped,
+and a worker thread applies a new state only after it has held for
+DEBOUNCE_SECONDS, so an entered/left flap collapses into nothing instead
+of starting and killing the screensaver. Actions run one at a time on
+that worker, never on a request thread.
+
+An action that raises is counted as a failure and the machine goes back
+to the previous state, so the next submit of that state retries it.
+stats() reports the dropped duplicates, collapsed flaps and, per state,
+the latency from the first request for a transition to its action
+finishing (debounce included).
+"""
+import time
+import threading
+from collections import deque
+
+DEBOUNCE_SECONDS = 0.5  # a new state must hold this long before it is applied
+LATENCY_SAMPLES = 100  # recent transition latencies kept per state
+
+
+class PageStateMachine:
+    """Applies actions[state](url) on a worker thread, once per debounced state change."""
+
+    def __init__(self, actions, debounce=DEBOUNCE_SECONDS):
+        self.actions = actions
+        self.debounce = debounce
+        self._cond = threading.Condition()
+        self._closed = False
+        self._applied = None
+        self._desired = None
+        self._url = None
+        self._changed_at = None
+        self._requested_at = None
+        self.counters = {"events": 0, "dropped_duplicates": 0, "debounced": 0, "transitions": 0,
+                         "failures": 0}
+        self._latencies = {state: deque(maxlen=LATENCY_SAMPLES) for state in actions}
+        self._worker = threading.Thread(target=self._work, name="page-state", daemon=True)
+        self._worker.start()
+
+    def submit(self, state, url=None):
+        """Record the wanted state; returns {"state", "duplicate", "pending"}, or None if state is unknown."""
+        if state not in self.actions:
+            return None
+        now = time.monotonic()
+        with self._cond:
+            self.counters["events"] += 1
+            if state == self._desired:
+                self.counters["dropped_duplicates"] += 1
+                return {"state": state, "duplicate": True, "pending": state != self._applied}
+            self._desired, self._url, self._changed_at = state, url, now
+            if state == self._applied:
+                # Flapped back before the other state was applied
+                self.counters["debounced"] += 1
+                self._requested_at = None
+            elif self._requested_at is None:
+                self._requested_at = now
+            self._cond.notify()
+            return {"state": state, "duplicate": False, "pending": state != self._applied}
+
+    def _next_transition(self):
+        with self._cond:
+            while not self._closed:
+                if self._desired != self._applied:
+                    remaining = self._changed_at + self.debounce - time.monotonic()
+                    if remaining <= 0:
+                        previous, state = self._applied, self._desired
+                        url, requested_at = self._url, self._requested_at
+                        # Committed now: anything submitted while the action runs is a new transition
+                        self._applied, self._requested_at = state, None
+                        return previous, state, url, requested_at
+                    self._cond.wait(remaining)
+                else:
+                    self._cond.wait()
+            return None
+
+    def _work(self):
+        while True:
+            transition = self._next_transition()
+            if transition is None:
+                return
+            previous, state, url, requested_at = transition
+            try:
+                self.actions[state](url)
+            except Exception as e:
+                print(f"⚠️ Applying page state {state!r} failed: {e}")
+                with self._cond:
+                    self.counters["failures"] += 1
+                    # Back to where we were, so the next submit of this state tries again
+                    # instead of being dropped as a duplicate
+                    self._applied = previous
+                    if self._desired == state:
+                        self._desired = previous
+                    if self._desired == self._applied:
+                        self._requested_at = None
+                continue
+            with self._cond:
+                self.counters["transitions"] += 1
+                self._latencies[state].append((time.monotonic() - requested_at) * 1000)
+
+    def stats(self):
+        with self._cond:
+            latency = {state: {"count": len(samples),
+                               "last_ms": round(samples[-1], 1) if samples else None,
+                               "mean_ms": round(sum(samples) / len(samples), 1) if samples else None,
+                               "max_ms": round(max(samples), 1) if samples else None}
+                       for state, samples in self._latencies.items()}
+            return dict(self.counters, state=self._applied, pending=self._desired != self._applied,
+                        latency=latency)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
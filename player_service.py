@@ -0,0 +1,147 @@
+import time
+import queue
+import threading
+from multiprocessing import Process, Pipe
+
+ACK_TIMEOUT = 5.0  # seconds to wait for the player to acknowledge a command
+COMMAND_POLL_MS = 20  # how often a Tk player checks for commands from the reader thread
+
+
+class PlayerService:
+    """Parent side of a long-lived screensaver player process.
+
+    target(conn) runs once in the child and keeps its player and window warm
+    for the life of the kiosk. Commands arrive as (name, seq) and each must
+    be answered with ("ack", seq, name, ok); the sequence id keeps a late
+    ack for a command that already timed out from being taken for the next
+    one. The child may also send ("event", name) on its own, e.g.
+    "dismissed" when someone clicks the screensaver away.
+    Round-trip latency of every command is kept for stats().
+    """
+
+    def __init__(self, target):
+        self._target = target
+        self._conn = None
+        self._proc = None
+        self._events = []
+        self._seq = 0
+        self.latencies = {}
+
+    def start(self):
+        self._conn, child = Pipe()
+        self._proc = Process(target=self._target, args=(child,), daemon=True)
+        self._proc.start()
+        child.close()
+        print(f"🎬 Player service started (PID {self._proc.pid})")
+
+    def is_alive(self):
+        return self._proc is not None and self._proc.is_alive()
+
+    def command(self, name, timeout=ACK_TIMEOUT):
+        """Send a command and wait for its ack; returns the ack's ok flag (False on timeout)."""
+        if not self.is_alive():
+            self.start()
+        self._seq += 1
+        seq = self._seq
+        started = time.perf_counter()
+        try:
+            self._conn.send((name, seq))
+            deadline = started + timeout
+            while True:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0 or not self._conn.poll(remaining):
+                    print(f"⚠️ Player did not acknowledge {name!r} within {timeout}s")
+                    return False
+                message = self._conn.recv()
+                if message[0] == "event":
+                    self._events.append(message[1])
+                elif message[0] == "ack" and message[1] == seq:
+                    break
+        except (EOFError, OSError) as e:
+            print(f"⚠️ Player service went away: {e}")
+            return False
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.latencies.setdefault(name, []).append(elapsed_ms)
+        print(f"🎬 {name} took {elapsed_ms:.1f} ms")
+        return message[3]
+
+    def events(self):
+        """Return and clear events the player sent since the last call."""
+        try:
+            while self._conn is not None and self._conn.poll():
+                message = self._conn.recv()
+                if message[0] == "event":
+                    self._events.append(message[1])
+        except (EOFError, OSError):
+            pass
+        events, self._events = self._events, []
+        return events
+
+    def stats(self):
+        return {
+            name: {"count": len(ms), "mean_ms": round(sum(ms) / len(ms), 1), "max_ms": round(max(ms), 1)}
+            for name, ms in self.latencies.items()
+        }
+
+    def stop(self):
+        if self.is_alive():
+            self.command("stop", timeout=2)
+            self._proc.join(timeout=2)
+            if self._proc.is_alive():
+                self._proc.terminate()
+                self._proc.join()
+        self._proc = None
+
+
+class TkCommandPump:
+    """Child side for Tk players: hands pipe commands to the Tk main loop.
+
+    A reader thread blocks on the pipe and queues what arrives; the Tk thread
+    drains that queue every COMMAND_POLL_MS with root.after, since Tk may
+    only be touched from the thread running its main loop. handle(name)
+    runs on the Tk thread and returns the ok flag for the ack.
+    """
+
+    def __init__(self, conn, root, handle):
+        self.conn = conn
+        self.root = root
+        self.handle = handle
+        self._pending = queue.Queue()
+        self._send_lock = threading.Lock()
+        threading.Thread(target=self._read, name="player-commands", daemon=True).start()
+        root.after(COMMAND_POLL_MS, self._poll)
+
+    def _read(self):
+        while True:
+            try:
+                message = self.conn.recv()
+            except (EOFError, OSError):
+                # Parent is gone; shut the player down with it
+                message = ("stop", None)
+            self._pending.put(message)
+            if message[0] == "stop":
+                return
+
+    def _poll(self):
+        while True:
+            try:
+                name, seq = self._pending.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                ok = bool(self.handle(name))
+            except Exception as e:
+                print(f"⚠️ Player command {name!r} failed: {e}")
+                ok = False
+            self.send("ack", seq, name, ok)
+        self.root.after(COMMAND_POLL_MS, self._poll)
+
+    def send(self, *message):
+        with self._send_lock:
+            try:
+                self.conn.send(message)
+            except (EOFError, OSError):
+                pass
+
+    def event(self, name):
+        self.send("event", name)
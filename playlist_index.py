@@ -0,0 +1,90 @@
+"""Cached playlist and screensaver page for the Flask servers.
+
+The page is static HTML served with an ETag, and its script fetches
+/playlist for the clips. PlaylistIndex builds that JSON once and only
+rebuilds it when the live generation, its folder, its manifest or the
+rendition cache change on disk, or when the download pipeline calls
+invalidate(). Both answer If-None-Match with a 304, so a page reload
+costs a few stat() calls instead of a directory scan and a template
+compile.
+"""
+import os
+import json
+import hashlib
+import threading
+from flask import Response, request
+from video_store import CURRENT_POINTER, list_videos, video_folder_for
+from video_sync import MANIFEST_NAME
+from video_renditions import RENDITION_DIR
+from video_serving import clip_versions
+
+
+def _etag_of(data):
+    return hashlib.sha256(data).hexdigest()[:32]
+
+
+def _conditional(body, etag, mimetype):
+    response = Response(body, mimetype=mimetype)
+    response.set_etag(etag)
+    # Always revalidate; the answer is a 304 until something changes
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+class CachedPage:
+    """A page rendered once at startup and served with a strong ETag."""
+
+    def __init__(self, html):
+        self.body = html.encode("utf-8")
+        self.etag = _etag_of(self.body)
+
+    def response(self):
+        return _conditional(self.body, self.etag, "text/html")
+
+
+class PlaylistIndex:
+    """{generation, videos, versions} for the live generation, rebuilt only when it changes."""
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._body = b""
+        self._etag = ""
+        self.builds = 0
+
+    def _stamp_now(self):
+        folder = video_folder_for(self.root, None)
+        stamp = []
+        for path in (os.path.join(self.root, CURRENT_POINTER), folder,
+                     os.path.join(folder, MANIFEST_NAME), os.path.join(self.root, RENDITION_DIR)):
+            try:
+                stamp.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                stamp.append(None)
+        return folder, tuple(stamp)
+
+    def invalidate(self):
+        with self._lock:
+            self._stamp = None
+
+    def current(self):
+        """(json bytes, etag), rebuilding first if anything on disk moved."""
+        folder, stamp = self._stamp_now()
+        with self._lock:
+            if stamp != self._stamp:
+                generation, video_files = list_videos(self.root)
+                playlist = {"generation": generation, "videos": video_files,
+                            "versions": clip_versions(self.root, folder, video_files)}
+                self._body = json.dumps(playlist).encode("utf-8")
+                self._etag = _etag_of(self._body)
+                self._stamp = stamp
+                self.builds += 1
+            return self._body, self._etag
+
+    def playlist(self):
+        return json.loads(self.current()[0])
+
+    def response(self):
+        body, etag = self.current()
+        return _conditional(body, etag, "application/json")
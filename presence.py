@@ -0,0 +1,111 @@
+import os
+import json
+import time
+from collections import deque
+
+SMOOTHING_SECONDS = 1.0  # window the nearest-face distance is smoothed over
+MISSING_FRACTION = 0.6  # share of face-less samples in the window that counts as "no face"
+ENTER_MARGIN_CM = 10  # must come this much closer than the threshold to count as arrived
+EXIT_MARGIN_CM = 15  # and go this much further than it to count as gone
+ENTER_DWELL_SECONDS = 0.3  # how long a face must stay in range before it counts as present
+MIN_STATE_SECONDS = 2.0  # no state flips back sooner than this
+METRICS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "presence_metrics.json")
+METRICS_INTERVAL = 5.0  # seconds between metrics file rewrites
+
+
+class PresenceMonitor:
+    """Turns per-frame nearest-face distances into deliberate present/absent decisions.
+
+    Distances are median-smoothed over SMOOTHING_SECONDS, arrival needs the
+    smoothed distance under threshold - ENTER_MARGIN_CM for ENTER_DWELL_SECONDS,
+    and leaving needs it over threshold + EXIT_MARGIN_CM (or no face) for
+    absent_after seconds. Either way the previous state must have lasted
+    MIN_STATE_SECONDS, so a face hovering at the threshold or one missed
+    detection can't bounce the screensaver.
+
+    The loops call count("screensaver_starts") etc. when they act on a
+    transition; stats() and the metrics_path JSON file expose those
+    counters alongside the transition counts. The file is rewritten at
+    most every METRICS_INTERVAL seconds, from count() or update(), and
+    flush() writes any pending counts straight away.
+    """
+
+    def __init__(self, threshold_cm, absent_after, metrics_path=METRICS_FILE):
+        self.enter_cm = threshold_cm - ENTER_MARGIN_CM
+        self.exit_cm = threshold_cm + EXIT_MARGIN_CM
+        self.absent_after = absent_after
+        self.metrics_path = metrics_path
+        self.present = True
+        self.smoothed = None
+        self._samples = deque()
+        self._since = time.monotonic()
+        self._candidate_since = None
+        self.counters = {"arrivals": 0, "departures": 0}
+        self._metrics_dirty = False
+        self._metrics_written = None
+
+    def _smooth(self, distance, now):
+        self._samples.append((now, distance))
+        while self._samples and now - self._samples[0][0] > SMOOTHING_SECONDS:
+            self._samples.popleft()
+        seen = sorted(d for _, d in self._samples if d is not None)
+        if len(seen) < (1 - MISSING_FRACTION) * len(self._samples) or not seen:
+            return None
+        return seen[len(seen) // 2]
+
+    def update(self, nearest_cm, now=None):
+        """Feed the nearest face distance (None for no face); returns "present"/"absent" on a change."""
+        now = time.monotonic() if now is None else now
+        if self._metrics_dirty:
+            self._maybe_write_metrics(now)
+        self.smoothed = self._smooth(nearest_cm, now)
+        if self.present:
+            wants_change = self.smoothed is None or self.smoothed > self.exit_cm
+            dwell = self.absent_after
+        else:
+            wants_change = self.smoothed is not None and self.smoothed < self.enter_cm
+            dwell = ENTER_DWELL_SECONDS
+        if not wants_change:
+            self._candidate_since = None
+            return None
+        if self._candidate_since is None:
+            self._candidate_since = now
+        if now - self._candidate_since < dwell or now - self._since < MIN_STATE_SECONDS:
+            return None
+        self.present = not self.present
+        self._since = now
+        self._candidate_since = None
+        self.count("arrivals" if self.present else "departures")
+        state = "present" if self.present else "absent"
+        smoothed = "no face" if self.smoothed is None else f"{self.smoothed:.0f} cm"
+        print(f"👤 Presence {state} ({smoothed}) {self.stats()}")
+        return state
+
+    def count(self, name):
+        self.counters[name] = self.counters.get(name, 0) + 1
+        self._metrics_dirty = True
+        self._maybe_write_metrics(time.monotonic())
+
+    def flush(self):
+        if self._metrics_dirty:
+            self._write_metrics(time.monotonic())
+
+    def _maybe_write_metrics(self, now):
+        if self._metrics_written is None or now - self._metrics_written >= METRICS_INTERVAL:
+            self._write_metrics(now)
+
+    def stats(self):
+        return dict(self.counters, present=self.present)
+
+    def _write_metrics(self, now):
+        self._metrics_dirty = False
+        self._metrics_written = now
+        if not self.metrics_path:
+            return
+        tmp = self.metrics_path + ".tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(self.stats(), f)
+            os.replace(tmp, self.metrics_path)
+        except OSError as e:
+            print(f"⚠️ Could not write presence metrics: {e}")
@@ -6,6 +6,7 @@ import glob
 from ultralytics import YOLO
 from PIL import Image, ImageTk
 import tkinter as tk
+from video_decoder import DecodePipeline, PresentationClock, STATS_EVERY, EARLY_TOLERANCE
 
 # --- Distance calculation constants
 A = 9703.20
@@ -24,77 +25,133 @@ class VideoScreensaver:
         self.root = root
         # Remove fullscreen attribute, use overrideredirect and geometry instead
         self.root.overrideredirect(True)
-        screen_width = self.root.winfo_screenwidth()
-        screen_height = self.root.winfo_screenheight()
-        self.root.geometry(f"{screen_width}x{screen_height}+0+0")
+        self.screen_width = self.root.winfo_screenwidth()
+        self.screen_height = self.root.winfo_screenheight()
+        self.root.geometry(f"{self.screen_width}x{self.screen_height}+0+0")
         self.canvas = tk.Canvas(self.root, bg='black', highlightthickness=0, borderwidth=0)
         self.canvas.pack(fill='both', expand=True, padx=0, pady=0)
-        self.video_files = glob.glob(os.path.join(VIDEO_FOLDER, '*.mp4'))
+        self.video_files = sorted(glob.glob(os.path.join(VIDEO_FOLDER, '*.mp4')))
         if not self.video_files:
             raise RuntimeError("No video files found in videos folder!")
         self.current_video_index = 0
-        self.cap = None
+        self.pipeline = None
         self.running = False
         self.visible = False
         self._after_id = None
-        self.fps = 30  # default fallback
+        # One persistent image item; frames are pasted into its PhotoImage
+        self.image_item = self.canvas.create_image(0, 0, anchor='nw')
+        self.photo = None
+        self.geometry = None
+        self.clock = PresentationClock()
+        self._pending = None
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.frames_shown = 0
+        self.frames_dropped = 0
+        self.underruns = 0
+        self.frame_times = []
+        self.transition_gaps = []
+        self._last_shown = None
+        self._last_frame = None
+        self._starved = False
+        self.clock.clear_histogram()
 
     def show(self):
         if not self.visible:
             self.running = True
             self.root.deiconify()
-            self.play_next_video()
+            self.pipeline = DecodePipeline(self.video_files, self.screen_width, self.screen_height,
+                                           start_index=self.current_video_index)
+            self.pipeline.start()
+            self.clock.reset()
             self.visible = True
+            self.update_frame()
 
     def hide(self):
         if self.visible:
             self.running = False
-            if self.cap is not None:
-                self.cap.release()
             if self._after_id is not None:
                 try:
                     self.root.after_cancel(self._after_id)
                 except Exception:
                     pass
                 self._after_id = None
+            if self.pipeline is not None:
+                if self._pending is not None:
+                    self.pipeline.release(self._pending)
+                    self._pending = None
+                self.report_stats()
+                self.pipeline.stop()
+                self.pipeline = None
             self.root.withdraw()
             self.visible = False
 
-    def play_next_video(self):
-        if not self.running:
-            return
-        if self.cap is not None:
-            self.cap.release()
-        video_path = self.video_files[self.current_video_index]
-        self.cap = cv2.VideoCapture(video_path)
-        self.width = self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)
-        self.height = self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
-        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30
-        if self.fps <= 1 or self.fps > 120:
-            self.fps = 30  # fallback for weird/corrupt FPS
-        self.canvas.config(width=self.root.winfo_screenwidth(), height=self.root.winfo_screenheight())
-        self.update_frame()
+    def _draw(self, frame):
+        if frame.geometry != self.geometry:
+            width, height, x, y = frame.geometry
+            self.photo = ImageTk.PhotoImage(Image.new("RGB", (width, height)))
+            self.canvas.itemconfig(self.image_item, image=self.photo)
+            self.canvas.coords(self.image_item, x, y)
+            self.geometry = frame.geometry
+        width, height = frame.geometry[0], frame.geometry[1]
+        self.photo.paste(Image.frombuffer("RGB", (width, height), frame.image, "raw", "RGB", 0, 1))
 
     def update_frame(self):
         if not self.running or not self.root.winfo_exists():
             return
-        ret, frame = self.cap.read()
-        if ret:
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            screen_width = self.root.winfo_screenwidth()
-            screen_height = self.root.winfo_screenheight()
-            frame_resized = cv2.resize(frame_rgb, (screen_width, screen_height))
-            photo = ImageTk.PhotoImage(image=Image.fromarray(frame_resized))
-            x = 0
-            y = 0
-            self.canvas.delete("all")
-            self.canvas.create_image(x, y, image=photo, anchor='nw')
-            self.canvas.photo = photo
-            delay = int(1000 / self.fps)
-            self._after_id = self.root.after(delay, self.update_frame)
-        else:
-            self.current_video_index = (self.current_video_index + 1) % len(self.video_files)
-            self.play_next_video()
+        frame, self._pending = self._pending or self.pipeline.next_frame(), None
+        if frame is None:
+            # Decoder fell behind; the previous frame stays up until one is ready
+            if not self._starved:
+                self.underruns += 1
+                self._starved = True
+            self._after_id = self.root.after(2, self.update_frame)
+            return
+        self._starved = False
+        now = time.monotonic()
+        deadline = self.clock.deadline(frame, now)
+        if now < deadline - EARLY_TOLERANCE:
+            self._pending = frame
+            self._after_id = self.root.after(max(1, int((deadline - now) * 1000)), self.update_frame)
+            return
+        if now - deadline > 1 / frame.fps:
+            # More than a frame late: drop it and let the decoder skip ahead to the clock
+            self.pipeline.release(frame)
+            self.frames_dropped += 1
+            self.pipeline.catch_up(frame.clip_serial, self.clock.position(now))
+            self._after_id = self.root.after(1, self.update_frame)
+            return
+        self._draw(frame)
+        self.pipeline.release(frame)
+        self.clock.record(now - deadline)
+        self.current_video_index = frame.clip_index
+        if self._last_shown is not None:
+            self.frame_times.append(now - self._last_shown)
+            if frame.clip_serial != self._last_frame.clip_serial:
+                # Time the last frame of the previous clip stayed up beyond its own interval
+                self.transition_gaps.append(max(0.0, now - self._last_shown - 1 / self._last_frame.fps))
+        self._last_shown = now
+        self._last_frame = frame
+        self.frames_shown += 1
+        if self.frames_shown % STATS_EVERY == 0:
+            self.report_stats()
+        self._after_id = self.root.after(1, self.update_frame)
+
+    def report_stats(self):
+        times = sorted(self.frame_times)
+        if times:
+            mean_ms = 1000 * sum(times) / len(times)
+            p95_ms = 1000 * times[int(0.95 * (len(times) - 1))]
+            print(f"🎞️ Player: shown={self.frames_shown} dropped={self.frames_dropped} "
+                  f"underruns={self.underruns} frame_ms mean={mean_ms:.1f} p95={p95_ms:.1f} "
+                  f"max={1000 * times[-1]:.1f} decoder={self.pipeline.stats()}")
+            print(f"🎞️ Jitter: {self.clock.histogram_text()}")
+        if self.transition_gaps:
+            gaps_ms = [1000 * gap for gap in self.transition_gaps]
+            print(f"🎞️ Clip transitions: {len(gaps_ms)} gap_ms mean={sum(gaps_ms) / len(gaps_ms):.1f} "
+                  f"max={max(gaps_ms):.1f}")
+        self._reset_stats()
 
 def face_detection_loop(root):
     model = YOLO(MODEL_PATH)
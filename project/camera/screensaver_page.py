@@ -0,0 +1,68 @@
+"""The two-<video> screensaver page both camera servers serve at /.
+
+The <video> underneath loads and decodes the next clip while the one on
+top plays; they swap on the new clip's first painted frame. Render it
+with render_template_string(SCREENSAVER_HTML, videos=[...names]).
+"""
+
+SCREENSAVER_HTML = '''
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <title>Screensaver Videos</title>
+        <style>
+            body, html { margin:0; padding:0; background:black; height:100%; width:100%; overflow:hidden; }
+            video { position:absolute; top:0; left:0; z-index:1; }
+            video.standby { z-index:0; }
+        </style>
+    </head>
+    <body>
+        <video id="screensaverVideo" width="100%" height="100%" muted></video>
+        <video id="standbyVideo" class="standby" width="100%" height="100%" preload="auto" muted></video>
+        <script>
+            const videos = {{ videos|safe }};
+            let next = 0;
+            // Two stacked players: the one underneath loads and decodes the next
+            // clip while the one on top plays, and they swap when the clip ends
+            let active = document.getElementById('screensaverVideo');
+            let standby = document.getElementById('standbyVideo');
+            const transitionGaps = window.transitionGaps = [];
+            function prefetch() {
+                standby.src = '/videos/' + videos[next];
+                standby.load();
+            }
+            function onFirstFrame(video, callback) {
+                if (video.requestVideoFrameCallback) {
+                    video.requestVideoFrameCallback(() => callback());
+                } else {
+                    video.addEventListener('playing', callback, { once: true });
+                }
+            }
+            active.onended = standby.onended = function(event) {
+                if (event.target !== active) {
+                    return;
+                }
+                const endedAt = performance.now();
+                [active, standby] = [standby, active];
+                next = (next + 1) % videos.length;
+                // The old clip's last frame stays up until the new one has painted
+                onFirstFrame(active, () => {
+                    const gap = performance.now() - endedAt;
+                    transitionGaps.push(gap);
+                    console.log('Clip transition gap ' + gap.toFixed(1) + ' ms');
+                    active.classList.remove('standby');
+                    standby.classList.add('standby');
+                    prefetch();
+                });
+                active.play();
+            };
+            if (videos.length > 0) {
+                active.src = '/videos/' + videos[next];
+                next = (next + 1) % videos.length;
+                active.play();
+                prefetch();
+            }
+        </script>
+    </body>
+    </html>
+    '''
@@ -9,6 +9,7 @@ from datetime import datetime
 import atexit
 import glob
 import sys
+from screensaver_page import SCREENSAVER_HTML
 
 app = Flask(__name__)
 
@@ -47,35 +48,7 @@ atexit.register(cleanup_screensaver)
 @app.route('/')
 def index():
     video_files = [os.path.basename(f) for f in glob.glob(os.path.join(VIDEO_FOLDER, '*.mp4'))]
-    html = '''
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Screensaver Videos</title>
-        <style>body, html { margin:0; padding:0; background:black; height:100%; width:100%; overflow:hidden; }</style>
-    </head>
-    <body>
-        <video id="screensaverVideo" width="100%" height="100%" autoplay muted></video>
-        <script>
-            const videos = {{ videos|safe }};
-            let idx = 0;
-            const videoElem = document.getElementById('screensaverVideo');
-            function playNext() {
-                videoElem.src = '/videos/' + videos[idx];
-                videoElem.play();
-            }
-            videoElem.onended = function() {
-                idx = (idx + 1) % videos.length;
-                playNext();
-            };
-            if (videos.length > 0) {
-                playNext();
-            }
-        </script>
-    </body>
-    </html>
-    '''
-    return render_template_string(html, videos=video_files)
+    return render_template_string(SCREENSAVER_HTML, videos=video_files)
 
 @app.route('/videos/<path:filename>')
 def serve_video(filename):
@@ -0,0 +1,265 @@
+import time
+import queue
+import bisect
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import cv2
+
+POOL_SIZE = 4  # frame buffers shared between the decoder thread and Tk
+DEFAULT_FPS = 30
+STATS_EVERY = 600  # displayed frames between stats printouts
+EARLY_TOLERANCE = 0.002  # seconds early a frame may be shown rather than waiting again
+JITTER_BUCKETS_MS = (1, 2, 4, 8, 16, 33, 66)  # upper edges of the lateness histogram
+
+Frame = namedtuple("Frame", "image clip_index clip_serial number pts fps geometry")
+Frame.__doc__ = """A decoded, converted and scaled frame ready for Tk.
+
+image is an RGB buffer from the pipeline's pool and must be handed back
+with DecodePipeline.release() once it has been drawn. clip_serial counts
+clips as they are opened, so a playlist of one still starts a new clip
+each loop. pts is the frame's presentation time in seconds from the clip
+start, and geometry the (width, height, x, y) letterbox placement.
+"""
+
+
+def letterbox(src_w, src_h, dst_w, dst_h):
+    """Size and offset that fit a src_w x src_h clip inside dst_w x dst_h without distortion."""
+    scale = min(dst_w / src_w, dst_h / src_h)
+    width = max(1, int(round(src_w * scale)))
+    height = max(1, int(round(src_h * scale)))
+    return width, height, (dst_w - width) // 2, (dst_h - height) // 2
+
+
+class PresentationClock:
+    """Turns frame PTS into time.monotonic() deadlines and keeps a jitter histogram.
+
+    Each clip is anchored when its first frame is due, so every later
+    deadline is anchor + pts regardless of how long decoding or drawing
+    took; playback speed is set by the clock, not by the Tk timer. A clip
+    that follows another is due one frame after the previous clip's last
+    frame, so playlist transitions keep the same cadence as the frames
+    within a clip.
+    """
+
+    def __init__(self):
+        self.histogram = [0] * (len(JITTER_BUCKETS_MS) + 1)
+        self.reset()
+
+    def reset(self):
+        self._serial = None
+        self._anchor = 0.0
+        self._next_due = None
+
+    def deadline(self, frame, now):
+        if frame.clip_serial != self._serial:
+            start = now if self._next_due is None else max(now, self._next_due)
+            self._serial = frame.clip_serial
+            self._anchor = start - frame.pts
+        deadline = self._anchor + frame.pts
+        self._next_due = deadline + 1 / frame.fps
+        return deadline
+
+    def position(self, now):
+        """Where in the current clip playback should be at now, in seconds."""
+        return now - self._anchor
+
+    def record(self, lateness):
+        self.histogram[bisect.bisect_left(JITTER_BUCKETS_MS, lateness * 1000)] += 1
+
+    def histogram_text(self):
+        labels = [f"<={edge}ms" for edge in JITTER_BUCKETS_MS] + [f">{JITTER_BUCKETS_MS[-1]}ms"]
+        return " ".join(f"{label}:{count}" for label, count in zip(labels, self.histogram))
+
+    def clear_histogram(self):
+        self.histogram = [0] * (len(JITTER_BUCKETS_MS) + 1)
+
+
+class DecodePipeline:
+    """Decodes the playlist on a background thread into reusable RGB buffers.
+
+    The letterbox geometry and the scratch buffers are worked out once per
+    clip; each frame is read into the same BGR buffer, scaled and converted
+    into one of POOL_SIZE preallocated RGB buffers, and queued for the Tk
+    thread, which only has to paste it into its one persistent image. The
+    decoder blocks when every buffer is in flight, so memory stays flat.
+
+    While a clip plays, the next one is opened and its first frame decoded
+    on a prefetch thread, so the switch between clips costs no more than
+    any other frame.
+    """
+
+    def __init__(self, video_files, screen_w, screen_h, start_index=0, pool_size=POOL_SIZE):
+        self.video_files = list(video_files)
+        self.screen_w = screen_w
+        self.screen_h = screen_h
+        self.index = start_index % len(self.video_files)
+        self._free = queue.Queue()
+        for _ in range(pool_size):
+            self._free.put(np.empty((0, 0, 3), dtype=np.uint8))
+        self._ready = queue.Queue()
+        self._running = False
+        self._thread = None
+        self._clip_serial = 0
+        self._catch_up = (None, 0.0)
+        self._prefetcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="video-prefetch")
+        self.frames_decoded = 0
+        self.frames_skipped = 0
+        self.decode_seconds = 0.0
+        self.prefetch_misses = 0
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="video-decode", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+        while not self._ready.empty():
+            self.release(self._ready.get_nowait())
+        self._prefetcher.shutdown(wait=False)
+
+    def _open(self, index):
+        cap = cv2.VideoCapture(self.video_files[index])
+        if not cap.isOpened():
+            print(f"⚠️ Could not open {self.video_files[index]}")
+            cap.release()
+            return None
+        fps = cap.get(cv2.CAP_PROP_FPS) or DEFAULT_FPS
+        if fps <= 1 or fps > 120:
+            fps = DEFAULT_FPS  # fallback for weird/corrupt FPS
+        src_w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)) or self.screen_w
+        src_h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) or self.screen_h
+        return cap, fps, (src_w, src_h), letterbox(src_w, src_h, self.screen_w, self.screen_h)
+
+    def _prefetch(self, index):
+        """Open a clip and decode its first frame, returning (opened, first_bgr) or None."""
+        opened = self._open(index)
+        if opened is None:
+            return None
+        ok, first = opened[0].read()
+        return opened, first if ok else None
+
+    def _take_buffer(self, shape):
+        while self._running:
+            try:
+                buf = self._free.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            if buf.shape != shape:
+                buf = np.empty(shape, dtype=np.uint8)
+            return buf
+        return None
+
+    def catch_up(self, clip_serial, pts):
+        """Ask the decoder to skip, without converting, to pts in the given clip."""
+        self._catch_up = (clip_serial, pts)
+
+    def _frame_pts(self, cap, number, fps):
+        pts = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+        # Some backends report 0 throughout; fall back to counting frames
+        return pts if pts > 0 or number == 0 else number / fps
+
+    def _play_clip(self, index, opened, first):
+        cap, fps, (src_w, src_h), geometry = opened
+        self._clip_serial += 1
+        serial = self._clip_serial
+        width, height = geometry[0], geometry[1]
+        shape = (height, width, 3)
+        # Convert on whichever side of the resize has fewer pixels
+        shrink = width * height <= src_w * src_h
+        scratch = np.empty((height, width, 3) if shrink else (src_h, src_w, 3), dtype=np.uint8)
+        interpolation = cv2.INTER_AREA if shrink else cv2.INTER_LINEAR
+        bgr = None
+        number = 0
+        last_pts = -1.0
+        upcoming = None
+        try:
+            while self._running:
+                started = time.perf_counter()
+                target_serial, target_pts = self._catch_up
+                if target_serial == serial and last_pts < target_pts:
+                    # Behind the clock: decode without retrieving or converting
+                    if not cap.grab():
+                        return upcoming
+                    last_pts = self._frame_pts(cap, number, fps)
+                    number += 1
+                    self.frames_skipped += 1
+                    continue
+                if first is not None:
+                    ok, bgr, first = True, first, None
+                else:
+                    ok, bgr = cap.read(bgr)
+                if not ok:
+                    return upcoming
+                if bgr.shape[:2] != (src_h, src_w):
+                    src_h, src_w = bgr.shape[:2]
+                    shrink = width * height <= src_w * src_h
+                    scratch = np.empty((height, width, 3) if shrink else (src_h, src_w, 3), dtype=np.uint8)
+                buf = self._take_buffer(shape)
+                if buf is None:
+                    return upcoming
+                if shrink:
+                    cv2.resize(bgr, (width, height), dst=scratch, interpolation=interpolation)
+                    cv2.cvtColor(scratch, cv2.COLOR_BGR2RGB, dst=buf)
+                else:
+                    cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB, dst=scratch)
+                    cv2.resize(scratch, (width, height), dst=buf, interpolation=interpolation)
+                self.decode_seconds += time.perf_counter() - started
+                self.frames_decoded += 1
+                last_pts = self._frame_pts(cap, number, fps)
+                self._ready.put(Frame(buf, index, serial, number, last_pts, fps, geometry))
+                number += 1
+                if upcoming is None:
+                    # Get the next clip open and decoding while this one plays
+                    upcoming = self._prefetcher.submit(self._prefetch, (index + 1) % len(self.video_files))
+            return upcoming
+        finally:
+            cap.release()
+
+    def _run(self):
+        failures = 0
+        upcoming = None
+        while self._running:
+            if upcoming is not None:
+                if not upcoming.done():
+                    self.prefetch_misses += 1
+                prefetched = upcoming.result()
+            else:
+                prefetched = self._prefetch(self.index)
+            upcoming = None
+            if prefetched is None:
+                failures += 1
+                if failures >= len(self.video_files):
+                    time.sleep(1)
+                    failures = 0
+            else:
+                failures = 0
+                upcoming = self._play_clip(self.index, *prefetched)
+            if self._running:
+                self.index = (self.index + 1) % len(self.video_files)
+        if upcoming is not None:
+            prefetched = upcoming.result()
+            if prefetched is not None:
+                prefetched[0][0].release()
+
+    def next_frame(self):
+        """The next decoded frame, or None if the decoder hasn't got one ready yet."""
+        try:
+            return self._ready.get_nowait()
+        except queue.Empty:
+            return None
+
+    def release(self, frame):
+        """Return a frame's buffer to the pool once Tk has copied it."""
+        self._free.put(frame.image)
+
+    def stats(self):
+        mean_ms = 1000 * self.decode_seconds / self.frames_decoded if self.frames_decoded else 0.0
+        return {"decoded": self.frames_decoded, "skipped": self.frames_skipped,
+                "decode_ms": round(mean_ms, 2), "queued": self._ready.qsize(),
+                "prefetch_misses": self.prefetch_misses}
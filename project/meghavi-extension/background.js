@@ -1,32 +1,41 @@
 const targetUrl = "https://meghavi-kiosk-outlet.onrender.com/shop/67e22caf39c9f87925bea576/RelaxationTherapy";
 
-// ⏱️ Change this to control how often "left" signals are sent (in milliseconds)
-const CHECK_INTERVAL_MS = 2000;
+// Page transitions are pushed to the kiosk server over one WebSocket; the
+// old /url_matched endpoint is only used while the socket is unavailable
+const PRESENCE_URL = "ws://127.0.0.1:5003/presence";
+const FALLBACK_URL = "http://127.0.0.1:5000/url_matched";
 
-let isOnTarget = false;
+// ⏱️ Heartbeats keep the service worker and the connection alive; the server
+// drops a connection that stays silent for 60 s, so keep this well under that
+const HEARTBEAT_MS = 20000;
+const RECONNECT_MAX_MS = 30000;
 
-setInterval(() => {
-  chrome.tabs.query({ active: true, currentWindow: true }, (tabs) => {
-    if (!tabs[0]) return;
-    const currentUrl = tabs[0].url;
+let socket = null;
+let heartbeat = null;
+let reconnectDelay = 1000;
+let lastStatus = null; // last status the server was told about
 
-    if (currentUrl === targetUrl) {
-      if (!isOnTarget) {
-        isOnTarget = true;
-        sendStatus("entered", currentUrl);
-      }
-    } else {
-      if (isOnTarget) {
-        isOnTarget = false;
-      }
-      // Send repeated "left" signals
-      sendStatus("left", currentUrl);
-    }
+function checkActiveTab() {
+  chrome.tabs.query({ active: true, lastFocusedWindow: true }, (tabs) => {
+    if (!tabs[0] || !tabs[0].url) return;
+    const currentUrl = tabs[0].url;
+    report(currentUrl === targetUrl ? "entered" : "left", currentUrl);
   });
-}, CHECK_INTERVAL_MS);
+}
+
+function report(status, url) {
+  // Only transitions are sent
+  if (status === lastStatus) return;
+  lastStatus = status;
+  if (socket && socket.readyState === WebSocket.OPEN) {
+    socket.send(JSON.stringify({ type: "status", status, url }));
+  } else {
+    sendStatusHttp(status, url);
+  }
+}
 
-function sendStatus(status, url) {
-  fetch("http://127.0.0.1:5000/url_matched", {
+function sendStatusHttp(status, url) {
+  fetch(FALLBACK_URL, {
     method: "POST",
     headers: { "Content-Type": "application/json" },
     body: JSON.stringify({ status, url })
@@ -35,3 +44,31 @@ function sendStatus(status, url) {
   .then(data => console.log(`[${status}] Sent to Flask:`, data))
   .catch(err => console.error("Error sending to Flask:", err));
 }
+
+function connect() {
+  socket = new WebSocket(PRESENCE_URL);
+  socket.onopen = () => {
+    reconnectDelay = 1000;
+    // Tell the (possibly restarted) server where the kiosk is right now
+    lastStatus = null;
+    checkActiveTab();
+    heartbeat = setInterval(() => socket.send(JSON.stringify({ type: "heartbeat" })), HEARTBEAT_MS);
+  };
+  socket.onmessage = (event) => console.log("Kiosk server:", event.data);
+  socket.onclose = () => {
+    clearInterval(heartbeat);
+    socket = null;
+    // Server unreachable before it heard anything: fall back to HTTP for the current state
+    if (lastStatus === null) checkActiveTab();
+    setTimeout(connect, reconnectDelay);
+    reconnectDelay = Math.min(reconnectDelay * 2, RECONNECT_MAX_MS);
+  };
+}
+
+chrome.tabs.onActivated.addListener(checkActiveTab);
+chrome.tabs.onUpdated.addListener((tabId, changeInfo, tab) => {
+  if (changeInfo.url && tab.active) checkActiveTab();
+});
+chrome.windows.onFocusChanged.addListener(checkActiveTab);
+
+connect();
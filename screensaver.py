@@ -2,8 +2,13 @@ import cv2
 import time
 import threading
 import os
-from ultralytics import YOLO
-from multiprocessing import Process
+from face_detector import load_detector, FocusedDetector, measure_faces
+from inference_scheduler import InferenceScheduler
+from face_tracker import FaceTracker
+from presence import PresenceMonitor
+from camera_capture import LatestFrameCapture
+from player_service import PlayerService
+from control_channel import ControlServer
 import signal
 import sys
 import webview
@@ -17,90 +22,151 @@ MODEL_PATH = "models/model.pt"
 FACE_DISTANCE_THRESHOLD = 110
 # Global timer for screensaver activation (seconds)
 NO_FACE_TIMER_SECONDS = 5
+# Seconds the screensaver stays away after being hidden over the control channel
+COOLDOWN_SECONDS = 10
 
-# --- Screensaver process using pywebview
+# --- Long-lived screensaver process using pywebview
 
-def run_webview():
-    # Point to the root of the Flask server, which now serves the video screensaver page
-    webview.create_window(
+PAUSE_JS = "document.querySelectorAll('video').forEach(v => v.pause())"
+# Only the playing clip resumes; the two-<video> page keeps its prefetching standby element paused
+PLAY_JS = ("window.resumeScreensaver ? window.resumeScreensaver()"
+           " : document.querySelectorAll('video').forEach(v => v.play())")
+RELOAD_JS = "location.reload()"
+
+def run_webview(conn):
+    # Point to the root of the Flask server, which now serves the video screensaver page.
+    # The window is created once, hidden, and only shown or hidden afterwards.
+    window = webview.create_window(
         'Screensaver',
         'http://localhost:5000/',
         frameless=True,
         fullscreen=True,
-        on_top=True
+        on_top=True,
+        hidden=True
     )
-    webview.start()
+
+    def serve_commands(window):
+        while True:
+            try:
+                name, seq = conn.recv()
+            except (EOFError, OSError):
+                name, seq = "stop", None
+            ok = True
+            try:
+                if name == "show":
+                    window.show()
+                    window.evaluate_js(PLAY_JS)
+                elif name == "hide":
+                    window.evaluate_js(PAUSE_JS)
+                    window.hide()
+                elif name == "pause":
+                    window.evaluate_js(PAUSE_JS)
+                elif name == "reload-playlist":
+                    window.evaluate_js(RELOAD_JS)
+                elif name != "stop":
+                    ok = False
+            except Exception as e:
+                print(f"⚠️ Screensaver command {name!r} failed: {e}")
+                ok = False
+            try:
+                conn.send(("ack", seq, name, ok))
+            except (EOFError, OSError):
+                pass
+            if name == "stop":
+                window.destroy()
+                return
+
+    webview.start(serve_commands, window)
 
 def face_detection_loop():
-    model = YOLO(MODEL_PATH)
-    screensaver_proc = None
-    no_face_start = None
-    frame_count = 0
-    last_face_in_range = False
+    detector = FocusedDetector(load_detector(MODEL_PATH), FACE_DISTANCE_THRESHOLD, A, B)
+    player = PlayerService(run_webview)
+    player.start()
+    screensaver_visible = False
+    scheduler = InferenceScheduler(FACE_DISTANCE_THRESHOLD)
+    tracker = FaceTracker()
+    presence = PresenceMonitor(FACE_DISTANCE_THRESHOLD, NO_FACE_TIMER_SECONDS)
+    nearest = None
+    cooldown_until = 0
+    control = ControlServer()
+
+    def handle_control(command):
+        nonlocal screensaver_visible, cooldown_until
+        if command == "hide":
+            if screensaver_visible:
+                player.command("hide")
+                screensaver_visible = False
+                presence.count("screensaver_stops")
+            cooldown_until = time.time() + COOLDOWN_SECONDS
+            return {"visible": False}
+        if command == "show":
+            if not screensaver_visible:
+                screensaver_visible = player.command("show")
+                if screensaver_visible:
+                    presence.count("screensaver_starts")
+            return {"visible": screensaver_visible}
+        if command in ("pause", "reload-playlist"):
+            return {"ok": player.command(command)}
+        return {
+            "visible": screensaver_visible,
+            "present": presence.present,
+            "cooldown_seconds": max(0.0, round(cooldown_until - time.time(), 1)),
+            "presence": presence.stats(),
+            "player": player.stats(),
+        }
+
+    # The capture thread keeps only the newest frame, so the motion gate and YOLO
+    # never see frames that queued up in the driver while the loop slept
+    cap = LatestFrameCapture(0)
     try:
-        cap = cv2.VideoCapture(0)
-        if not cap.isOpened():
+        if not cap.start():
             print("Unable to access webcam.")
             return
         while True:
-            ret, frame = cap.read()
-            if not ret:
+            control.dispatch(handle_control)
+            frame = cap.read()
+            if frame is None:
                 print("Failed to grab frame.")
                 break
-            frame_count += 1
-            # Only run YOLO every 5th frame
-            if frame_count % 5 == 0:
-                results = model(frame, conf=0.4, verbose=False)
-                detections = results[0].boxes
-                face_in_range = False
-                if detections is not None:
-                    for box in detections:
-                        conf = float(box.conf[0])
-                        if conf < 0.4:
-                            continue
-                        x1, y1, x2, y2 = map(int, box.xyxy[0])
-                        area_px = (x2 - x1) * (y2 - y1)
-                        distance = A * (area_px ** B)
-                        if distance < FACE_DISTANCE_THRESHOLD:
-                            face_in_range = True
-                            # import subprocess
-                            # chrome_path = "C:/Program Files/Google/Chrome/Application/chrome.exe"  # Make sure this path is correct
-                            # subprocess.Popen([
-                            # chrome_path,
-                            # "--kiosk",  # Opens in fullscreen
-                            # "--start-fullscreen",
-                            # "--new-window",
-                            # "https://meghavi-kiosk-outlet.onrender.com/shop/67e22caf39c9f87925bea576/RelaxationTherapy"
-                            # ])
-                            break 
-
-                last_face_in_range = face_in_range
-            else:
-                face_in_range = last_face_in_range
-            now = time.time()
-            if not face_in_range:
-                if no_face_start is None:
-                    no_face_start = now
-                elif now - no_face_start >= NO_FACE_TIMER_SECONDS:
-                    if screensaver_proc is None or not screensaver_proc.is_alive():
-                        screensaver_proc = Process(target=run_webview)
-                        screensaver_proc.start()
+            if tracker.wants_detection(scheduler.should_infer(frame)):
+                boxes = detector.detect(frame)
+                tracker.start(frame, boxes)
+                nearest = measure_faces(boxes, A, B, FACE_DISTANCE_THRESHOLD).nearest
+                scheduler.record(nearest)
+            elif tracker.tracks:
+                nearest = measure_faces(tracker.update(frame), A, B, FACE_DISTANCE_THRESHOLD).nearest
+            presence.update(nearest)
+            if not presence.present:
+                if not screensaver_visible and time.time() >= cooldown_until:
+                    screensaver_visible = player.command("show")
+                    if screensaver_visible:
+                        presence.count("screensaver_starts")
             else:
-                no_face_start = None
-                if screensaver_proc is not None and screensaver_proc.is_alive():
-                    screensaver_proc.terminate()
-                    screensaver_proc.join()
-                    screensaver_proc = None
-            # Sleep a bit to reduce CPU usage
-            time.sleep(0.05)
+                # import subprocess
+                # chrome_path = "C:/Program Files/Google/Chrome/Application/chrome.exe"  # Make sure this path is correct
+                # subprocess.Popen([
+                # chrome_path,
+                # "--kiosk",  # Opens in fullscreen
+                # "--start-fullscreen",
+                # "--new-window",
+                # "https://meghavi-kiosk-outlet.onrender.com/shop/67e22caf39c9f87925bea576/RelaxationTherapy"
+                # ])
+                if screensaver_visible:
+                    player.command("hide")
+                    screensaver_visible = False
+                    presence.count("screensaver_stops")
+            # Sleep longer while idle to reduce CPU usage; a control command cuts it short
+            control.wait(scheduler.sleep_time())
     except KeyboardInterrupt:
         print("\nExiting...")
     finally:
+        print(f"📷 Capture stats: {cap.stats()}")
         cap.release()
         cv2.destroyAllWindows()
-        if screensaver_proc is not None and screensaver_proc.is_alive():
-            screensaver_proc.terminate()
-            screensaver_proc.join()
+        control.close()
+        presence.flush()
+        print(f"🎬 Player latency: {player.stats()}")
+        player.stop()
 
 def main():
     face_detection_loop()
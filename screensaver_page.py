@@ -0,0 +1,125 @@
+"""The screensaver page the Flask servers serve at /.
+
+Two stacked <video> elements: the one underneath loads and decodes the
+next clip while the one on top plays, and they swap on the first painted
+frame of the new clip. The page fetches /playlist for the clips, so it
+is rendered once per server and served as a CachedPage.
+"""
+from jinja2 import Template
+from playlist_index import CachedPage
+
+SCREENSAVER_TEMPLATE = Template('''
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <title>Screensaver Videos</title>
+        <style>
+            body, html { margin:0; padding:0; background:black; height:100%; width:100%; overflow:hidden; }
+            video { position:absolute; top:0; left:0; z-index:1;{% if fit %} object-fit:{{ fit }};{% endif %} }
+            video.standby { z-index:0; }
+        </style>
+    </head>
+    <body>
+        <video id="screensaverVideo" width="100%" height="100%" playsinline{% if muted %} muted{% endif %}></video>
+        <video id="standbyVideo" class="standby" width="100%" height="100%" preload="auto" playsinline{% if muted %} muted{% endif %}></video>
+        <script>
+            let videos = [];
+            let generation = null;
+            let versions = {};
+            let next = 0;
+            let prefetched = false;
+            let swapPending = false;
+            let endedAt = 0;
+            // Two stacked players: the one underneath loads and decodes the next
+            // clip while the one on top plays, and they swap when the clip ends
+            let active = document.getElementById('screensaverVideo');
+            let standby = document.getElementById('standbyVideo');
+            const transitionGaps = window.transitionGaps = [];
+            function clipUrl(i) {
+                // ?v= makes the URL content-addressed, so replays come from the browser cache
+                const params = new URLSearchParams();
+                if (generation) {
+                    params.set('g', generation);
+                }
+                if (versions[videos[i]]) {
+                    params.set('v', versions[videos[i]]);
+                }
+                return '/videos/' + videos[i] + '?' + params;
+            }
+            function prefetch() {
+                // Pick up a newly downloaded generation at the clip boundary
+                fetch('/playlist').then(res => res.json()).then(data => {
+                    versions = data.versions;
+                    if (data.generation !== generation) {
+                        generation = data.generation;
+                        videos = data.videos;
+                        next = 0;
+                    }
+                }).catch(() => {}).finally(() => {
+                    if (videos.length > 0) {
+                        standby.src = clipUrl(next);
+                        standby.load();
+                        prefetched = true;
+                        if (swapPending) {
+                            swap();
+                        }
+                    }
+                });
+            }
+            function onFirstFrame(video, callback) {
+                if (video.requestVideoFrameCallback) {
+                    video.requestVideoFrameCallback(() => callback());
+                } else {
+                    video.addEventListener('playing', callback, { once: true });
+                }
+            }
+            function swap() {
+                if (!prefetched) {
+                    // The clip ended before the next one was queued up; swap as soon as it is
+                    swapPending = true;
+                    return;
+                }
+                prefetched = swapPending = false;
+                [active, standby] = [standby, active];
+                next = (next + 1) % videos.length;
+                // The old clip's last frame stays up until the new one has painted
+                onFirstFrame(active, () => {
+                    const gap = performance.now() - endedAt;
+                    transitionGaps.push(gap);
+                    console.log('Clip transition gap ' + gap.toFixed(1) + ' ms');
+                    active.classList.remove('standby');
+                    standby.classList.add('standby');
+                    prefetch();
+                });
+                active.play();
+            }
+            // The player host calls this after a hide/show; the standby element stays paused
+            window.resumeScreensaver = function() {
+                active.play();
+            };
+            active.onended = standby.onended = function(event) {
+                if (event.target === active) {
+                    endedAt = performance.now();
+                    swap();
+                }
+            };
+            fetch('/playlist').then(res => res.json()).then(data => {
+                generation = data.generation;
+                videos = data.videos;
+                versions = data.versions;
+                if (videos.length > 0) {
+                    active.src = clipUrl(next);
+                    next = (next + 1) % videos.length;
+                    active.play();
+                    prefetch();
+                }
+            });
+        </script>
+    </body>
+    </html>
+    ''')
+
+
+def screensaver_page(muted=False, fit=None):
+    """CachedPage for the screensaver; fit is a CSS object-fit value (default: letterbox)."""
+    return CachedPage(SCREENSAVER_TEMPLATE.render(muted=muted, fit=fit))
@@ -1,14 +1,18 @@
-from flask import Flask, request, jsonify, send_from_directory, render_template_string
+from flask import Flask, request, jsonify, render_template_string
 import subprocess
 import signal
 import os
-import requests
-import zipfile
-from io import BytesIO
 from datetime import datetime
 import atexit
-import glob
 import sys
+from video_store import sync_generation, video_folder_for
+from video_renditions import ingest_renditions
+from video_serving import video_response, clip_versions
+from download_jobs import DownloadJobs
+from control_channel import send_command, relay_allowed, COMMANDS
+from wsgi_server import serve
+from extension_channel import ExtensionChannel
+from page_state import PageStateMachine
 
 app = Flask(__name__)
 
@@ -16,8 +20,9 @@ app = Flask(__name__)
 _screensaver_proc = None
 
 DOWNLOAD_URL = "http://meghavi-kiosk-api.onrender.com/api/videos/download-all"
-EXTRACT_DIR = "downloaded_videos"
-VIDEO_FOLDER = os.path.join(os.path.dirname(__file__), 'videos')
+MANIFEST_URL = "http://meghavi-kiosk-api.onrender.com/api/videos/manifest"  # optional, falls back to the zip directory
+DOWNLOAD_CONNECTIONS = 4  # parallel Range connections for large transfers; 1 disables segmenting
+VIDEO_ROOT = os.path.dirname(os.path.abspath(__file__))  # holds videos.<n>/ generations and videos.current
 
 def open_screensaver():
     global _screensaver_proc
@@ -28,6 +33,11 @@ def open_screensaver():
 def close_screensaver():
     global _screensaver_proc
     if _screensaver_proc and _screensaver_proc.poll() is None:
+        # Let the screensaver hide its player cleanly before the process goes away
+        try:
+            send_command("hide")
+        except (ConnectionError, TimeoutError) as e:
+            print(f"[server.py] Screensaver did not acknowledge hide: {e}")
         _screensaver_proc.terminate()
         try:
             _screensaver_proc.wait(timeout=3)
@@ -41,6 +51,18 @@ def cleanup_screensaver():
 
 atexit.register(cleanup_screensaver)
 
+@app.route('/screensaver/<command>', methods=['POST'])
+def screensaver_command(command):
+    if not relay_allowed(request.remote_addr, request.headers.get("Origin")):
+        return jsonify({"ok": False, "error": "Screensaver commands are accepted from this machine only"}), 403
+    if command not in COMMANDS:
+        return jsonify({"ok": False, "error": f"Unknown command {command!r}"}), 400
+    try:
+        reply = send_command(command)
+    except (ConnectionError, TimeoutError) as e:
+        return jsonify({"ok": False, "error": str(e)}), 503
+    return jsonify(reply), 200 if reply.get("ok") else 500
+
 @app.route('/')
 def index():
     html = '''
@@ -69,7 +91,7 @@ def index():
     </head>
     <body>
         <video id="myVideo" loop playsinline>
-            <source src="/videos/video.mp4" type="video/mp4">
+            <source src="/videos/video.mp4{% if version %}?v={{ version }}{% endif %}" type="video/mp4">
             Your browser does not support the video tag.
         </video>
 
@@ -106,56 +128,80 @@ def index():
     </body>
     </html>
     '''
-    return render_template_string(html)
+    version = clip_versions(VIDEO_ROOT, video_folder_for(VIDEO_ROOT, None), ["video.mp4"]).get("video.mp4")
+    return render_template_string(html, version=version)
 
 @app.route('/videos/<path:filename>')
 def serve_video(filename):
-    return send_from_directory(VIDEO_FOLDER, filename)
+    folder = video_folder_for(VIDEO_ROOT, request.args.get('g'))
+    # ?v= is the clip's content hash from the page; such URLs are cached as immutable
+    return video_response(VIDEO_ROOT, folder, filename, request.args.get('v'))
+
+def enter_target_page(url):
+    print(f"✅ User ENTERED target page: {url} - Starting screensaver.py")
+    open_screensaver()
+
+def leave_target_page(url):
+    print(f"🚪 User LEFT target page. Now on: {url} - Stopping screensaver.py")
+    close_screensaver()
+
+# Repeats are dropped and quick enter/left flaps collapse; the screensaver is started
+# and stopped on the state machine's worker, not on the request thread
+page_state = PageStateMachine({"entered": enter_target_page, "left": leave_target_page})
 
+def handle_url_event(status, url):
+    """Queue a page transition; None if status is unknown."""
+    result = page_state.submit(status, url)
+    if result is None:
+        print(f"⚠️ Unknown status: {status!r} ({url})")
+    return result
+
+# Older extensions POST here; current ones push transitions over the extension channel
 @app.route('/url_matched', methods=['POST'])
 def url_matched():
     data = request.get_json()
-    status = data.get("status")
-    url = data.get("url")
-
-    if status == "entered":
-        print(f"✅ User ENTERED target page: {url} - Starting screensaver.py")
-        open_screensaver()
-    elif status == "left":
-        print(f"🚪 User LEFT target page. Now on: {url} - Stopping screensaver.py")
-        close_screensaver()
-    else:
-        print(f"⚠️ Unknown status: {data}")
-    
-    return jsonify({"status": "received"}), 200
+    result = handle_url_event(data.get("status"), data.get("url"))
+    if result is None:
+        return jsonify({"error": "Invalid status"}), 400
+    return jsonify(dict(result, status="received")), 200
 
-@app.route('/trigger-download', methods=['POST'])
-def trigger_download():
-    try:
-        print(f"[{datetime.now()}] Download started...")
+@app.route('/page-state')
+def page_state_metrics():
+    return jsonify(page_state.stats()), 200
 
-        response = requests.get(DOWNLOAD_URL)
-        if response.status_code != 200:
-            return jsonify({"error": "Failed to download zip"}), 500
+def run_download(progress):
+    print(f"[{datetime.now()}] Download started...")
 
-        with zipfile.ZipFile(BytesIO(response.content)) as zip_ref:
-            os.makedirs(EXTRACT_DIR, exist_ok=True)
-            zip_ref.extractall(EXTRACT_DIR)
+    # Only new or changed clips are fetched; clips removed upstream are deleted.
+    # Clips are synced into a new videos.<n> generation that goes live atomically
+    stats = sync_generation(DOWNLOAD_URL, VIDEO_ROOT, MANIFEST_URL, progress=progress,
+                            connections=DOWNLOAD_CONNECTIONS)
+    # Transcode new clips to the screen's resolution once; players pick the renditions up as they land
+    stats["renditions"] = ingest_renditions(VIDEO_ROOT)
 
-        videos_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'videos')
-        if os.path.exists(videos_path):
-            import shutil
-            shutil.rmtree(videos_path)
+    print(f"[{datetime.now()}] Download complete. Now playing {stats['generation']}")
+    return stats
 
-        extracted_full_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), EXTRACT_DIR)
-        os.rename(extracted_full_path, videos_path)
+download_jobs = DownloadJobs(run_download)
 
-        print(f"[{datetime.now()}] Download complete. Extracted to 'videos'")
-        return jsonify({"status": "Downloaded and extracted, videos folder replaced"}), 200
-
-    except Exception as e:
-        print("❌ Error:", e)
-        return jsonify({"error": str(e)}), 500
+@app.route('/trigger-download', methods=['POST'])
+def trigger_download():
+    # Returns at once; duplicate triggers while a download is queued or running share its job
+    job = download_jobs.submit()
+    return jsonify({"job_id": job["id"], "state": job["state"], "duplicate": job["duplicate"],
+                    "status_url": f"/download-status/{job['id']}"}), 202
+
+@app.route('/download-status/<job_id>')
+def download_status(job_id):
+    job = download_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job id"}), 404
+    return jsonify(job), 200
 
 if __name__ == '__main__':
-    app.run(port=5000)
+    extension = ExtensionChannel(handle_url_event)
+    serve(app, port=5000)
+    extension.close()
+    print(f"📡 Extension channel: {extension.stats()}")
+    page_state.close()
+    print(f"📄 Page state: {page_state.stats()}")
@@ -0,0 +1,138 @@
+"""Local stand-in for meghavi-kiosk-api's video endpoints.
+
+Zips a folder of clips and serves it the way the kiosk expects:
+
+    python stub_video_api.py --folder some_clips --port 8000
+
+then point DOWNLOAD_URL at http://127.0.0.1:8000/api/videos/download-all and
+MANIFEST_URL at http://127.0.0.1:8000/api/videos/manifest.
+
+--drop-after N cuts every pack response after N bytes to imitate flaky shop
+Wi-Fi, --throttle B caps each connection at B bytes/second, and
+--no-range-head hides Accept-Ranges on HEAD so the kiosk takes the
+whole-pack path instead of reading members by range.
+"""
+import os
+import io
+import json
+import time
+import socket
+import hashlib
+import zipfile
+import argparse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+DOWNLOAD_PATH = "/api/videos/download-all"
+MANIFEST_PATH = "/api/videos/manifest"
+
+
+def build_pack(folder):
+    """Return (zip bytes, manifest dict) for every file in folder."""
+    buf = io.BytesIO()
+    files = []
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_STORED) as zf:
+        for name in sorted(os.listdir(folder)):
+            path = os.path.join(folder, name)
+            if not os.path.isfile(path):
+                continue
+            with open(path, "rb") as f:
+                data = f.read()
+            zf.writestr(name, data)
+            files.append({"name": name, "size": len(data), "sha256": hashlib.sha256(data).hexdigest()})
+    return buf.getvalue(), {"files": files}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    pack = b""
+    etag = ""
+    manifest = {}
+    drop_after = None
+    throttle = None
+    range_head = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_pack(self, head_only):
+        data = self.pack
+        start, end = 0, len(data) - 1
+        status = 200
+        range_header = self.headers.get("Range")
+        if range_header and range_header.startswith("bytes="):
+            first, _, last = range_header[len("bytes="):].partition("-")
+            start = int(first) if first else max(0, len(data) - int(last))
+            end = min(int(last), len(data) - 1) if (first and last) else len(data) - 1
+            status = 206
+        body = data[start:end + 1]
+        self.send_response(status)
+        self.send_header("Content-Type", "application/zip")
+        if self.range_head or not head_only:
+            self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", self.etag)
+        self.send_header("Content-Length", str(len(body)))
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+        self.end_headers()
+        if head_only:
+            return
+        dropped = self.drop_after is not None and len(body) > self.drop_after
+        if dropped:
+            body = body[:self.drop_after]
+        if self.throttle:
+            step = 16 * 1024
+            for offset in range(0, len(body), step):
+                self.wfile.write(body[offset:offset + step])
+                time.sleep(step / self.throttle)
+        else:
+            self.wfile.write(body)
+        if dropped:
+            # Hang up mid-transfer
+            self.wfile.flush()
+            self.close_connection = True
+            self.connection.shutdown(socket.SHUT_RDWR)
+
+    def do_HEAD(self):
+        if self.path == DOWNLOAD_PATH:
+            self._send_pack(head_only=True)
+        else:
+            self.send_error(404)
+
+    def do_GET(self):
+        if self.path == DOWNLOAD_PATH:
+            self._send_pack(head_only=False)
+        elif self.path == MANIFEST_PATH:
+            body = json.dumps(self.manifest).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self.send_error(404)
+
+
+def make_server(folder, port=8000, drop_after=None, throttle=None, range_head=True):
+    pack, manifest = build_pack(folder)
+    handler = type("Handler", (StubHandler,), {
+        "pack": pack,
+        "etag": '"' + hashlib.sha256(pack).hexdigest()[:16] + '"',
+        "manifest": manifest,
+        "drop_after": drop_after,
+        "throttle": throttle,
+        "range_head": range_head,
+    })
+    return ThreadingHTTPServer(("127.0.0.1", port), handler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--folder", required=True)
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--drop-after", type=int, default=None, help="bytes sent before dropping each response")
+    parser.add_argument("--throttle", type=int, default=None, help="bytes/second per connection")
+    parser.add_argument("--no-range-head", action="store_true", help="don't advertise Range support on HEAD")
+    args = parser.parse_args()
+    server = make_server(args.folder, args.port, drop_after=args.drop_after, throttle=args.throttle,
+                         range_head=not args.no_range_head)
+    print(f"Serving {args.folder} on http://127.0.0.1:{args.port}{DOWNLOAD_PATH}")
+    server.serve_forever()
@@ -1,13 +1,13 @@
 import cv2
 import time
-from ultralytics import YOLO
+from face_detector import load_detector, measure_faces, draw_faces
 
 # --- Distance calculation constants
 a = 9703.20
 b = -0.4911842338691967
 
 # --- Load YOLO model
-model = YOLO("models/model.pt")  # Ensure this path is correct
+detector = load_detector("models/model.pt")  # Ensure this path is correct
 
 # --- Get user-defined distance threshold
 try:
@@ -30,35 +30,8 @@ while True:
         break
 
     # Run YOLO face detection
-    results = model(frame, conf=0.4, verbose=False)
-    detections = results[0].boxes
-    annotated = frame.copy()
-
-    if detections is not None:
-        for box in detections:
-            conf = float(box.conf[0])
-            if conf < 0.4:
-                continue
-
-            x1, y1, x2, y2 = map(int, box.xyxy[0])
-            area_px = (x2 - x1) * (y2 - y1)
-            distance = a * (area_px ** b)
-
-            # Color based on threshold
-            color = (0, 255, 0) if distance < max_distance else (0, 0, 255)
-            label = f"{distance:.1f}cm"
-
-            # Draw bounding box and distance label
-            cv2.rectangle(annotated, (x1, y1), (x2, y2), color, 2)
-            cv2.putText(
-                annotated,
-                label,
-                (x1, y1 - 10),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.6,
-                color,
-                2
-            )
+    faces = measure_faces(detector.detect(frame), a, b, max_distance)
+    annotated = draw_faces(frame.copy(), faces)
 
     # Show the annotated frame
     cv2.imshow("YOLO Face Distance", annotated)
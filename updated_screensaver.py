@@ -1,9 +1,8 @@
 import os
 import sys
 import time
-import cv2
-from multiprocessing import Process
-from ultralytics import YOLO
+import threading
+from face_detector import load_detector, FocusedDetector, measure_faces
 import tkinter as tk
 import ctypes  # for mouse click detection
 
@@ -12,6 +11,14 @@ vlc_path = r"C:\Program Files\VideoLAN\VLC"
 os.environ["PATH"] = vlc_path + os.pathsep + os.environ.get("PATH", "")
 os.environ["VLC_PLUGIN_PATH"] = vlc_path
 import vlc
+from inference_scheduler import InferenceScheduler
+from face_tracker import FaceTracker
+from presence import PresenceMonitor
+from camera_capture import LatestFrameCapture
+from player_service import PlayerService, TkCommandPump
+from control_channel import ControlServer
+from video_store import current_generation, current_video_folder, acquire_lease, release_lease
+from video_renditions import preferred_paths
 
 # Constants
 A = 9703.20
@@ -20,17 +27,25 @@ MODEL_PATH = "models/model.pt"
 FACE_DISTANCE_THRESHOLD = 110
 NO_FACE_TIMER_SECONDS = 5
 COOLDOWN_SECONDS = 10
-STOP_VLC_FLAG = os.path.join(os.path.dirname(__file__), "stop_vlc.txt")
+VIDEO_ROOT = os.path.dirname(os.path.abspath(__file__))
 
 
-def run_vlc_loop_all_videos():
-    video_folder = os.path.join(os.path.dirname(__file__), "videos")
+def current_video_paths():
+    video_folder = current_video_folder(VIDEO_ROOT)
+    if not os.path.isdir(video_folder):
+        return []
     video_files = [f for f in os.listdir(video_folder) if f.lower().endswith(".mp4")]
-    if not video_files:
-        print("⚠️ No .mp4 files found in 'videos' folder.")
-        return
+    return preferred_paths(VIDEO_ROOT, video_folder, sorted(video_files))
+
 
-    video_paths = [os.path.join(video_folder, f) for f in sorted(video_files)]
+def run_vlc_player(conn):
+    """Long-lived VLC player: built once, then shown and hidden on command."""
+    generation = current_generation(VIDEO_ROOT)
+    video_paths = current_video_paths()
+    if not video_paths:
+        print("⚠️ No .mp4 files found in 'videos' folder.")
+    else:
+        acquire_lease(VIDEO_ROOT, generation)
 
     instance = vlc.Instance(
         "--no-video-title-show",
@@ -38,19 +53,31 @@ def run_vlc_loop_all_videos():
         "--no-video-deco"
     )
 
-    media_list = instance.media_list_new(video_paths)
+    def load_playlist(paths):
+        media_list = instance.media_list_new(paths)
+        # Probe every clip now, while hidden, rather than on the first show
+        for i in range(media_list.count()):
+            media_list.item_at_index(i).parse_with_options(vlc.MediaParseFlag.local, 0)
+        return media_list
+
+    media_list = load_playlist(video_paths)
     list_player = instance.media_list_player_new()
     list_player.set_media_list(media_list)
     list_player.set_playback_mode(vlc.PlaybackMode.loop)
+    media_player = list_player.get_media_player()
 
-    # Create Tkinter fullscreen window
+    # Set from VLC's event thread; the playlist itself is only touched from Tk
+    clip_boundary = threading.Event()
+    list_player.event_manager().event_attach(
+        vlc.EventType.MediaListPlayerNextItemSet, lambda event: clip_boundary.set()
+    )
+
+    # Create Tkinter fullscreen window, hidden until the first show
     root = tk.Tk()
     root.attributes('-fullscreen', True)
     root.attributes('-topmost', True)
     root.overrideredirect(True)  # remove window decorations
-
-    # Close on Escape
-    root.bind("<Escape>", lambda e: on_click_override(list_player, root))
+    root.withdraw()
 
     # VLC video frame
     video_frame = tk.Frame(root, bg='black')
@@ -58,121 +85,202 @@ def run_vlc_loop_all_videos():
 
     if sys.platform == "win32":
         video_frame_id = video_frame.winfo_id()
-        list_player.get_media_player().set_hwnd(video_frame_id)
+        media_player.set_hwnd(video_frame_id)
     elif sys.platform == "linux":
         video_frame_id = video_frame.winfo_id()
-        list_player.get_media_player().set_xwindow(video_frame_id)
+        media_player.set_xwindow(video_frame_id)
 
-    list_player.play()
-    root.lift()
-    root.focus_force()
+    visible = False
+    started = False
 
-    def on_click_override(player, window):
-        print("🟡 Click detected — writing stop flag and closing VLC")
-        with open(STOP_VLC_FLAG, 'w'):
-            pass
-        player.stop()
-        window.quit()
+    def switch_generation_if_needed(force=False):
+        nonlocal generation, media_list, started
+        latest = current_generation(VIDEO_ROOT)
+        if latest == generation and not force:
+            return True
+        paths = current_video_paths()
+        if not paths:
+            return False
+        print(f"🔀 Loading videos from {latest}")
+        media_list = load_playlist(paths)
+        list_player.set_media_list(media_list)
+        if visible:
+            list_player.play_item_at_index(0)
+        else:
+            started = False
+        generation = latest
+        acquire_lease(VIDEO_ROOT, generation)
+        return True
 
-    # Periodically check for click or external stop flag
-    def check_events():
-        # External stop flag
-        if os.path.exists(STOP_VLC_FLAG):
-            print("🟥 Detected stop_vlc.txt — closing screensaver")
+    def show():
+        nonlocal visible, started
+        switch_generation_if_needed()
+        if media_list.count() == 0:
+            return False
+        root.deiconify()
+        root.lift()
+        root.focus_force()
+        if started:
+            media_player.set_pause(0)
+        else:
+            list_player.play()
+            started = True
+        visible = True
+        root.after(100, check_events)
+        return True
+
+    def hide():
+        nonlocal visible
+        media_player.set_pause(1)
+        root.withdraw()
+        visible = False
+        return True
+
+    def dismiss():
+        print("🟡 Click detected — hiding screensaver")
+        hide()
+        pump.event("dismissed")
+
+    def handle(name):
+        if name == "show":
+            return show()
+        if name == "hide":
+            return hide()
+        if name == "pause":
+            media_player.set_pause(1)
+            return True
+        if name == "reload-playlist":
+            return switch_generation_if_needed(force=True)
+        if name == "stop":
             list_player.stop()
             root.quit()
+            return True
+        return False
+
+    pump = TkCommandPump(conn, root, handle)
+
+    # Close on Escape
+    root.bind("<Escape>", lambda e: dismiss())
+
+    # While visible, watch for a click (VLC's window swallows Tk's) or a new video generation
+    def check_events():
+        if not visible:
             return
         # Check left mouse button
         if ctypes.windll.user32.GetAsyncKeyState(0x01) & 0x8000:
-            on_click_override(list_player, root)
+            dismiss()
             return
+        if clip_boundary.is_set():
+            clip_boundary.clear()
+            switch_generation_if_needed()
         root.after(100, check_events)
 
-    root.after(100, check_events)
-    root.mainloop()
+    try:
+        root.mainloop()
+    finally:
+        release_lease(VIDEO_ROOT)
 
 
 def face_detection_loop():
-    model = YOLO(MODEL_PATH)
-    cap = cv2.VideoCapture(0)
-    camera_working = cap.isOpened()
+    detector = FocusedDetector(load_detector(MODEL_PATH), FACE_DISTANCE_THRESHOLD, A, B)
+    # The capture thread keeps only the newest frame, so the motion gate and YOLO
+    # never see frames that queued up in the driver while the loop slept
+    cap = LatestFrameCapture(0)
+    camera_working = cap.start()
     if not camera_working:
         print("🚫 Could not access webcam. Assuming no human is present.")
 
-    screensaver_proc = None
-    no_face_time = None
+    player = PlayerService(run_vlc_player)
+    player.start()
+    screensaver_visible = False
     cooldown_until = 0
+    scheduler = InferenceScheduler(FACE_DISTANCE_THRESHOLD)
+    tracker = FaceTracker()
+    presence = PresenceMonitor(FACE_DISTANCE_THRESHOLD, NO_FACE_TIMER_SECONDS)
+    nearest = None
+    control = ControlServer()
+
+    def handle_control(command):
+        nonlocal screensaver_visible, cooldown_until
+        if command == "hide":
+            print("🟥 Hide requested — hiding VLC and entering cooldown")
+            if screensaver_visible:
+                player.command("hide")
+                screensaver_visible = False
+                presence.count("screensaver_stops")
+            cooldown_until = time.time() + COOLDOWN_SECONDS
+            return {"visible": False}
+        if command == "show":
+            if not screensaver_visible:
+                screensaver_visible = player.command("show")
+                if screensaver_visible:
+                    presence.count("screensaver_starts")
+            return {"visible": screensaver_visible}
+        if command in ("pause", "reload-playlist"):
+            return {"ok": player.command(command)}
+        return {
+            "visible": screensaver_visible,
+            "present": presence.present,
+            "cooldown_seconds": max(0.0, round(cooldown_until - time.time(), 1)),
+            "presence": presence.stats(),
+            "player": player.stats(),
+        }
 
     try:
         while True:
-            # Handle stop flag
-            if os.path.exists(STOP_VLC_FLAG):
-                print("🟥 STOP flag detected — closing VLC and entering cooldown")
-                if screensaver_proc and screensaver_proc.is_alive():
-                    screensaver_proc.terminate()
-                    screensaver_proc.join()
-                    screensaver_proc = None
-                os.remove(STOP_VLC_FLAG)
+            control.dispatch(handle_control)
+            if "dismissed" in player.events():
+                print("🟡 Screensaver clicked away — entering cooldown")
+                screensaver_visible = False
+                presence.count("screensaver_stops")
                 cooldown_until = time.time() + COOLDOWN_SECONDS
-                continue
 
             if camera_working:
-                ret, frame = cap.read()
-                if not ret:
+                frame = cap.read()
+                if frame is None:
                     print("⚠️ Failed to grab frame. Assuming no human is present.")
                     camera_working = False
                     continue
 
-                results = model(frame, conf=0.4, verbose=False)
-                boxes = results[0].boxes
-                face_in_range = False
-
-                if boxes is not None:
-                    for box in boxes:
-                        x1, y1, x2, y2 = map(int, box.xyxy[0])
-                        area = (x2 - x1) * (y2 - y1)
-                        distance = A * (area ** B)
-                        if distance < FACE_DISTANCE_THRESHOLD:
-                            face_in_range = True
-                            break
-
-                if face_in_range:
-                    no_face_time = None
-                    if screensaver_proc and screensaver_proc.is_alive():
-                        print("🟢 Face detected — stopping screensaver")
-                        screensaver_proc.terminate()
-                        screensaver_proc.join()
-                        screensaver_proc = None
-                else:
-                    if no_face_time is None:
-                        no_face_time = time.time()
-                    elif time.time() - no_face_time >= NO_FACE_TIMER_SECONDS:
-                        if time.time() < cooldown_until:
-                            print("⏳ In cooldown — not restarting screensaver")
-                        elif not (screensaver_proc and screensaver_proc.is_alive()):
-                            print("🟡 No face & cooldown passed — launching screensaver")
-                            screensaver_proc = Process(target=run_vlc_loop_all_videos)
-                            screensaver_proc.start()
+                if tracker.wants_detection(scheduler.should_infer(frame)):
+                    boxes = detector.detect(frame)
+                    tracker.start(frame, boxes)
+                    nearest = measure_faces(boxes, A, B, FACE_DISTANCE_THRESHOLD).nearest
+                    scheduler.record(nearest)
+                elif tracker.tracks:
+                    nearest = measure_faces(tracker.update(frame), A, B, FACE_DISTANCE_THRESHOLD).nearest
             else:
                 # Camera not working, assume no human is present
-                if no_face_time is None:
-                    no_face_time = time.time()
-                elif time.time() - no_face_time >= NO_FACE_TIMER_SECONDS:
-                    if time.time() < cooldown_until:
-                        print("⏳ In cooldown — not restarting screensaver")
-                    elif not (screensaver_proc and screensaver_proc.is_alive()):
-                        print("🟡 Camera not working & cooldown passed — launching screensaver")
-                        screensaver_proc = Process(target=run_vlc_loop_all_videos)
-                        screensaver_proc.start()
-
-            time.sleep(0.1)
+                nearest = None
+            presence.update(nearest)
+
+            if presence.present:
+                if screensaver_visible:
+                    print("🟢 Face detected — hiding screensaver")
+                    player.command("hide")
+                    screensaver_visible = False
+                    presence.count("screensaver_stops")
+            elif not screensaver_visible:
+                if time.time() < cooldown_until:
+                    print("⏳ In cooldown — not restarting screensaver")
+                else:
+                    if camera_working:
+                        print("🟡 No face & cooldown passed — showing screensaver")
+                    else:
+                        print("🟡 Camera not working & cooldown passed — showing screensaver")
+                    screensaver_visible = player.command("show")
+                    if screensaver_visible:
+                        presence.count("screensaver_starts")
+
+            control.wait(scheduler.sleep_time() if camera_working else 0.1)
 
     finally:
-        if camera_working:
-            cap.release()
-        if screensaver_proc and screensaver_proc.is_alive():
-            screensaver_proc.terminate()
-            screensaver_proc.join()
+        print(f"📷 Capture stats: {cap.stats()}")
+        cap.release()
+        control.close()
+        presence.flush()
+        print(f"🎬 Player latency: {player.stats()}")
+        player.stop()
 
 if __name__ == "__main__":
     face_detection_loop()
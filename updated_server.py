@@ -1,28 +1,34 @@
 # ✅ Updated server.py with /url_matched logic and improved screensaver control
-from flask import Flask, request, jsonify, send_from_directory, render_template_string
+from flask import Flask, request, jsonify
 from flask_cors import CORS
 import os
-import requests
-import zipfile
-import shutil
-import time
-from io import BytesIO
 from datetime import datetime
 import subprocess
 import sys
-import glob
+from video_store import sync_generation, video_folder_for
+from video_renditions import ingest_renditions
+from video_serving import video_response
+from playlist_index import PlaylistIndex
+from screensaver_page import screensaver_page
+from download_jobs import DownloadJobs
+from control_channel import send_command, relay_allowed, COMMANDS
+from wsgi_server import serve
+from extension_channel import ExtensionChannel
+from page_state import PageStateMachine
 
 app = Flask(__name__)
-CORS(app)
+# Everything but the screensaver relay, which must never be reachable from a web page
+CORS(app, resources={r"/(?!screensaver/).*": {}})
 
 # Global screensaver process handle
 _screensaver_proc = None
 
 # Paths
 DOWNLOAD_URL = "http://meghavi-kiosk-api.onrender.com/api/videos/download-all"
-VIDEO_FOLDER = os.path.join(os.path.dirname(__file__), 'videos')
-TEMP_FOLDER = os.path.join(os.path.dirname(__file__), 'videos_new')
-STOP_VLC_FLAG = os.path.join(os.path.dirname(__file__), 'stop_vlc.txt')
+MANIFEST_URL = "http://meghavi-kiosk-api.onrender.com/api/videos/manifest"  # optional, falls back to the zip directory
+DOWNLOAD_CONNECTIONS = 4  # parallel Range connections for large transfers; 1 disables segmenting
+VIDEO_ROOT = os.path.dirname(os.path.abspath(__file__))  # holds videos.<n>/ generations and videos.current
+playlist_index = PlaylistIndex(VIDEO_ROOT)
 
 # --- Screensaver process control
 
@@ -37,121 +43,123 @@ def close_screensaver():
     global _screensaver_proc
     if _screensaver_proc is not None and _screensaver_proc.poll() is None:
         print(f"🟡 Attempting to stop screensaver process with PID: {_screensaver_proc.pid}")
-        # Signal the screensaver to stop gracefully
-        with open(STOP_VLC_FLAG, "w") as f:
-            f.write("stop")
-        time.sleep(2)  # Give it 2 seconds to stop
-        if _screensaver_proc.poll() is None:
-            print(f"🟠 Screensaver did not stop gracefully, terminating process...")
-            _screensaver_proc.terminate()
-            try:
-                _screensaver_proc.wait(timeout=3)
-            except subprocess.TimeoutExpired:
-                print(f"🔴 Screensaver process did not terminate, killing...")
-                _screensaver_proc.kill()
+        # Ask the screensaver to hide its player first; it answers once the window is gone
+        try:
+            reply = send_command("hide")
+            print(f"🟢 Screensaver acknowledged hide: {reply}")
+        except (ConnectionError, TimeoutError) as e:
+            print(f"🟠 Screensaver did not acknowledge hide ({e}), terminating anyway...")
+        _screensaver_proc.terminate()
+        try:
+            _screensaver_proc.wait(timeout=3)
+        except subprocess.TimeoutExpired:
+            print(f"🔴 Screensaver process did not terminate, killing...")
+            _screensaver_proc.kill()
         _screensaver_proc = None
         print(f"🟢 Screensaver process stopped.")
     else:
         print(f"🟢 No active screensaver process to stop.")
 
-# --- URL matched endpoint from Chrome extension
+# --- Page transitions from the Chrome extension
+def enter_target_page(url):
+    print(f"✅ ENTERED target page: {url} — launching screensaver")
+    open_screensaver()
+
+def leave_target_page(url):
+    print(f"🚪 LEFT target page: {url} — closing screensaver")
+    close_screensaver()
+
+# Repeats are dropped and quick enter/left flaps collapse; closing the screensaver
+# (which waits for its hide acknowledgement) runs on the state machine's worker
+page_state = PageStateMachine({"entered": enter_target_page, "left": leave_target_page})
+
+def handle_url_event(status, url):
+    """Queue a page transition; None if status is unknown."""
+    result = page_state.submit(status, url)
+    if result is None:
+        print(f"⚠️ Unknown URL event: {status!r} ({url})")
+    return result
+
+# Older extensions POST here; current ones push transitions over the extension channel
 @app.route('/url_matched', methods=['POST'])
 def url_matched():
     data = request.get_json()
-    status = data.get("status")
-    url = data.get("url")
-
-    if status == "entered":
-        print(f"✅ ENTERED target page: {url} — launching screensaver")
-        open_screensaver()
-    elif status == "left":
-        print(f"🚪 LEFT target page: {url} — closing screensaver")
-        close_screensaver()
-    else:
-        print(f"⚠️ Unknown URL event: {data}")
-
-    return jsonify({"status": "received"}), 200
+    result = handle_url_event(data.get("status"), data.get("url"))
+    if result is None:
+        return jsonify({"error": "Invalid status"}), 400
+    return jsonify(dict(result, status="received")), 200
+
+@app.route('/page-state')
+def page_state_metrics():
+    return jsonify(page_state.stats()), 200
+
+# --- Relay a command to the running screensaver over the control channel
+@app.route('/screensaver/<command>', methods=['POST'])
+def screensaver_command(command):
+    if not relay_allowed(request.remote_addr, request.headers.get("Origin")):
+        return jsonify({"ok": False, "error": "Screensaver commands are accepted from this machine only"}), 403
+    if command not in COMMANDS:
+        return jsonify({"ok": False, "error": f"Unknown command {command!r}"}), 400
+    try:
+        reply = send_command(command)
+    except (ConnectionError, TimeoutError) as e:
+        return jsonify({"ok": False, "error": str(e)}), 503
+    return jsonify(reply), 200 if reply.get("ok") else 500
 
 # --- Video preview page
+# Static page; it fetches the clip list from /playlist
+SCREENSAVER_PAGE = screensaver_page(muted=True)
+
 @app.route('/')
 def index():
-    video_files = [os.path.basename(f) for f in glob.glob(os.path.join(VIDEO_FOLDER, '*.mp4'))]
-    html = '''
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Screensaver Videos</title>
-        <style>body, html { margin:0; padding:0; background:black; height:100%; width:100%; overflow:hidden; }</style>
-    </head>
-    <body>
-        <video id="screensaverVideo" width="100%" height="100%" autoplay muted></video>
-        <script>
-            const videos = {{ videos|safe }};
-            let idx = 0;
-            const videoElem = document.getElementById('screensaverVideo');
-            function playNext() {
-                videoElem.src = '/videos/' + videos[idx];
-                videoElem.play();
-            }
-            videoElem.onended = function() {
-                idx = (idx + 1) % videos.length;
-                playNext();
-            };
-            if (videos.length > 0) {
-                playNext();
-            }
-        </script>
-    </body>
-    </html>
-    '''
-    return render_template_string(html, videos=video_files)
+    return SCREENSAVER_PAGE.response()
+
+@app.route('/playlist')
+def playlist():
+    return playlist_index.response()
 
 @app.route('/videos/<path:filename>')
 def serve_video(filename):
-    return send_from_directory(VIDEO_FOLDER, filename)
+    # ?g= pins the generation the page started the clip from, so a switch mid-clip is harmless
+    folder = video_folder_for(VIDEO_ROOT, request.args.get('g'))
+    # ?v= is the clip's content hash from the page; such URLs are cached as immutable
+    return video_response(VIDEO_ROOT, folder, filename, request.args.get('v'))
 
 # --- Triggered by Chrome extension or scheduled alarm
+def run_download(progress):
+    print(f"[{datetime.now()}] 🔔 Triggered video update...")
+
+    # Only changed clips are fetched, into a new videos.<n> generation that goes live
+    # atomically; VLC keeps playing and switches over at its next clip boundary
+    stats = sync_generation(DOWNLOAD_URL, VIDEO_ROOT, MANIFEST_URL, progress=progress,
+                            connections=DOWNLOAD_CONNECTIONS)
+    # Transcode new clips to the screen's resolution once; players pick the renditions up as they land
+    stats["renditions"] = ingest_renditions(VIDEO_ROOT)
+    playlist_index.invalidate()
+
+    print(f"[{datetime.now()}] ✅ Video update completed.")
+    return stats
+
+download_jobs = DownloadJobs(run_download)
+
 @app.route('/trigger-download', methods=['POST'])
 def trigger_download():
-    try:
-        print(f"[{datetime.now()}] 🔔 Triggered video update...")
-
-        # Signal to stop VLC
-        with open(STOP_VLC_FLAG, "w") as f:
-            f.write("stop")
-
-        # Wait for VLC to release files
-        for attempt in range(5):
-            try:
-                if os.path.exists(VIDEO_FOLDER):
-                    shutil.rmtree(VIDEO_FOLDER)
-                break
-            except Exception as e:
-                print(f"⏳ Attempt {attempt+1}/5 — Waiting for VLC to release video files... {e}")
-                time.sleep(1)
-        else:
-            return jsonify({"error": "Could not delete videos folder after 5 tries"}), 500
-
-        # Download video ZIP
-        response = requests.get(DOWNLOAD_URL)
-        if response.status_code != 200:
-            return jsonify({"error": "Failed to download video zip"}), 500
-
-        # Extract to temp
-        if os.path.exists(TEMP_FOLDER):
-            shutil.rmtree(TEMP_FOLDER)
-        with zipfile.ZipFile(BytesIO(response.content)) as zip_ref:
-            os.makedirs(TEMP_FOLDER, exist_ok=True)
-            zip_ref.extractall(TEMP_FOLDER)
-
-        os.rename(TEMP_FOLDER, VIDEO_FOLDER)
-
-        print(f"[{datetime.now()}] ✅ Video update completed.")
-        return jsonify({"status": "Videos updated successfully"}), 200
-
-    except Exception as e:
-        print(f"❌ Error in /trigger-download: {e}")
-        return jsonify({"error": str(e)}), 500
+    # Returns at once; duplicate triggers while a download is queued or running share its job
+    job = download_jobs.submit()
+    return jsonify({"job_id": job["id"], "state": job["state"], "duplicate": job["duplicate"],
+                    "status_url": f"/download-status/{job['id']}"}), 202
+
+@app.route('/download-status/<job_id>')
+def download_status(job_id):
+    job = download_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job id"}), 404
+    return jsonify(job), 200
 
 if __name__ == '__main__':
-    app.run(port=5000)
+    extension = ExtensionChannel(handle_url_event)
+    serve(app, port=5000)
+    extension.close()
+    print(f"📡 Extension channel: {extension.stats()}")
+    page_state.close()
+    print(f"📄 Page state: {page_state.stats()}")
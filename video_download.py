@@ -0,0 +1,359 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import zipfile
+import tempfile
+import threading
+import urllib3
+import requests
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+# --- Transfer tuning
+CHUNK_SIZE = 1024 * 1024  # bytes read from the socket / zip entry at a time
+SPOOL_MAX_SIZE = 8 * 1024 * 1024  # small packs stay in RAM, bigger ones roll over to disk
+RESUME_CHUNK_SIZE = 64 * 1024  # largest single read on resumable transfers
+DOWNLOAD_TIMEOUT = 30  # seconds per socket read, not for the whole transfer
+MAX_RETRIES = 8  # attempts after the first one before giving up
+BACKOFF_BASE = 1.0  # seconds before the first retry, doubled each time
+BACKOFF_MAX = 60.0  # cap on a single backoff sleep
+DOWNLOAD_CONNECTIONS = 1  # parallel Range connections; 1 keeps the single-stream path
+SEGMENT_MIN_SIZE = 4 * 1024 * 1024  # never split a transfer into pieces smaller than this
+
+
+class IncompleteDownload(Exception):
+    pass
+
+
+class PackChanged(Exception):
+    pass
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process in bytes, or None if unknown."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KiB, macOS reports bytes
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        # peak_wset only exists on Windows
+        return getattr(info, "peak_wset", info.rss)
+    except ImportError:
+        return None
+
+
+def _member_path(dest_dir, name):
+    """Resolve a zip member name inside dest_dir, refusing anything that escapes it."""
+    parts = name.replace("\\", "/").split("/")
+    if name.startswith(("/", "\\")) or ":" in name or ".." in parts:
+        # Absolute paths, drive letters and parent references never belong in a video pack
+        raise zipfile.BadZipFile(f"Unsafe path in zip: {name}")
+    root = os.path.realpath(dest_dir)
+    target = os.path.realpath(os.path.join(root, name))
+    if target != root and not target.startswith(root + os.sep):
+        raise zipfile.BadZipFile(f"Unsafe path in zip: {name}")
+    return target
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_MAX):
+    """Exponential backoff with jitter for the given 0-based retry attempt."""
+    delay = min(cap, base * (2 ** attempt))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def is_retryable(error):
+    """Network drops, timeouts and 5xx answers are worth retrying; other 4xx are not."""
+    if isinstance(error, IncompleteDownload):
+        return True
+    if isinstance(error, requests.exceptions.HTTPError):
+        response = error.response
+        return response is None or response.status_code >= 500
+    return isinstance(error, requests.exceptions.RequestException)
+
+
+def iter_received(response, chunk_size=RESUME_CHUNK_SIZE):
+    """Yield a streamed response's body as it arrives, at most chunk_size bytes at a time.
+
+    iter_content() waits for a full chunk_size and throws the partial one
+    away when the connection drops, so a drop shorter than a chunk would
+    make no progress at all. read1() hands over whatever has been
+    received, so a resume starts right where the connection broke.
+    """
+    read1 = getattr(response.raw, "read1", None)
+    if read1 is None:
+        # urllib3 < 2 has no read1(); fall back to small reads
+        yield from response.iter_content(chunk_size=min(chunk_size, 8 * 1024))
+        return
+    while True:
+        # Raise the same requests exceptions iter_content() would
+        try:
+            chunk = read1(chunk_size, decode_content=True)
+        except urllib3.exceptions.ProtocolError as e:
+            raise requests.exceptions.ChunkedEncodingError(e)
+        except urllib3.exceptions.ReadTimeoutError as e:
+            raise requests.exceptions.ConnectionError(e)
+        except urllib3.exceptions.DecodeError as e:
+            raise requests.exceptions.ContentDecodingError(e)
+        if not chunk:
+            return
+        yield chunk
+
+
+def _read_meta(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_meta(path, meta):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+
+def resumable_download(url, path, timeout=DOWNLOAD_TIMEOUT, chunk_size=RESUME_CHUNK_SIZE,
+                       retries=MAX_RETRIES, session=None, progress=None):
+    """Download url to path, resuming from path + '.part' with Range requests.
+
+    Partial data and the server's ETag/length survive failures (and process
+    restarts), so a dropped connection only costs the bytes still missing.
+    Retries back off exponentially; only attempts that made no progress
+    count towards the retry limit. The finished file must match the
+    announced length before it is renamed into place. Returns the byte count.
+    """
+    session = session or requests.Session()
+    part = path + ".part"
+    meta_path = part + ".json"
+    meta = _read_meta(meta_path)
+    if meta.get("url") != url:
+        # Partial data from a different source can't be resumed
+        meta = {"url": url}
+        if os.path.exists(part):
+            os.remove(part)
+    attempt = 0
+    while True:
+        have = had = os.path.getsize(part) if os.path.exists(part) else 0
+        headers = {}
+        if have:
+            headers["Range"] = f"bytes={have}-"
+            if meta.get("etag"):
+                # If the pack changed upstream the server sends it whole instead
+                headers["If-Range"] = meta["etag"]
+        try:
+            with session.get(url, headers=headers, stream=True, timeout=timeout) as response:
+                if response.status_code == 416 and have:
+                    if have != meta.get("total"):
+                        os.remove(part)
+                        raise IncompleteDownload("partial file no longer matches the server, starting over")
+                    # otherwise everything was already on disk
+                else:
+                    response.raise_for_status()
+                    if response.status_code == 206:
+                        total = int(response.headers["Content-Range"].rsplit("/", 1)[1])
+                        mode = "ab"
+                    else:
+                        if have:
+                            print("⚠️ Server ignored the Range request, restarting from byte 0")
+                        length = response.headers.get("Content-Length")
+                        total = int(length) if length is not None else None
+                        have = 0
+                        mode = "wb"
+                    meta.update(total=total, etag=response.headers.get("ETag"))
+                    _write_meta(meta_path, meta)
+                    with open(part, mode) as f:
+                        for chunk in iter_received(response, chunk_size):
+                            if chunk:
+                                f.write(chunk)
+                                have += len(chunk)
+                                if progress is not None:
+                                    progress(bytes_done=have, bytes_total=total)
+            total = meta.get("total")
+            size = os.path.getsize(part)
+            if total is not None and size != total:
+                raise IncompleteDownload(f"got {size} of {total} bytes")
+            os.replace(part, path)
+            os.remove(meta_path)
+            return size
+        except Exception as e:
+            if os.path.exists(part) and os.path.getsize(part) > had:
+                attempt = 0  # the connection dropped but we got further
+            if not is_retryable(e) or attempt == retries:
+                raise
+            delay = backoff_delay(attempt)
+            attempt += 1
+            print(f"⏳ Download interrupted ({e}); retry {attempt}/{retries} in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def probe_ranges(url, timeout=DOWNLOAD_TIMEOUT, session=None):
+    """Return (total size, ETag) if url answers Range requests with 206, else None."""
+    session = session or requests.Session()
+    with session.get(url, headers={"Range": "bytes=0-0"}, stream=True, timeout=timeout) as response:
+        if response.status_code != 206 or "Content-Range" not in response.headers:
+            return None
+        total = response.headers["Content-Range"].rsplit("/", 1)[1]
+        if not total.isdigit():
+            return None
+        return int(total), response.headers.get("ETag")
+
+
+def split_spans(spans, connections, min_size=SEGMENT_MIN_SIZE):
+    """Cut inclusive (start, end) spans into roughly equal segments for the worker pool."""
+    total = sum(end - start + 1 for start, end in spans)
+    size = max(min_size, -(-total // max(1, connections)))
+    segments = []
+    for start, end in spans:
+        while start <= end:
+            segments.append((start, min(end, start + size - 1)))
+            start += size
+    return segments
+
+
+def segmented_download(url, path, spans=None, connections=DOWNLOAD_CONNECTIONS, timeout=DOWNLOAD_TIMEOUT,
+                       retries=MAX_RETRIES, progress=None):
+    """Fetch byte spans of url over several connections straight into path at their offsets.
+
+    spans defaults to the whole file. Each worker streams its segment
+    directly to its own handle on the pre-sized file, so nothing is
+    reassembled in memory; a dropped segment resumes where it stopped.
+    Returns (bytes fetched, total size), or None if the server can't do
+    Range requests and the caller should fall back to a single stream.
+    """
+    session = requests.Session()
+    probed = probe_ranges(url, timeout=timeout, session=session)
+    if probed is None:
+        return None
+    total, etag = probed
+    if spans is None:
+        spans = [(0, total - 1)]
+    segments = split_spans(spans, connections)
+    if not os.path.exists(path) or os.path.getsize(path) != total:
+        with open(path, "wb") as f:
+            f.truncate(total)
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max(1, connections))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    lock = threading.Lock()
+    done = {"bytes": 0}
+    wanted = sum(end - start + 1 for start, end in segments)
+
+    def fetch(segment):
+        start, end = segment
+        pos = start
+        attempt = 0
+        with open(path, "r+b") as f:
+            while pos <= end:
+                had = pos
+                headers = {"Range": f"bytes={pos}-{end}"}
+                if etag:
+                    headers["If-Range"] = etag
+                try:
+                    with session.get(url, headers=headers, stream=True, timeout=timeout) as response:
+                        response.raise_for_status()
+                        if response.status_code != 206:
+                            raise PackChanged("pack changed upstream during a segmented download")
+                        f.seek(pos)
+                        for chunk in iter_received(response):
+                            chunk = chunk[:end - pos + 1]
+                            f.write(chunk)
+                            pos += len(chunk)
+                            with lock:
+                                done["bytes"] += len(chunk)
+                                if progress is not None:
+                                    progress(bytes_done=done["bytes"], bytes_total=wanted)
+                    if pos <= end:
+                        raise IncompleteDownload(f"segment {start}-{end} stopped at {pos}")
+                except Exception as e:
+                    if pos > had:
+                        attempt = 0
+                    if not is_retryable(e) or attempt == retries:
+                        raise
+                    delay = backoff_delay(attempt)
+                    attempt += 1
+                    print(f"⏳ Segment {start}-{end} interrupted ({e}); retry {attempt}/{retries} in {delay:.1f}s")
+                    time.sleep(delay)
+
+    with ThreadPoolExecutor(max_workers=max(1, connections)) as pool:
+        # list() re-raises the first worker failure
+        list(pool.map(fetch, segments))
+    return wanted, total
+
+
+def verify_zip(path):
+    """Check the downloaded pack before extraction: it must have a readable central directory."""
+    try:
+        with zipfile.ZipFile(path) as zip_ref:
+            zip_ref.infolist()
+    except zipfile.BadZipFile:
+        os.remove(path)
+        raise
+
+
+def download_to_spool(url, timeout=DOWNLOAD_TIMEOUT, chunk_size=CHUNK_SIZE):
+    """Stream url into a spooled temp file; returns (file rewound to 0, byte count)."""
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    total = 0
+    try:
+        with requests.get(url, stream=True, timeout=timeout) as response:
+            response.raise_for_status()
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                if chunk:
+                    spool.write(chunk)
+                    total += len(chunk)
+    except Exception:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool, total
+
+
+def extract_streaming(fileobj, dest_dir, chunk_size=CHUNK_SIZE):
+    """Extract a zip entry by entry with a fixed-size copy buffer; returns entry count."""
+    os.makedirs(dest_dir, exist_ok=True)
+    entries = 0
+    with zipfile.ZipFile(fileobj) as zip_ref:
+        for info in zip_ref.infolist():
+            target = _member_path(dest_dir, info.filename)
+            if info.is_dir():
+                os.makedirs(target, exist_ok=True)
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with zip_ref.open(info) as src, open(target, "wb") as dst:
+                shutil.copyfileobj(src, dst, chunk_size)
+            entries += 1
+    return entries
+
+
+def streaming_download(url, dest_dir, timeout=DOWNLOAD_TIMEOUT, chunk_size=CHUNK_SIZE):
+    """Download the video pack and extract it without holding it in memory.
+
+    Returns a stats dict with bytes, entries, seconds, bytes_per_sec and peak_rss.
+    """
+    start = time.monotonic()
+    spool, total = download_to_spool(url, timeout=timeout, chunk_size=chunk_size)
+    try:
+        entries = extract_streaming(spool, dest_dir, chunk_size=chunk_size)
+    finally:
+        spool.close()
+    elapsed = time.monotonic() - start
+    stats = {
+        "bytes": total,
+        "entries": entries,
+        "seconds": round(elapsed, 3),
+        "bytes_per_sec": int(total / elapsed) if elapsed > 0 else total,
+        "peak_rss": peak_rss_bytes(),
+    }
+    peak = stats["peak_rss"]
+    peak_mb = f"{peak / (1024 * 1024):.1f} MB" if peak is not None else "n/a"
+    print(f"[{datetime.now()}] 📦 {total} bytes, {entries} files in {elapsed:.1f}s "
+          f"({stats['bytes_per_sec'] / (1024 * 1024):.2f} MB/s, peak RSS {peak_mb})")
+    return stats
@@ -0,0 +1,183 @@
+import os
+import json
+import time
+import hashlib
+import subprocess
+from datetime import datetime
+from video_sync import MANIFEST_NAME, load_manifest, save_manifest
+from video_store import GENERATION_PREFIX, LEGACY_FOLDER, current_video_folder
+
+# --- Rendition cache
+# <root>/.renditions/<sha256>-<profile>.mp4   one normalized copy per distinct clip content
+# Clips are keyed by the SHA-256 already recorded in each folder's manifest, so
+# a clip that is unchanged across downloads (or renamed) is never transcoded again.
+RENDITION_DIR = ".renditions"
+FFMPEG = os.environ.get("FFMPEG_BINARY", "ffmpeg")
+SCREEN_SIZE = os.environ.get("KIOSK_SCREEN", "1920x1080")  # kiosk display, WIDTHxHEIGHT
+RENDITION_FPS = 30
+TRANSCODE_TIMEOUT = 30 * 60  # seconds one clip may take before it is given up on
+
+
+def _screen_size():
+    width, height = SCREEN_SIZE.lower().split("x")
+    return int(width), int(height)
+
+
+def transcode_args(src, dst):
+    """ffmpeg command that fits src within the screen as H.264 Main, yuv420p, constant fps.
+
+    The clip keeps its own aspect ratio and no bars are baked in, so each
+    player's own fit (CSS object-fit, VLC, ffplay) still decides how it fills
+    the screen.
+    """
+    width, height = _screen_size()
+    video_filter = (f"scale={width}:{height}:force_original_aspect_ratio=decrease:force_divisible_by=2,"
+                    f"fps={RENDITION_FPS},format=yuv420p")
+    return [
+        FFMPEG, "-hide_banner", "-loglevel", "error", "-y", "-i", src,
+        "-map", "0:v:0", "-map", "0:a:0?", "-vf", video_filter,
+        # H.264 Main decodes cheaply in software and in every hardware decoder
+        "-c:v", "libx264", "-preset", "medium", "-profile:v", "main", "-crf", "21",
+        "-g", str(2 * RENDITION_FPS),
+        "-c:a", "aac", "-b:a", "128k", "-ac", "2",
+        # Index up front so browsers can start playing before the whole file has loaded
+        "-movflags", "+faststart", "-f", "mp4", dst,
+    ]
+
+
+def profile_tag():
+    """Short digest of the transcode settings; changing them invalidates the cache."""
+    settings = " ".join(transcode_args("IN", "OUT")[1:])
+    return hashlib.sha256(settings.encode("utf-8")).hexdigest()[:10]
+
+
+def rendition_name(sha256):
+    return f"{sha256}-{profile_tag()}.mp4"
+
+
+_manifest_cache = {}
+
+
+def _manifest_hashes(folder):
+    """{name: sha256} from folder's manifest, re-read only when the manifest changes."""
+    path = os.path.join(folder, MANIFEST_NAME)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return {}
+    cached = _manifest_cache.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            hashes = {name: entry["sha256"] for name, entry in json.load(f).items() if "sha256" in entry}
+    except (OSError, ValueError, KeyError, AttributeError) as e:
+        print(f"⚠️ Ignoring unreadable manifest {path}: {e}")
+        hashes = {}
+    _manifest_cache[path] = (mtime, hashes)
+    return hashes
+
+
+def manifest_hash(folder, name):
+    """SHA-256 the manifest records for folder/name, or None if it isn't covered."""
+    return _manifest_hashes(folder).get(name.replace(os.sep, "/"))
+
+
+def rendition_for(root, folder, name):
+    """Path of the normalized rendition of folder/name, or None if there isn't one yet."""
+    sha256 = manifest_hash(folder, name)
+    if sha256 is None:
+        return None
+    path = os.path.join(os.path.abspath(root), RENDITION_DIR, rendition_name(sha256))
+    return path if os.path.isfile(path) else None
+
+
+def preferred_paths(root, folder, names):
+    """Full paths for names in folder, using the normalized rendition wherever one exists."""
+    return [rendition_for(root, folder, name) or os.path.join(folder, name) for name in names]
+
+
+def _transcode(src, dst):
+    tmp = dst + ".part"
+    try:
+        result = subprocess.run(transcode_args(src, tmp), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                timeout=TRANSCODE_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        result = None
+    if result is None or result.returncode != 0:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        error = "timed out" if result is None else result.stderr.decode("utf-8", "replace").strip()
+        raise RuntimeError(error.splitlines()[-1] if error else f"ffmpeg exited with {result.returncode}")
+    os.replace(tmp, dst)
+
+
+def ingest_renditions(root, folder=None):
+    """Transcode every clip in folder (default: the live one) that has no rendition yet.
+
+    Runs after each sync. Clips that fail to transcode keep playing from
+    the original file. Returns a stats dict.
+    """
+    root = os.path.abspath(root)
+    folder = folder or current_video_folder(root)
+    cache = os.path.join(root, RENDITION_DIR)
+    os.makedirs(cache, exist_ok=True)
+    start = time.monotonic()
+    stats = {"transcoded": 0, "cached": 0, "failed": 0, "seconds": 0.0}
+    if not os.path.isdir(folder):
+        return stats
+    # Hashes every clip the manifest doesn't cover yet, so keep what it learns
+    manifest = load_manifest(folder)
+    save_manifest(folder, manifest)
+    for name in sorted(manifest):
+        if not name.lower().endswith(".mp4"):
+            continue
+        dst = os.path.join(cache, rendition_name(manifest[name]["sha256"]))
+        if os.path.isfile(dst):
+            stats["cached"] += 1
+            continue
+        started = time.monotonic()
+        try:
+            _transcode(os.path.join(folder, name), dst)
+        except FileNotFoundError:
+            print(f"⚠️ {FFMPEG} not found; players will use the original clips")
+            stats["failed"] += 1
+            break
+        except (OSError, RuntimeError) as e:
+            print(f"⚠️ Could not transcode {name}: {e}")
+            stats["failed"] += 1
+            continue
+        stats["transcoded"] += 1
+        print(f"🎬 Normalized {name} in {time.monotonic() - started:.1f}s")
+    stats["removed"] = prune_renditions(root)
+    stats["seconds"] = round(time.monotonic() - start, 3)
+    print(f"[{datetime.now()}] 🎬 Renditions: {stats['transcoded']} transcoded, {stats['cached']} cached, "
+          f"{stats['failed']} failed in {stats['seconds']:.1f}s")
+    return stats
+
+
+def prune_renditions(root):
+    """Remove renditions no video folder refers to any more, or made with old settings."""
+    root = os.path.abspath(root)
+    cache = os.path.join(root, RENDITION_DIR)
+    if not os.path.isdir(cache):
+        return 0
+    wanted = set()
+    for name in os.listdir(root):
+        suffix = name[len(GENERATION_PREFIX):]
+        if name == LEGACY_FOLDER or (name.startswith(GENERATION_PREFIX) and suffix.isdigit()):
+            wanted.update(rendition_name(sha) for sha in _manifest_hashes(os.path.join(root, name)).values())
+    removed = 0
+    for name in os.listdir(cache):
+        if name not in wanted:
+            try:
+                os.remove(os.path.join(cache, name))
+                removed += 1
+            except OSError:
+                # Still open in a player on Windows; retry after the next sync
+                pass
+    return removed
+
+
+if __name__ == "__main__":
+    ingest_renditions(os.path.dirname(os.path.abspath(__file__)))
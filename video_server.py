@@ -1,47 +1,32 @@
-from flask import Flask, send_from_directory, render_template_string
+from flask import Flask, request
 import os
-import glob
+from video_store import video_folder_for
+from video_serving import video_response
+from playlist_index import PlaylistIndex
+from screensaver_page import screensaver_page
+from wsgi_server import serve
 
 app = Flask(__name__)
-VIDEO_FOLDER = os.path.join(os.path.dirname(__file__), 'videos')
+VIDEO_ROOT = os.path.dirname(os.path.abspath(__file__))  # holds videos.<n>/ generations and videos.current
+playlist_index = PlaylistIndex(VIDEO_ROOT)
+
+# Static page; it fetches the clip list from /playlist
+SCREENSAVER_PAGE = screensaver_page()
 
 @app.route('/')
 def index():
-    video_files = [os.path.basename(f) for f in glob.glob(os.path.join(VIDEO_FOLDER, '*.mp4'))]
-    # HTML/JS to loop through all videos
-    html = '''
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Screensaver Videos</title>
-        <style>body, html { margin:0; padding:0; background:black; height:100%; width:100%; overflow:hidden; }</style>
-    </head>
-    <body>
-        <video id="screensaverVideo" width="100%" height="100%" autoplay playsinline></video>
-        <script>
-            const videos = {{ videos|safe }};
-            let idx = 0;
-            const videoElem = document.getElementById('screensaverVideo');
-            function playNext() {
-                videoElem.src = '/videos/' + videos[idx];
-                videoElem.play();
-            }
-            videoElem.onended = function() {
-                idx = (idx + 1) % videos.length;
-                playNext();
-            };
-            if (videos.length > 0) {
-                playNext();
-            }
-        </script>
-    </body>
-    </html>
-    '''
-    return render_template_string(html, videos=video_files)
+    return SCREENSAVER_PAGE.response()
+
+@app.route('/playlist')
+def playlist():
+    return playlist_index.response()
 
 @app.route('/videos/<path:filename>')
 def serve_video(filename):
-    return send_from_directory(VIDEO_FOLDER, filename)
+    # ?g= pins the generation the page started the clip from, so a switch mid-clip is harmless
+    folder = video_folder_for(VIDEO_ROOT, request.args.get('g'))
+    # ?v= is the clip's content hash from the page; such URLs are cached as immutable
+    return video_response(VIDEO_ROOT, folder, filename, request.args.get('v'))
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=False)
+    serve(app, port=5000, host='0.0.0.0')
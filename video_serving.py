@@ -0,0 +1,136 @@
+"""Serving screensaver clips to the browser player.
+
+Every /videos/<name> route goes through video_response(), which:
+
+- serves the normalized rendition when there is one, else the upload;
+- answers byte ranges itself (206, 416, If-Range) so seeks and loops only
+  move the bytes asked for;
+- hands whole files and, under a production WSGI server, ranges too to the
+  server's wsgi.file_wrapper, which sends them with sendfile();
+- uses the clip's content hash as a strong ETag, so revalidation is a 304;
+- marks a response immutable for a year when the URL carries ?v=<etag>,
+  so a clip the page has played once replays from the browser's disk cache.
+
+Pages get the ?v= values for their clips from clip_versions().
+"""
+import os
+import mimetypes
+from werkzeug.security import safe_join
+from werkzeug.wsgi import wrap_file
+from flask import Response, abort, request
+from video_renditions import rendition_for, manifest_hash
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600  # seconds; content-addressed URLs never change
+READ_BLOCK_SIZE = 256 * 1024  # bytes per read when Python copies the body itself
+
+_file_info_cache = {}
+
+
+def _file_info(path, content_hash=None):
+    """(etag, size, mtime) for path, recomputed only when its size or mtime changes."""
+    st = os.stat(path)
+    key = (st.st_size, st.st_mtime_ns, content_hash)
+    cached = _file_info_cache.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    # Without a manifest hash, size and mtime still identify a file that is never rewritten in place
+    etag = content_hash or f"{st.st_size:x}-{st.st_mtime_ns:x}"
+    info = (etag, st.st_size, st.st_mtime)
+    _file_info_cache[path] = (key, info)
+    return info
+
+
+def resolve_clip(root, folder, name):
+    """(path, content hash) of what /videos/<name> serves from folder, or (None, None)."""
+    rendition = rendition_for(root, folder, name)
+    if rendition is not None:
+        return rendition, os.path.splitext(os.path.basename(rendition))[0]
+    path = safe_join(folder, name)
+    if path is None or not os.path.isfile(path):
+        return None, None
+    return path, manifest_hash(folder, name)
+
+
+def clip_versions(root, folder, names):
+    """{name: etag} for the page to put in ?v= so each clip URL is content-addressed."""
+    versions = {}
+    for name in names:
+        path, content_hash = resolve_clip(root, folder, name)
+        if path is not None:
+            versions[name] = _file_info(path, content_hash)[0]
+    return versions
+
+
+class _FileRange:
+    """Iterates length bytes of an open file from its current position, then closes it."""
+
+    def __init__(self, f, length, block_size=READ_BLOCK_SIZE):
+        self.f = f
+        self.remaining = length
+        self.block_size = block_size
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.remaining <= 0:
+            raise StopIteration
+        data = self.f.read(min(self.block_size, self.remaining))
+        if not data:
+            raise StopIteration
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.f.close()
+
+
+def video_response(root, folder, name, version=None):
+    """Response for GET /videos/<name> from folder, honouring Range and conditional headers."""
+    path, content_hash = resolve_clip(root, folder, name)
+    if path is None:
+        abort(404)
+    etag, size, mtime = _file_info(path, content_hash)
+    response = Response(mimetype=mimetypes.guess_type(name)[0] or "video/mp4", direct_passthrough=True)
+    response.set_etag(etag)
+    response.last_modified = mtime
+    response.accept_ranges = "bytes"
+    if version == etag:
+        response.cache_control.public = True
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        # Unversioned URLs may start serving a rendition later; revalidate, which is a 304 until then
+        response.cache_control.no_cache = True
+
+    if request.if_none_match.contains(etag):
+        response.status_code = 304
+        return response
+
+    byte_range = request.range
+    if byte_range is not None and request.if_range.etag is not None and request.if_range.etag != etag:
+        byte_range = None  # the client's partial copy is of another version; send it all
+    if byte_range is not None:
+        span = byte_range.range_for_length(size)
+        if span is None:
+            response.status_code = 416
+            response.headers["Content-Range"] = f"bytes */{size}"
+            return response
+        start, stop = span
+    else:
+        start, stop = 0, size
+
+    f = open(path, "rb")
+    f.seek(start)
+    length = stop - start
+    if byte_range is not None:
+        response.status_code = 206
+        response.content_range = f"bytes {start}-{stop - 1}/{size}"
+    response.content_length = length
+    if start == 0 and stop == size or "wsgi.file_wrapper" in request.environ:
+        # Server file wrappers (waitress, gunicorn) send Content-Length bytes from the file's
+        # current position with sendfile(); werkzeug's fallback reads to EOF, so it only gets whole files
+        response.response = wrap_file(request.environ, f, READ_BLOCK_SIZE)
+    else:
+        response.response = _FileRange(f, length)
+    return response
@@ -0,0 +1,224 @@
+import os
+import sys
+import shutil
+from datetime import datetime
+from video_download import DOWNLOAD_TIMEOUT, DOWNLOAD_CONNECTIONS
+from video_sync import sync_videos
+
+# --- Generation layout
+# <root>/videos.<n>/      one directory per downloaded generation
+# <root>/videos.current   text file naming the live generation, swapped with os.replace
+# <root>/.video-leases/   one <pid>.lease per player, naming the generation it plays from
+# <root>/videos/          legacy folder, used until the first generation is published
+GENERATION_PREFIX = "videos."
+CURRENT_POINTER = "videos.current"
+LEASE_DIR = ".video-leases"
+LEGACY_FOLDER = "videos"
+KEEP_PREVIOUS = 1  # old generations kept for browser players that are mid-clip
+
+
+def _generation_numbers(root):
+    numbers = []
+    for name in os.listdir(root):
+        suffix = name[len(GENERATION_PREFIX):]
+        if name.startswith(GENERATION_PREFIX) and suffix.isdigit():
+            if os.path.isdir(os.path.join(root, name)):
+                numbers.append(int(suffix))
+    return sorted(numbers)
+
+
+def current_generation(root):
+    """Name of the live generation (e.g. 'videos.4'), or None before the first publish."""
+    try:
+        with open(os.path.join(root, CURRENT_POINTER), "r", encoding="utf-8") as f:
+            name = f.read().strip()
+    except OSError:
+        return None
+    if name and os.path.isdir(os.path.join(root, name)):
+        return name
+    return None
+
+
+def current_video_folder(root):
+    """Folder players should read clips from right now."""
+    root = os.path.abspath(root)
+    generation = current_generation(root)
+    return os.path.join(root, generation or LEGACY_FOLDER)
+
+
+def video_folder_for(root, generation):
+    """Folder of a specific generation if it still exists, else the live one."""
+    root = os.path.abspath(root)
+    suffix = (generation or "")[len(GENERATION_PREFIX):]
+    if generation and generation.startswith(GENERATION_PREFIX) and suffix.isdigit():
+        path = os.path.join(root, generation)
+        if os.path.isdir(path):
+            return path
+    return current_video_folder(root)
+
+
+def list_videos(root):
+    """Return (generation, sorted .mp4 names) for the live generation."""
+    root = os.path.abspath(root)
+    generation = current_generation(root)
+    folder = os.path.join(root, generation or LEGACY_FOLDER)
+    if not os.path.isdir(folder):
+        return generation, []
+    names = sorted(f for f in os.listdir(folder) if f.lower().endswith(".mp4"))
+    return generation, names
+
+
+def publish_generation(root, generation):
+    """Atomically point videos.current at generation."""
+    pointer = os.path.join(root, CURRENT_POINTER)
+    tmp = pointer + ".part"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(generation)
+    os.replace(tmp, pointer)
+    print(f"[{datetime.now()}] 🔀 Switched videos to {generation}")
+
+
+def prepare_generation(root):
+    """Create the next videos.<n> seeded with hard links to the live clips."""
+    root = os.path.abspath(root)
+    numbers = _generation_numbers(root)
+    generation = f"{GENERATION_PREFIX}{(numbers[-1] + 1) if numbers else 1}"
+    path = os.path.join(root, generation)
+    source = current_video_folder(root)
+    os.makedirs(path)
+    if os.path.isdir(source):
+        for dirpath, _, filenames in os.walk(source):
+            rel_dir = os.path.relpath(dirpath, source)
+            os.makedirs(os.path.join(path, rel_dir), exist_ok=True)
+            for filename in filenames:
+                src = os.path.join(dirpath, filename)
+                dst = os.path.join(path, rel_dir, filename)
+                try:
+                    # sync_videos replaces files rather than rewriting them, so sharing inodes is safe
+                    os.link(src, dst)
+                except OSError:
+                    shutil.copy2(src, dst)
+    return generation, path
+
+
+# --- Player leases
+
+def _pid_alive(pid):
+    try:
+        import psutil
+        return psutil.pid_exists(pid)
+    except ImportError:
+        pass
+    if sys.platform == "win32":
+        import ctypes
+        PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+        STILL_ACTIVE = 259
+        handle = ctypes.windll.kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not handle:
+            return False
+        code = ctypes.c_ulong()
+        ctypes.windll.kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+        ctypes.windll.kernel32.CloseHandle(handle)
+        return code.value == STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def acquire_lease(root, generation):
+    """Record that this process plays from generation; call again when switching."""
+    lease_dir = os.path.join(root, LEASE_DIR)
+    os.makedirs(lease_dir, exist_ok=True)
+    path = os.path.join(lease_dir, f"{os.getpid()}.lease")
+    tmp = path + ".part"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(generation or LEGACY_FOLDER)
+    os.replace(tmp, path)
+
+
+def release_lease(root):
+    try:
+        os.remove(os.path.join(root, LEASE_DIR, f"{os.getpid()}.lease"))
+    except OSError:
+        pass
+
+
+def leased_generations(root):
+    """Generations referenced by live players; leases of dead processes are dropped."""
+    lease_dir = os.path.join(root, LEASE_DIR)
+    leased = set()
+    if not os.path.isdir(lease_dir):
+        return leased
+    for name in os.listdir(lease_dir):
+        if not name.endswith(".lease"):
+            continue
+        path = os.path.join(lease_dir, name)
+        pid = name[:-len(".lease")]
+        if not pid.isdigit() or not _pid_alive(int(pid)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            continue
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                leased.add(f.read().strip())
+        except OSError:
+            pass
+    return leased
+
+
+def collect_garbage(root):
+    """Remove generations that are neither live, recent, nor leased by a player.
+
+    Generations newer than the live one are leftovers of an interrupted sync.
+    """
+    root = os.path.abspath(root)
+    current = current_generation(root)
+    if current is None:
+        return []
+    current_number = int(current[len(GENERATION_PREFIX):])
+    leased = leased_generations(root)
+    removed = []
+    for number in _generation_numbers(root):
+        name = f"{GENERATION_PREFIX}{number}"
+        if name in leased or current_number - KEEP_PREVIOUS <= number <= current_number:
+            continue
+        try:
+            shutil.rmtree(os.path.join(root, name))
+            removed.append(name)
+        except OSError as e:
+            # Windows refuses while a player still has a clip open; retry on the next sync
+            print(f"⏳ Could not remove {name} yet: {e}")
+    if removed:
+        print(f"🧹 Removed old generations: {', '.join(removed)}")
+    return removed
+
+
+def sync_generation(download_url, root, manifest_url=None, timeout=DOWNLOAD_TIMEOUT, progress=None,
+                    connections=DOWNLOAD_CONNECTIONS):
+    """Sync into a fresh generation and switch to it only if something changed.
+
+    Players keep reading the previous generation until their next clip
+    boundary, so the screensaver never sees a half-updated folder.
+    """
+    root = os.path.abspath(root)
+    generation, path = prepare_generation(root)
+    try:
+        stats = sync_videos(download_url, path, manifest_url, timeout=timeout, progress=progress,
+                            connections=connections)
+    except Exception:
+        shutil.rmtree(path, ignore_errors=True)
+        raise
+    if stats["fetched"] or stats["deleted"] or current_generation(root) is None:
+        publish_generation(root, generation)
+        stats["generation"] = generation
+    else:
+        shutil.rmtree(path, ignore_errors=True)
+        stats["generation"] = current_generation(root)
+    stats["removed_generations"] = collect_garbage(root)
+    return stats
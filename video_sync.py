@@ -0,0 +1,489 @@
+import os
+import json
+import time
+import zlib
+import hashlib
+import zipfile
+import threading
+import requests
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from video_download import (CHUNK_SIZE, DOWNLOAD_TIMEOUT, MAX_RETRIES, DOWNLOAD_CONNECTIONS, SEGMENT_MIN_SIZE,
+                            IncompleteDownload, backoff_delay, is_retryable, iter_received, resumable_download,
+                            segmented_download, verify_zip, _member_path)
+
+# --- Sync configuration
+MANIFEST_NAME = ".manifest.json"  # lives inside the video folder, skipped by the *.mp4 globs
+RANGE_BLOCK_SIZE = 64 * 1024  # minimum bytes fetched per Range request
+RANGE_READ_CHUNK = 16 * 1024  # largest single socket read within a range
+DOWNLOAD_CACHE = ".downloads"  # next to the video folder; keeps partial packs between attempts
+EXTRACT_WORKERS = os.cpu_count() or 1  # threads decompressing members of a local pack
+
+
+class RangeNotSupported(Exception):
+    pass
+
+
+class HttpRangeFile:
+    """Read-only, seekable file over HTTP Range requests.
+
+    zipfile only needs seek/tell/read, so wrapping the download URL in this
+    lets us read the central directory and single members without pulling
+    the whole pack.
+    """
+
+    def __init__(self, url, session=None, timeout=DOWNLOAD_TIMEOUT, block_size=RANGE_BLOCK_SIZE,
+                 retries=MAX_RETRIES):
+        self.url = url
+        self.session = session or requests.Session()
+        self.timeout = timeout
+        self.block_size = block_size
+        self.retries = retries
+        self.bytes_fetched = 0
+        self._pos = 0
+        self._buf = b""
+        self._buf_start = 0
+        response = self.session.head(url, allow_redirects=True, timeout=timeout)
+        response.raise_for_status()
+        if response.headers.get("Accept-Ranges", "").lower() != "bytes":
+            raise RangeNotSupported(url)
+        length = response.headers.get("Content-Length")
+        if length is None:
+            raise RangeNotSupported(url)
+        self.size = int(length)
+        self.etag = response.headers.get("ETag")
+
+    def seekable(self):
+        return True
+
+    def readable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_SET:
+            self._pos = offset
+        elif whence == os.SEEK_CUR:
+            self._pos += offset
+        elif whence == os.SEEK_END:
+            self._pos = self.size + offset
+        self._pos = max(0, min(self._pos, self.size))
+        return self._pos
+
+    def _fetch(self, start, end):
+        """Fetch bytes start..end, resuming from what already arrived if the connection drops."""
+        data = bytearray()
+        attempt = 0
+        while True:
+            had = len(data)
+            headers = {"Range": f"bytes={start + len(data)}-{end}"}
+            if self.etag:
+                # A 200 instead of 206 then means the pack changed under us
+                headers["If-Range"] = self.etag
+            try:
+                with self.session.get(self.url, headers=headers, stream=True, timeout=self.timeout) as response:
+                    response.raise_for_status()
+                    if response.status_code != 206:
+                        raise RangeNotSupported(f"{self.url} answered {response.status_code} to a Range request")
+                    for chunk in iter_received(response, RANGE_READ_CHUNK):
+                        data += chunk
+                if len(data) != end - start + 1:
+                    raise IncompleteDownload(f"short range read: {len(data)} of {end - start + 1} bytes")
+                self.bytes_fetched += len(data)
+                return bytes(data)
+            except Exception as e:
+                if len(data) > had:
+                    attempt = 0  # the connection dropped but we got further
+                if not is_retryable(e) or attempt == self.retries:
+                    raise
+                delay = backoff_delay(attempt)
+                attempt += 1
+                print(f"⏳ Range read {start}-{end} interrupted ({e}); retry {attempt}/{self.retries} in {delay:.1f}s")
+                time.sleep(delay)
+
+    def read(self, n=-1):
+        if n is None or n < 0:
+            n = self.size - self._pos
+        n = min(n, self.size - self._pos)
+        if n <= 0:
+            return b""
+        offset = self._pos - self._buf_start
+        if 0 <= offset and offset + n <= len(self._buf):
+            data = self._buf[offset:offset + n]
+        else:
+            end = min(self.size, self._pos + max(n, self.block_size)) - 1
+            self._buf = self._fetch(self._pos, end)
+            self._buf_start = self._pos
+            data = self._buf[:n]
+        self._pos += len(data)
+        return data
+
+    def close(self):
+        self._buf = b""
+
+
+def file_digest(path, chunk_size=CHUNK_SIZE):
+    """Return (size, sha256 hex, crc32) of a file, read in fixed-size chunks."""
+    sha = hashlib.sha256()
+    crc = 0
+    size = 0
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            sha.update(chunk)
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+    return size, sha.hexdigest(), crc
+
+
+def _local_files(folder):
+    names = []
+    for dirpath, _, filenames in os.walk(folder):
+        for filename in filenames:
+            rel = os.path.relpath(os.path.join(dirpath, filename), folder).replace(os.sep, "/")
+            if rel == MANIFEST_NAME or rel.endswith(".part"):
+                continue
+            names.append(rel)
+    return names
+
+
+def load_manifest(folder):
+    """Load {name: {size, mtime_ns, sha256, crc32}} for folder.
+
+    A recorded hash is reused only while the file's size and mtime both
+    still match; anything else (a file edited in place, a new file, an
+    entry from before mtimes were recorded) is hashed again.
+    """
+    manifest = {}
+    path = os.path.join(folder, MANIFEST_NAME)
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Ignoring unreadable manifest {path}: {e}")
+            manifest = {}
+    if not os.path.isdir(folder):
+        return {}
+    checked = {}
+    for name in _local_files(folder):
+        full = os.path.join(folder, name)
+        st = os.stat(full)
+        entry = manifest.get(name)
+        if entry is None or entry.get("size") != st.st_size or entry.get("mtime_ns") != st.st_mtime_ns:
+            size, sha, crc = file_digest(full)
+            entry = {"size": size, "mtime_ns": st.st_mtime_ns, "sha256": sha, "crc32": crc}
+        checked[name] = entry
+    return checked
+
+
+def save_manifest(folder, manifest):
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, MANIFEST_NAME)
+    tmp = path + ".part"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def fetch_remote_manifest(manifest_url, timeout=DOWNLOAD_TIMEOUT):
+    """Fetch {name: {size, sha256}} from the manifest endpoint, or None if it isn't available."""
+    if not manifest_url:
+        return None
+    try:
+        response = requests.get(manifest_url, timeout=timeout)
+    except requests.exceptions.RequestException as e:
+        print(f"⚠️ Manifest endpoint unreachable, falling back to zip directory: {e}")
+        return None
+    if response.status_code != 200:
+        return None
+    files = response.json().get("files", [])
+    return {f["name"]: {"size": int(f["size"]), "sha256": f["sha256"]} for f in files}
+
+
+def zip_entries(zip_ref):
+    """Describe the zip's central directory as {name: {size, crc32}}."""
+    return {
+        info.filename: {"size": info.file_size, "crc32": info.CRC}
+        for info in zip_ref.infolist()
+        if not info.is_dir()
+    }
+
+
+def plan_sync(local, remote):
+    """Return (names to fetch, names to delete) to turn local into remote."""
+    to_fetch = []
+    for name, want in remote.items():
+        have = local.get(name)
+        if have is None or have.get("size") != want["size"]:
+            to_fetch.append(name)
+        elif "sha256" in want and have.get("sha256") != want["sha256"]:
+            to_fetch.append(name)
+        elif "crc32" in want and have.get("crc32") != want["crc32"]:
+            to_fetch.append(name)
+    to_delete = [name for name in local if name not in remote]
+    return sorted(to_fetch), sorted(to_delete)
+
+
+def _extract_member(zip_ref, name, folder, chunk_size=CHUNK_SIZE, on_bytes=None, sha256=None):
+    """Copy one member to folder via a .part file, checking its CRC as it streams.
+
+    If sha256 is given the digest must match too; a bad member never
+    replaces the existing file. Returns its manifest entry.
+    """
+    info = zip_ref.getinfo(name)
+    target = _member_path(folder, name)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp = target + ".part"
+    sha = hashlib.sha256()
+    crc = 0
+    size = 0
+    with zip_ref.open(name) as src, open(tmp, "wb") as dst:
+        while True:
+            chunk = src.read(chunk_size)
+            if not chunk:
+                break
+            dst.write(chunk)
+            sha.update(chunk)
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+            if on_bytes is not None:
+                on_bytes(len(chunk))
+    if crc != info.CRC or size != info.file_size:
+        os.remove(tmp)
+        raise zipfile.BadZipFile(f"CRC-32 or size mismatch for {name}")
+    if sha256 is not None and sha.hexdigest() != sha256:
+        os.remove(tmp)
+        raise zipfile.BadZipFile(f"SHA-256 mismatch for {name}")
+    os.replace(tmp, target)
+    return {"size": size, "mtime_ns": os.stat(target).st_mtime_ns, "sha256": sha.hexdigest(), "crc32": crc}
+
+
+def extract_members(names, folder, zip_ref=None, path=None, workers=EXTRACT_WORKERS, on_bytes=None,
+                    on_entry=None, hashes=None):
+    """Extract names into folder; returns {name: manifest entry}.
+
+    With a local pack path the members are spread over a thread pool, each
+    thread with its own ZipFile handle (zlib, hashlib and file I/O release
+    the GIL). A remote zip_ref is read one member at a time. on_entry is
+    called with (name, entry) as each member finishes. hashes maps names
+    to the SHA-256 each member must have.
+    """
+    hashes = hashes or {}
+    entries = {}
+    lock = threading.Lock()
+
+    def finished(name, entry):
+        with lock:
+            entries[name] = entry
+            if on_entry is not None:
+                on_entry(name, entry)
+
+    if path is None or workers <= 1 or len(names) <= 1:
+        reader = zip_ref if path is None else zipfile.ZipFile(path)
+        try:
+            for name in names:
+                finished(name, _extract_member(reader, name, folder, on_bytes=on_bytes,
+                                               sha256=hashes.get(name)))
+        finally:
+            if reader is not zip_ref:
+                reader.close()
+        return entries
+
+    local = threading.local()
+    readers = []
+
+    def extract(name):
+        if not hasattr(local, "zip_ref"):
+            local.zip_ref = zipfile.ZipFile(path)
+            with lock:
+                readers.append(local.zip_ref)
+        finished(name, _extract_member(local.zip_ref, name, folder, on_bytes=on_bytes,
+                                       sha256=hashes.get(name)))
+
+    try:
+        with ThreadPoolExecutor(max_workers=min(workers, len(names))) as pool:
+            # Biggest first so one long clip doesn't start last
+            ordered = sorted(names, key=lambda name: -zip_ref.getinfo(name).compress_size) if zip_ref else names
+            list(pool.map(extract, ordered))
+    finally:
+        for reader in readers:
+            reader.close()
+    return entries
+
+
+def _phase(progress, phase):
+    """Wrap progress so every update it gets is tagged with phase."""
+    if progress is None:
+        return None
+    return lambda **fields: progress(phase=phase, **fields)
+
+
+def _open_remote_zip(download_url, timeout, cache_dir, connections=DOWNLOAD_CONNECTIONS, progress=None):
+    """Open the pack with Range reads if the server allows it, else download it whole.
+
+    The whole-pack download is split over several connections when
+    connections > 1 and GET honours Range; otherwise it resumes from
+    cache_dir after failures. Either way it is checked before anything is
+    extracted from it. progress, if given, gets the download's byte counts.
+    Returns (file object, bytes downloaded for the whole pack or None).
+    """
+    try:
+        return HttpRangeFile(download_url, timeout=timeout), None
+    except RangeNotSupported:
+        print("⚠️ Server does not support Range requests on HEAD, downloading the full pack")
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, "pack.zip")
+    segmented = None
+    if connections > 1:
+        segmented = segmented_download(download_url, path, connections=connections, timeout=timeout,
+                                       progress=progress)
+    if segmented is not None:
+        total = segmented[0]
+    else:
+        total = resumable_download(download_url, path, timeout=timeout, progress=progress)
+    verify_zip(path)
+    return open(path, "rb"), total
+
+
+def _member_spans(zip_ref, names, size):
+    """Byte spans covering names (local header + data) and the central directory, merged."""
+    infos = sorted(zip_ref.infolist(), key=lambda info: info.header_offset)
+    ends = {}
+    for info, following in zip(infos, infos[1:] + [None]):
+        # Members are stored back to back, so each one ends where the next begins
+        ends[info.filename] = (following.header_offset if following else zip_ref.start_dir) - 1
+    spans = sorted([(zip_ref.getinfo(name).header_offset, ends[name]) for name in names]
+                   + [(zip_ref.start_dir, size - 1)])
+    merged = [spans[0]]
+    for start, end in spans[1:]:
+        if start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _prefetch_members(source, zip_ref, names, cache_dir, connections, progress=None):
+    """Pull the changed members over parallel connections into a sparse local copy of the pack.
+
+    Unchanged members are left as holes; only the fetched spans and the
+    central directory are ever read back. Returns (path, bytes fetched).
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, "members.zip")
+    spans = _member_spans(zip_ref, names, source.size)
+    result = segmented_download(source.url, path, spans=spans, connections=connections,
+                                timeout=source.timeout, progress=progress)
+    if result is None:
+        raise RangeNotSupported(source.url)
+    return path, result[0]
+
+
+def sync_videos(download_url, video_folder, manifest_url=None, timeout=DOWNLOAD_TIMEOUT, progress=None,
+                connections=DOWNLOAD_CONNECTIONS):
+    """Bring video_folder in line with the remote pack, touching only what changed.
+
+    progress, if given, is called with keyword updates (phase, bytes_total,
+    bytes_done, entries_total, entries_done) as the sync advances. Each
+    phase reports its own fixed bytes_total: "download" counts bytes on the
+    wire for a whole-pack or prefetch transfer, "extract" counts the clips'
+    uncompressed bytes.
+    With connections > 1, large transfers are split into parallel Range
+    requests. When the manifest endpoint shows nothing to fetch, the pack
+    is never opened. Returns a stats dict.
+    """
+    start = time.monotonic()
+    os.makedirs(video_folder, exist_ok=True)
+    local = load_manifest(video_folder)
+    remote_manifest = fetch_remote_manifest(manifest_url, timeout=timeout)
+    if remote_manifest is not None:
+        to_fetch, to_delete = plan_sync(local, remote_manifest)
+        if not to_fetch:
+            # Don't open the pack at all: without Range support that alone is a full download
+            _remove_members(video_folder, local, to_delete)
+            save_manifest(video_folder, local)
+            return _sync_stats(start, to_fetch, to_delete, remote_manifest, 0)
+
+    cache_dir = os.path.join(os.path.dirname(os.path.abspath(video_folder)), DOWNLOAD_CACHE)
+    source, fetched = _open_remote_zip(download_url, timeout, cache_dir, connections,
+                                       _phase(progress, "download"))
+    prefetched = None
+    try:
+        with zipfile.ZipFile(source) as zip_ref:
+            remote = remote_manifest if remote_manifest is not None else zip_entries(zip_ref)
+            to_fetch, to_delete = plan_sync(local, remote)
+            for name in to_fetch + to_delete:
+                _member_path(video_folder, name)  # reject traversal before anything is written
+            missing = sorted(set(to_fetch) - set(zip_ref.namelist()))
+            if missing:
+                raise zipfile.BadZipFile(f"Manifest lists {len(missing)} file(s) the pack does not contain: "
+                                         f"{', '.join(missing[:5])}")
+            local_pack = None if isinstance(source, HttpRangeFile) else source.name
+            wanted = sum(zip_ref.getinfo(name).compress_size for name in to_fetch)
+            if isinstance(source, HttpRangeFile) and connections > 1 and wanted >= SEGMENT_MIN_SIZE:
+                prefetched, segment_bytes = _prefetch_members(source, zip_ref, to_fetch, cache_dir,
+                                                              connections, _phase(progress, "download"))
+                source.bytes_fetched += segment_bytes
+                local_pack = prefetched
+            done = {"bytes": 0, "entries": 0}
+            progress_lock = threading.Lock()
+            extract_progress = _phase(progress, "extract")
+
+            def on_bytes(n):
+                with progress_lock:
+                    done["bytes"] += n
+                    extract_progress(bytes_done=done["bytes"])
+
+            def on_entry(name, entry):
+                local[name] = entry
+                if progress is not None:
+                    with progress_lock:
+                        done["entries"] += 1
+                        extract_progress(entries_done=done["entries"])
+                print(f"⬇️ Updated {name}")
+
+            if progress is not None:
+                extract_progress(bytes_total=sum(remote[name]["size"] for name in to_fetch), bytes_done=0,
+                                 entries_total=len(to_fetch), entries_done=0)
+            extract_members(to_fetch, video_folder, zip_ref=zip_ref, path=local_pack,
+                            on_bytes=on_bytes if progress is not None else None, on_entry=on_entry,
+                            hashes={name: remote[name]["sha256"] for name in to_fetch
+                                    if "sha256" in remote[name]})
+        _remove_members(video_folder, local, to_delete)
+        save_manifest(video_folder, local)
+    finally:
+        source.close()
+        if isinstance(source, HttpRangeFile):
+            fetched = source.bytes_fetched
+        else:
+            os.remove(source.name)
+        if prefetched is not None and os.path.exists(prefetched):
+            os.remove(prefetched)
+
+    return _sync_stats(start, to_fetch, to_delete, remote, fetched)
+
+
+def _remove_members(video_folder, local, names):
+    for name in names:
+        os.remove(_member_path(video_folder, name))
+        local.pop(name, None)
+        print(f"🗑️ Removed {name}")
+
+
+def _sync_stats(start, to_fetch, to_delete, remote, fetched):
+    elapsed = time.monotonic() - start
+    stats = {
+        "fetched": len(to_fetch),
+        "deleted": len(to_delete),
+        "unchanged": len(remote) - len(to_fetch),
+        "bytes_transferred": fetched,
+        "seconds": round(elapsed, 3),
+    }
+    print(f"[{datetime.now()}] 🔄 Sync done: {stats['fetched']} fetched, {stats['deleted']} deleted, "
+          f"{stats['unchanged']} unchanged in {elapsed:.1f}s")
+    return stats
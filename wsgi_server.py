@@ -0,0 +1,139 @@
+"""Production serving for the kiosk's Flask apps.
+
+serve(app, port) replaces app.run(). It runs the app under waitress when
+that is installed (pip install waitress) and otherwise under werkzeug's
+threaded server speaking HTTP/1.1. Either way requests are handled by a
+pool of threads with keep-alive connections, so a long video stream or a
+slow download trigger never holds up /url_matched. With waitress, a worker
+thread is freed as soon as a video response is handed over, and the bytes
+are then sent from the server's I/O loop.
+
+Settings come from the environment:
+
+    KIOSK_SERVER          waitress | werkzeug   (default: waitress if installed)
+    KIOSK_THREADS         worker threads        (default 8)
+    KIOSK_CONNECTIONS     open connections cap  (default 100)
+    KIOSK_KEEPALIVE       idle seconds before a kept-alive connection closes (default 30)
+
+SIGINT, SIGTERM and, on Windows, SIGBREAK stop the server: in-flight
+requests get SHUTDOWN_GRACE seconds to finish, then serve() returns and
+the interpreter exits normally, so atexit handlers (the screensaver
+cleanup) still run.
+
+werkzeug starts a thread per connection (and recent versions close the
+connection after each response), so the fallback is held to
+KIOSK_THREADS connections at a time: beyond that, new connections wait in
+the listen backlog, much as waitress queues requests for its pool.
+"""
+import os
+import signal
+import threading
+
+SERVER = os.environ.get("KIOSK_SERVER")
+THREADS = int(os.environ.get("KIOSK_THREADS", 8))
+CONNECTION_LIMIT = int(os.environ.get("KIOSK_CONNECTIONS", 100))
+KEEPALIVE_SECONDS = int(os.environ.get("KIOSK_KEEPALIVE", 30))
+SHUTDOWN_GRACE = 5  # seconds in-flight requests get to finish on shutdown
+
+
+class _Shutdown(BaseException):
+    # Not an Exception, so socketserver's per-request error handling can't swallow it
+    # when the signal lands while the accept loop is waiting for a free thread
+    pass
+
+
+def _raise_shutdown(signum, _frame):
+    raise _Shutdown(signal.Signals(signum).name)
+
+
+def _install_signal_handlers():
+    for name in ("SIGINT", "SIGTERM", "SIGBREAK"):
+        if hasattr(signal, name):
+            signal.signal(getattr(signal, name), _raise_shutdown)
+
+
+def _pick_server():
+    if SERVER:
+        return SERVER
+    try:
+        import waitress  # noqa: F401
+        return "waitress"
+    except ImportError:
+        return "werkzeug"
+
+
+def _serve_waitress(app, host, port):
+    from waitress.server import create_server
+    server = create_server(app, host=host, port=port, threads=THREADS, connection_limit=CONNECTION_LIMIT,
+                           channel_timeout=KEEPALIVE_SECONDS, ident="kiosk")
+    print(f"🚀 Serving on http://{host}:{port} with waitress ({THREADS} threads)")
+    try:
+        server.run()
+    finally:
+        server.close()
+        # Let requests that are already running finish, then drop what is still queued
+        server.task_dispatcher.shutdown(cancel_pending=True, timeout=SHUTDOWN_GRACE)
+
+
+def _serve_werkzeug(app, host, port):
+    from werkzeug.serving import ThreadedWSGIServer, WSGIRequestHandler
+
+    in_flight = [0]
+    idle = threading.Condition()
+
+    class KeepAliveHandler(WSGIRequestHandler):
+        protocol_version = "HTTP/1.1"
+        timeout = KEEPALIVE_SECONDS
+
+        def run_wsgi(self):
+            # Counts requests being answered, not connections idling between them
+            with idle:
+                in_flight[0] += 1
+            try:
+                super().run_wsgi()
+            finally:
+                with idle:
+                    in_flight[0] -= 1
+                    idle.notify_all()
+
+    slots = threading.BoundedSemaphore(THREADS)
+
+    class BoundedServer(ThreadedWSGIServer):
+        def process_request(self, request, client_address):
+            # Blocks the accept loop while THREADS connections are being served
+            slots.acquire()
+            try:
+                super().process_request(request, client_address)
+            except BaseException:
+                slots.release()
+                raise
+
+        def process_request_thread(self, request, client_address):
+            try:
+                super().process_request_thread(request, client_address)
+            finally:
+                slots.release()
+
+    server = BoundedServer(host, port, app, handler=KeepAliveHandler)
+    print(f"🚀 Serving on http://{host}:{port} with werkzeug (thread per connection, at most {THREADS})")
+    try:
+        server.serve_forever()
+    finally:
+        # Connection threads are daemons, so idle keep-alive connections and streams still
+        # running after the grace period don't keep the interpreter from exiting
+        server.server_close()
+        with idle:
+            idle.wait_for(lambda: in_flight[0] == 0, SHUTDOWN_GRACE)
+
+
+def serve(app, port=5000, host="127.0.0.1"):
+    """Run app until interrupted or terminated, then return so atexit handlers run."""
+    _install_signal_handlers()
+    kind = _pick_server()
+    try:
+        if kind == "waitress":
+            _serve_waitress(app, host, port)
+        else:
+            _serve_werkzeug(app, host, port)
+    except (_Shutdown, KeyboardInterrupt) as e:
+        print(f"🛑 Shutting down ({e or 'interrupted'})")